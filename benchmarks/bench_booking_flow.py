@@ -0,0 +1,253 @@
+# /root/telegram-schedule-bot/benchmarks/bench_booking_flow.py
+# Наскрізне навантаження на сценарій запису через справжній Dispatcher і main_router:
+# /start -> "Записатися" -> ім'я -> дата -> час -> питання -> телефон -> месенджер.
+# Telegram підмінено bot/fake_telegram.py, Google Sheets - bot/fake_sheets.py,
+# тож мережа, BOT_TOKEN і creds.json не потрібні. Для кожної кількості одночасних
+# користувачів друкує пропускну здатність, p50/p95/p99 кожного хендлера,
+# кількість звернень до Sheets на один завершений запис і конфлікти за слоти.
+#
+# Запуск з кореня проекту (DEBUG-вивід хендлерів іде в stderr):
+#   python -m benchmarks.bench_booking_flow [--users 1,10,100,1000] [--storage sheets|sqlite]
+#       [--slots-per-day 24] [--sheets-latency 0.02] [--telegram-latency 0.0] [--sheets-quota 0] 2>/dev/null
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+_TMP_DIR = tempfile.mkdtemp(prefix="bench_booking_flow_")
+os.environ.setdefault("BOT_TOKEN", "123456:benchmark-token")
+os.environ["REQUESTS_JOURNAL_PATH"] = os.path.join(_TMP_DIR, "requests_journal.sqlite3")
+os.environ["FSM_STORAGE_PATH"] = os.path.join(_TMP_DIR, "fsm_storage.sqlite3")
+os.environ["STORAGE_BACKEND"] = "sheets"  # реальне сховище обирається аргументом --storage
+
+from aiogram import BaseMiddleware  # noqa: E402
+
+from bot import google_sheets, handlers  # noqa: E402
+from bot.bot import bot, dp  # noqa: E402
+from bot.fake_sheets import FakeClient, install_fake_client  # noqa: E402
+from bot.fake_telegram import FakeTelegramSession, UpdateFactory  # noqa: E402
+from bot.handlers import Form, main_router  # noqa: E402
+from bot.sheets_gateway import run_sheets_call  # noqa: E402
+from bot.sheets_scheduler import get_scheduler  # noqa: E402
+from bot.slot_holds import SlotHolds  # noqa: E402
+from bot.storage import SheetsStorage  # noqa: E402
+
+SCHEDULE_DAYS = 6
+MAX_PICKS = 30  # спроб вибрати дату/час, після яких користувач "здається"
+
+
+class HandlerTimer(BaseMiddleware):
+    """Внутрішня middleware: час виконання кожного хендлера за його іменем."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    async def __call__(self, handler, event, data):
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.samples[data["handler"].callback.__name__].append(time.perf_counter() - started)
+
+
+def _build_client(slots_per_day: int, latency: float) -> FakeClient:
+    client = FakeClient(latency=latency)
+    today = datetime.now(google_sheets.KYIV_TZ).date()
+    schedule = [[google_sheets.DATE_COLUMN, google_sheets.TIME_COLUMN, google_sheets.STATUS_COLUMN]]
+    for day in range(1, SCHEDULE_DAYS + 1):
+        date_str = (today + timedelta(days=day)).strftime(google_sheets.DATE_FORMAT_IN_SHEET)
+        for i in range(slots_per_day):
+            minutes = 8 * 60 + i * 30
+            schedule.append([date_str, f"{minutes // 60}:{minutes % 60:02d}", google_sheets.STATUS_FREE])
+    requests = [["Ім’я", "Контакт", google_sheets.REQUEST_QUESTION_COLUMN, google_sheets.REQUEST_USER_ID_COLUMN,
+                 google_sheets.REQUEST_DATE_COLUMN, google_sheets.REQUEST_TIME_COLUMN, "Час запису", "Телефон", "Месенджер",
+                 google_sheets.REQUEST_STATUS_COLUMN]]
+    clients = [["user_id", "username", "name", "created", "updated"]]
+    client.create_spreadsheet(google_sheets.SPREADSHEET_NAME, {
+        google_sheets.SCHEDULE_WORKSHEET_NAME: schedule,
+        google_sheets.REQUESTS_WORKSHEET_NAME: requests,
+        google_sheets.CLIENTS_WORKSHEET_NAME: clients,
+    })
+    return client
+
+
+async def _refill_schedule(storage, client: FakeClient) -> None:
+    """Перед кожним рівнем усі слоти знову вільні - і в таблиці, і в кеші/локальній базі бота."""
+    worksheet = client.open(google_sheets.SPREADSHEET_NAME).worksheet(google_sheets.SCHEDULE_WORKSHEET_NAME)
+    slots = len(worksheet.get_all_values()) - 1
+    worksheet.update([[google_sheets.STATUS_FREE]] * slots, f"C2:C{slots + 1}")
+    if isinstance(storage, SheetsStorage):
+        await run_sheets_call(google_sheets.refresh_schedule_cache)
+    else:
+        await storage.replicator.pull_once()
+
+
+def _make_storage(kind: str):
+    if kind == "sqlite":
+        from bot.sqlite_storage import SqliteStorage
+        return SqliteStorage(os.path.join(_TMP_DIR, "bot_storage.sqlite3"))
+    return SheetsStorage()
+
+
+async def _drain(storage) -> None:
+    """Чекає, поки фонові задачі сховища доставлять у таблицю все з журналу заявок / outbox."""
+    while storage.backlog_depth():
+        await asyncio.sleep(0.05)
+
+
+class BookingSimulation:
+    def __init__(self, session: FakeTelegramSession, updates: UpdateFactory):
+        self.session = session
+        self.updates = updates
+        self.conflicts = 0
+
+    async def _send(self, user_id: int, text: str) -> None:
+        await dp.feed_update(bot, self.updates.message(user_id, text=text))
+
+    async def _tap(self, user_id: int, prefix: str, rnd: random.Random) -> bool:
+        message_id, buttons = self.session.keyboard(user_id)
+        choices = [data for data in buttons if data.startswith(prefix)]
+        if not choices:
+            return False
+        _, text, markup = self.session.message(user_id)
+        await dp.feed_update(bot, self.updates.callback(user_id, rnd.choice(choices), message_id, text, markup))
+        return True
+
+    async def _state(self, user_id: int):
+        return await dp.fsm.get_context(bot=bot, chat_id=user_id, user_id=user_id).get_state()
+
+    async def run_user(self, user_id: int) -> bool:
+        rnd = random.Random(user_id)
+        await self._send(user_id, "/start")
+        if not await self._tap(user_id, "book_consultation", rnd):
+            return False
+        await self._send(user_id, f"Клієнт {user_id}")
+
+        for _ in range(MAX_PICKS):
+            state = await self._state(user_id)
+            if state == Form.question.state:
+                break
+            if state == Form.time.state:
+                if await self._tap(user_id, "time_", rnd):
+                    if await self._state(user_id) != Form.question.state:
+                        self.conflicts += 1
+                    continue
+            if state in (Form.date.state, Form.time.state) and await self._tap(user_id, "date_", rnd):
+                continue
+            return False  # вільних слотів не лишилося
+        else:
+            return False
+
+        await self._send(user_id, "Питання щодо договору оренди")
+        await self._send(user_id, f"+380{user_id % 10**9:09d}")
+        if not await self._tap(user_id, "messenger_", rnd):
+            return False
+        return await self._state(user_id) is None
+
+
+def _double_booked_slots(client: FakeClient, first_user: int, last_user: int) -> list:
+    """Слоти, на які в 'Заявки' потрапило кілька заявок користувачів цього рівня."""
+    worksheet = client.open(google_sheets.SPREADSHEET_NAME).worksheet(google_sheets.REQUESTS_WORKSHEET_NAME)
+    rows = worksheet.get_all_values()
+    header = rows[0]
+    uid_col, date_col, time_col = (header.index(c) for c in (
+        google_sheets.REQUEST_USER_ID_COLUMN, google_sheets.REQUEST_DATE_COLUMN, google_sheets.REQUEST_TIME_COLUMN))
+    slots = Counter((row[date_col], row[time_col]) for row in rows[1:] if first_user <= int(row[uid_col]) < last_user)
+    return [slot for slot, count in slots.items() if count > 1]
+
+
+def _percentiles(samples: list) -> str:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return f"p50={pick(0.50):8.2f} p95={pick(0.95):8.2f} p99={pick(0.99):8.2f} ms"
+
+
+async def _run_level(users: int, level_no: int, storage, client: FakeClient, session: FakeTelegramSession,
+                     timer: HandlerTimer) -> bool:
+    await _refill_schedule(storage, client)
+    simulation = BookingSimulation(session, UpdateFactory(bot_id=bot.id))
+    timer.samples.clear()
+    sheets_before = client.calls.copy()
+    telegram_before = session.total_calls
+    first_user = (level_no + 1) * 10**6
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(simulation.run_user(first_user + i) for i in range(users)))
+    elapsed = time.perf_counter() - started
+    await _drain(storage)
+
+    completed = sum(results)
+    updates = sum(len(s) for s in timer.samples.values())
+    sheets_calls = client.calls - sheets_before
+    sheets_total = sum(sheets_calls.values())
+    print(f"\n=== {users} users: {completed} bookings in {elapsed:.3f}s "
+          f"({completed / elapsed:.1f} bookings/s, {updates / elapsed:.1f} updates/s), slot conflicts={simulation.conflicts}")
+    for name in sorted(timer.samples):
+        samples = timer.samples[name]
+        print(f"  {name:34s} n={len(samples):5d} {_percentiles(samples)}")
+    per_booking = sheets_total / completed if completed else float("nan")
+    print(f"  Sheets API calls: {sheets_total} ({per_booking:.2f} per booking) {dict(sheets_calls)}")
+    print(f"  Telegram API calls: {session.total_calls - telegram_before} "
+          f"({(session.total_calls - telegram_before) / max(completed, 1):.1f} per booking)")
+
+    double_booked = _double_booked_slots(client, first_user, first_user + users)
+    if double_booked:
+        print(f"  FAIL: {len(double_booked)} slots booked more than once, e.g. {double_booked[:3]}")
+        return False
+    free_left = sum(len(times) for times in (await storage.get_available_dates()).values())
+    if completed < users and free_left:
+        print(f"  FAIL: {users - completed} users did not book while {free_left} slots were still free")
+        return False
+    return True
+
+
+async def main(levels: list, storage_kind: str, slots_per_day: int, sheets_latency: float, telegram_latency: float,
+               sheets_quota: float) -> int:
+    client = _build_client(slots_per_day, sheets_latency)
+    install_fake_client(client)
+    get_scheduler().configure(sheets_quota, sheets_quota)
+    session = FakeTelegramSession(latency=telegram_latency)
+    bot.session = session
+    timer = HandlerTimer()
+    main_router.message.middleware(timer)
+    main_router.callback_query.middleware(timer)
+    dp.include_router(main_router)
+
+    storage = _make_storage(storage_kind)
+    handlers.storage = storage
+    handlers.slot_holds = SlotHolds(storage)
+    await storage.start()
+    await handlers.slot_holds.start()
+    print(f"storage={type(storage).__name__} slots={slots_per_day * SCHEDULE_DAYS} sheets latency={sheets_latency * 1000:.0f}ms "
+          f"telegram latency={telegram_latency * 1000:.0f}ms")
+    ok = True
+    try:
+        for level_no, users in enumerate(levels):
+            ok &= await _run_level(users, level_no, storage, client, session, timer)
+    finally:
+        await handlers.slot_holds.stop()
+        await storage.close()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", default="1,10,100,1000", help="рівні одночасних користувачів через кому")
+    parser.add_argument("--storage", choices=("sheets", "sqlite"), default="sheets")
+    parser.add_argument("--slots-per-day", type=int, default=24, help="слотів на день (кожні 30 хв від 08:00)")
+    parser.add_argument("--sheets-latency", type=float, default=0.02)
+    parser.add_argument("--telegram-latency", type=float, default=0.0)
+    parser.add_argument("--sheets-quota", type=float, default=0, help="запитів Sheets на хвилину (0 - без обмеження)")
+    args = parser.parse_args()
+    levels = [int(n) for n in args.users.split(",") if n.strip()]
+    sys.exit(asyncio.run(main(levels, args.storage, args.slots_per_day, args.sheets_latency, args.telegram_latency,
+                             args.sheets_quota)))
@@ -0,0 +1,129 @@
+# /root/telegram-schedule-bot/benchmarks/bench_fsm_storage.py
+# Накладні витрати сховища станів FSM на одне оновлення Telegram. Кожне оновлення - як крок сценарію
+# запису: middleware читає стан, хендлер читає дані, двічі викликає update_data і змінює стан.
+# Порівнює MemoryStorage aiogram, наївне SQLite-сховище (запит до бази на кожен виклик) і
+# fsm_storage.SqliteFsmStorage (LRU-кеш + пакетний запис), у т.ч. з кешем, меншим за кількість
+# користувачів. Потім імітує перезапуск: закриває сховище, відкриває заново і звіряє стани.
+# Завершується з кодом 1, якщо стани після перезапуску не збіглися.
+#
+# Запуск з кореня проекту:
+#   python -m benchmarks.bench_fsm_storage [--users 1000] [--steps 8] 2>/dev/null
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from bot.fsm_storage import SqliteFsmStorage
+from bot.states import Form
+
+BOT_ID = 42
+STEPS = [Form.booking_name, Form.date, Form.time, Form.question, Form.booking_phone_number, Form.messenger_choice]
+
+
+class WriteThroughSqliteStorage(BaseStorage):
+    """Базовий варіант без кешу: кожен get_* - SELECT, кожен set_* - окремий UPSERT з фіксацією."""
+
+    def __init__(self, path: str):
+        self._key_builder = DefaultKeyBuilder(with_bot_id=True, with_business_connection_id=True, with_destiny=True)
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS fsm (key TEXT PRIMARY KEY, state TEXT, data TEXT NOT NULL)")
+
+    def _row(self, key: StorageKey):
+        row = self._conn.execute("SELECT state, data FROM fsm WHERE key = ?", (self._key_builder.build(key),)).fetchone()
+        return (row[0], json.loads(row[1])) if row else (None, {})
+
+    def _write(self, key: StorageKey, state, data) -> None:
+        self._conn.execute("INSERT INTO fsm (key, state, data) VALUES (?, ?, ?) "
+                           "ON CONFLICT(key) DO UPDATE SET state = excluded.state, data = excluded.data",
+                           (self._key_builder.build(key), state, json.dumps(data, ensure_ascii=False)))
+
+    async def set_state(self, key, state=None) -> None:
+        self._write(key, getattr(state, "state", state), self._row(key)[1])
+
+    async def get_state(self, key):
+        return self._row(key)[0]
+
+    async def set_data(self, key, data) -> None:
+        self._write(key, self._row(key)[0], data)
+
+    async def get_data(self, key):
+        return self._row(key)[1]
+
+    async def close(self) -> None:
+        self._conn.close()
+
+
+def _context(storage: BaseStorage, user_id: int) -> FSMContext:
+    return FSMContext(storage=storage, key=StorageKey(bot_id=BOT_ID, chat_id=user_id, user_id=user_id))
+
+
+async def _run(storage: BaseStorage, users: int, steps: int) -> float:
+    """Середній час одного оновлення в мікросекундах (користувачі чергуються, як у живому боті)."""
+    started = time.perf_counter()
+    for step in range(steps):
+        for user_id in range(1, users + 1):
+            state = _context(storage, user_id)
+            await state.get_state()
+            await state.get_data()
+            await state.update_data(step=step, date=f"{1 + step % 28:02d}.01.2030")
+            await state.update_data(name=f"Клієнт {user_id}")
+            await state.set_state(STEPS[step % len(STEPS)])
+        await asyncio.sleep(0)  # дати спрацювати відкладеному запису, як між оновленнями
+    return (time.perf_counter() - started) / (users * steps) * 1e6
+
+
+async def _snapshot(storage: BaseStorage, users: int) -> dict:
+    result = {}
+    for user_id in range(1, users + 1):
+        state = _context(storage, user_id)
+        result[user_id] = (await state.get_state(), await state.get_data())
+    return result
+
+
+async def main(users: int, steps: int) -> int:
+    tmp_dir = tempfile.mkdtemp(prefix="bench_fsm_storage_")
+    cases = [
+        ("memory (aiogram)", lambda: MemoryStorage()),
+        ("sqlite write-through", lambda: WriteThroughSqliteStorage(os.path.join(tmp_dir, "naive.sqlite3"))),
+        ("sqlite + LRU cache", lambda: SqliteFsmStorage(os.path.join(tmp_dir, "cached.sqlite3"), cache_size=users * 2)),
+        (f"sqlite + LRU {users // 4}", lambda: SqliteFsmStorage(os.path.join(tmp_dir, "small.sqlite3"), cache_size=users // 4)),
+    ]
+    failed = False
+    baseline = None
+    for name, make in cases:
+        storage = make()
+        per_update = await _run(storage, users, steps)
+        baseline = baseline or per_update
+        expected = await _snapshot(storage, users)
+        await storage.close()
+        stats = storage.fsm_stats() if isinstance(storage, SqliteFsmStorage) else {}
+        line = f"{name:24s} {per_update:8.1f} us/update  (x{per_update / baseline:4.1f} of memory)"
+        if stats:
+            line += f"  {stats['changes']} changes -> {stats['rows_written']} rows in {stats['flushes']} transactions"
+        if isinstance(storage, SqliteFsmStorage):
+            reopened = SqliteFsmStorage(storage.path, cache_size=users * 2)
+            same = await _snapshot(reopened, users) == expected
+            await reopened.close()
+            failed |= not same
+            line += f"; after restart {'same states' if same else 'STATES DIFFER'}"
+        print(line)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=8, help="кроків сценарію на користувача")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.users, args.steps)))
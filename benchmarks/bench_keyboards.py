@@ -0,0 +1,111 @@
+# /root/telegram-schedule-bot/benchmarks/bench_keyboards.py
+# Клавіатури на кожен callback: побудова розмітки дат і часу з нуля (як до кешу в keyboards.py)
+# проти кешу за версією знімка розкладу, а також статичні меню. Друга частина - повторні
+# редагування тим самим текстом і розміткою (подвійні натискання, повторний показ того самого
+# списку дат): message.edit_text робить запит і отримує "message is not modified", а
+# utils.edit_text_if_changed не звертається до Telegram (bot/fake_telegram.py).
+# Завершується з кодом 1, якщо розмітка з кешу відрізняється від побудованої з нуля.
+#
+# Запуск з кореня проекту:
+#   python -m benchmarks.bench_keyboards [--callbacks 20000] [--days 7] [--slots-per-day 16] [--users 200] 2>/dev/null
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("BOT_TOKEN", "123456:benchmark-token")
+os.environ["FSM_STORAGE"] = "memory"
+
+from aiogram.types import InlineKeyboardMarkup  # noqa: E402
+
+from bot import keyboards  # noqa: E402
+from bot.bot import bot  # noqa: E402
+from bot.fake_telegram import FakeTelegramSession  # noqa: E402
+from bot.google_sheets import DATE_FORMAT_IN_SHEET, KYIV_TZ  # noqa: E402
+from bot.schedule_snapshot import ScheduleSnapshot  # noqa: E402
+from bot.utils import edit_stats, edit_text_if_changed  # noqa: E402
+
+
+def _snapshot(days: int, slots_per_day: int, version: int) -> ScheduleSnapshot:
+    today = datetime.now(KYIV_TZ).date()
+    dates = {}
+    for day in range(1, days + 1):
+        date_str = (today + timedelta(days=day)).strftime(DATE_FORMAT_IN_SHEET)
+        dates[date_str] = [f"{8 + i // 2:02d}:{30 * (i % 2):02d}" for i in range(slots_per_day)]
+    return ScheduleSnapshot(dates, version)
+
+
+def _per_callback(fn, callbacks: int) -> float:
+    started = time.perf_counter()
+    for i in range(callbacks):
+        fn(i)
+    return (time.perf_counter() - started) / callbacks * 1e6
+
+
+async def _edits(users: int, repeats: int, markup: InlineKeyboardMarkup, use_helper: bool) -> int:
+    session = FakeTelegramSession()
+    bot.session = session
+    text = "Ось доступні дати для запису (на 7 днів):\nВиберіть дату:"
+    for user_id in range(1, users + 1):
+        message = await bot.send_message(user_id, text, reply_markup=markup)
+        for _ in range(repeats):
+            if use_helper:
+                message = await edit_text_if_changed(message, text, reply_markup=markup)
+            else:
+                try:
+                    message = await message.edit_text(text, reply_markup=markup)
+                except Exception:
+                    pass  # "message is not modified"
+    return session.calls["EditMessageText"]
+
+
+def main(callbacks: int, days: int, slots_per_day: int, users: int) -> int:
+    snapshot = _snapshot(days, slots_per_day, version=1)
+    dates = list(snapshot)
+
+    def uncached(i: int):
+        date_str = dates[i % len(dates)]
+        keyboards._build_dates_keyboard(snapshot.to_dict())
+        keyboards._build_times_keyboard(snapshot[date_str])
+        keyboards._build_service_choice_keyboard()
+
+    def cached(i: int):
+        date_str = dates[i % len(dates)]
+        keyboards.get_dates_keyboard(snapshot)
+        keyboards.get_times_keyboard(snapshot[date_str], snapshot.version, date_str)
+        keyboards.get_service_choice_keyboard()
+
+    same = (keyboards.get_dates_keyboard(snapshot) == keyboards._build_dates_keyboard(snapshot.to_dict())
+            and all(keyboards.get_times_keyboard(snapshot[d], snapshot.version, d) == keyboards._build_times_keyboard(snapshot[d])
+                    for d in dates))
+    before = _per_callback(uncached, callbacks)
+    after = _per_callback(cached, callbacks)
+    print(f"keyboards per callback ({days} days x {slots_per_day} slots): rebuilt {before:7.1f} us   "
+          f"cached {after:7.1f} us   x{before / after:.0f}   {'same markup' if same else 'MARKUP DIFFERS'}")
+
+    newer = _snapshot(days, slots_per_day - 1, version=2)
+    rebuilt = keyboards.get_times_keyboard(newer[dates[0]], newer.version, dates[0])
+    fresh = rebuilt == keyboards._build_times_keyboard(newer[dates[0]])
+    same &= fresh
+    print(f"new schedule version -> times keyboard rebuilt {'OK' if fresh else 'FAIL'}; cache {keyboards.keyboard_cache_stats()}")
+
+    markup = keyboards.get_dates_keyboard(newer)
+    repeats = 3
+    raw = asyncio.run(_edits(users, repeats, markup, use_helper=False))
+    helper = asyncio.run(_edits(users, repeats, markup, use_helper=True))
+    print(f"{users} users x {repeats} identical re-renders: edit_text {raw} Telegram calls, "
+          f"edit_text_if_changed {helper} Telegram calls {edit_stats()}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--callbacks", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--slots-per-day", type=int, default=16)
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+    sys.exit(main(args.callbacks, args.days, args.slots_per_day, args.users))
@@ -0,0 +1,95 @@
+# /root/telegram-schedule-bot/benchmarks/bench_schedule_window.py
+# Читання 'Графіка' з довгою історією поверх bot/fake_sheets.py: --rows рядків, з яких майже всі -
+# минулі дні, 14 днів майбутніх і кілька зайвих колонок (як нотатки адвоката). Порівнює попереднє читання
+# всього аркуша (get_all_values + розбір усіх рядків) з частковим читанням google_sheets._load_schedule:
+# лише колонки Дата/Час/Статус і лише рядки вікна запису за мапою рядків (schedule_rows.py).
+# Друкує прочитані клітинки та час читання+розбору; звіряє знімки. Код 1, якщо знімки різні.
+#
+# Запуск з кореня проекту:
+#   python -m benchmarks.bench_schedule_window [--rows 10000,100000] [--latency 0.0] [--repeat 5] 2>/dev/null
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bot import google_sheets
+from bot.fake_sheets import FakeClient, install_fake_client
+from bot.sheets_scheduler import get_scheduler
+
+SLOTS_PER_DAY = 16
+FUTURE_DAYS = 14
+EXTRA_COLUMNS = ["Клієнт", "Телефон", "Нотатки", "Оплата", "Посилання"]
+
+
+def _build_client(rows: int, latency: float) -> FakeClient:
+    now = datetime.now(google_sheets.KYIV_TZ)
+    header = [google_sheets.DATE_COLUMN, google_sheets.TIME_COLUMN, google_sheets.STATUS_COLUMN] + EXTRA_COLUMNS
+    schedule = [header]
+    days = rows // SLOTS_PER_DAY
+    for offset in range(FUTURE_DAYS - days, FUTURE_DAYS):
+        date_str = (now.date() + timedelta(days=offset)).strftime(google_sheets.DATE_FORMAT_IN_SHEET)
+        for i in range(SLOTS_PER_DAY):
+            status = google_sheets.STATUS_FREE if (offset + i) % 3 else google_sheets.STATUS_BOOKED
+            schedule.append([date_str, f"{8 + i // 2}:{30 * (i % 2):02d}", status,
+                             f"Клієнт {i}", "+380000000000", "консультація щодо договору", "так", "https://meet.example"])
+    client = FakeClient(latency=latency)
+    client.create_spreadsheet(google_sheets.SPREADSHEET_NAME, {google_sheets.SCHEDULE_WORKSHEET_NAME: schedule})
+    return client
+
+
+def _legacy_load(worksheet, columns: dict):
+    all_values = worksheet.get_all_values()
+    available, _ = google_sheets._build_schedule(all_values, columns, datetime.now(google_sheets.KYIV_TZ))
+    return available, sum(len(row) for row in all_values)
+
+
+def _best(fn, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main(levels: list, latency: float, repeat: int) -> int:
+    get_scheduler().configure(0, 0)
+    failed = False
+    for rows in levels:
+        client = _build_client(rows, latency)
+        install_fake_client(client)
+        worksheet = client.open(google_sheets.SPREADSHEET_NAME).worksheet(google_sheets.SCHEDULE_WORKSHEET_NAME)
+        columns = google_sheets._REGISTRY.columns(google_sheets.SCHEDULE_WORKSHEET_NAME)
+
+        legacy_time, (legacy_available, legacy_cells) = _best(lambda: _legacy_load(worksheet, columns), repeat)
+
+        stats_start = google_sheets.schedule_read_stats()
+        full_started = time.perf_counter()
+        google_sheets._load_schedule(full=True)  # перше читання будує мапу рядків
+        full_time = time.perf_counter() - full_started
+        stats_before = google_sheets.schedule_read_stats()
+        window_time, snapshot = _best(google_sheets._load_schedule, repeat)
+        stats = google_sheets.schedule_read_stats()
+        window_rows = (stats.get("window_rows", 0) - stats_before.get("window_rows", 0)) // repeat
+        projected = sum(last - first + 1 for first, last in google_sheets._schedule_column_groups(columns))
+        full_cells = (stats_before["full_rows"] - stats_start.get("full_rows", 0)) * projected
+        window_cells = window_rows * projected + len(worksheet.row_values(1))
+
+        same = snapshot.to_dict() == legacy_available
+        failed |= not same
+        print(f"\n=== {rows} rows x {len(worksheet.row_values(1))} columns")
+        print(f"  whole sheet     {legacy_cells:8d} cells  {legacy_time * 1000:8.1f} ms")
+        print(f"  projected full  {full_cells:8d} cells  {full_time * 1000:8.1f} ms  (first read / hourly)")
+        print(f"  booking window  {window_cells:8d} cells  {window_time * 1000:8.1f} ms  "
+              f"x{legacy_time / window_time:.0f} faster, {window_rows} rows, {'same snapshot' if same else 'SNAPSHOTS DIFFER'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="10000,100000", help="рядків у 'Графіку' через кому")
+    parser.add_argument("--latency", type=float, default=0.0, help="затримка одного запиту до Sheets, с")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(main([int(n) for n in args.rows.split(",") if n.strip()], args.latency, args.repeat))
@@ -0,0 +1,110 @@
+# /root/telegram-schedule-bot/benchmarks/bench_session_reaper.py
+# Покинуті сесії через справжній Dispatcher і main_router (bot/fake_telegram.py, bot/fake_sheets.py):
+# кожна хвиля - --users нових користувачів, які доходять до вибору часу (слот утримується за ними)
+# і кидають сценарій. Між хвилями минає більше за строк неактивності. Друкує після кожної хвилі
+# кількість записів у сховищі станів FSM, живих сесій і утримуваних слотів - без зняття сесій
+# і з session_reaper.SessionReaper. Завершується з кодом 1, якщо зі зняттям кількість записів
+# росте з хвилями або утримані покинутими сесіями слоти не повернулися у 'вільно'.
+#
+# Запуск з кореня проекту:
+#   python -m benchmarks.bench_session_reaper [--users 200] [--waves 4] [--ttl 1.0] [--fsm memory|sqlite] 2>/dev/null
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from benchmarks.bench_booking_flow import _TMP_DIR, BookingSimulation, _build_client  # задає тимчасові шляхи та BOT_TOKEN
+from bot import google_sheets, handlers
+from bot.bot import bot, dp
+from bot.fake_sheets import install_fake_client
+from bot.fake_telegram import FakeTelegramSession, UpdateFactory
+from bot.fsm_storage import SqliteFsmStorage
+from bot.handlers import Form, main_router
+from bot.session_reaper import SessionReaper
+from bot.sheets_gateway import run_sheets_call
+from bot.sheets_scheduler import get_scheduler
+from bot.slot_holds import SlotHolds
+from bot.storage import SheetsStorage
+
+
+def _fsm_entries(storage) -> int:
+    if isinstance(storage, SqliteFsmStorage):
+        return storage._conn.execute("SELECT COUNT(*) FROM fsm").fetchone()[0]
+    return len(storage.storage)
+
+
+async def _abandon_at_time(simulation: BookingSimulation, user_id: int) -> bool:
+    """/start -> 'Записатися' -> ім'я -> дата -> час; повертає True, якщо слот утримано."""
+    rnd = random.Random(user_id)
+    await simulation._send(user_id, "/start")
+    await simulation._tap(user_id, "book_consultation", rnd)
+    await simulation._send(user_id, f"Клієнт {user_id}")
+    await simulation._tap(user_id, "date_", rnd)
+    await simulation._tap(user_id, "time_", rnd)
+    return await simulation._state(user_id) == Form.question.state
+
+
+async def _run(fsm: str, users: int, waves: int, ttl: float, with_reaper: bool) -> bool:
+    client = _build_client(slots_per_day=users, latency=0.0)
+    install_fake_client(client)
+    storage = SheetsStorage()
+    handlers.storage = storage
+    handlers.slot_holds = SlotHolds(storage, ttl=3600)  # утримання спливали б лише через годину
+    await run_sheets_call(google_sheets.refresh_schedule_cache)
+    await handlers.slot_holds.start()
+    fsm_storage = SqliteFsmStorage(os.path.join(_TMP_DIR, f"fsm_{with_reaper}.sqlite3"), flush_delay=0.05) \
+        if fsm == "sqlite" else MemoryStorage()
+    dp.fsm.storage = fsm_storage
+    reaper = SessionReaper(fsm_storage, handlers.slot_holds, ttl=ttl, grace=0.1)
+    if with_reaper:
+        reaper.install(dp)  # прогін без зняття йде першим, тож middleware на ньому ще немає
+        await reaper.start()
+
+    simulation = BookingSimulation(bot.session, UpdateFactory(bot_id=bot.id))
+    counts = []
+    for wave in range(waves):
+        first = (wave + 1) * 10**6 + (10**5 if with_reaper else 0)
+        held = sum(await asyncio.gather(*(_abandon_at_time(simulation, first + i) for i in range(users))))
+        await asyncio.sleep(0.1)
+        entries = _fsm_entries(fsm_storage)
+        counts.append(entries)
+        print(f"  wave {wave + 1}: {held:4d} slots held, FSM entries {entries:5d}, "
+              f"live sessions {reaper.session_stats()['live']:5d}, active holds {handlers.slot_holds.hold_stats()['active']:5d}")
+        await asyncio.sleep(ttl + 0.3)  # користувачі цієї хвилі покинули сценарій
+
+    if with_reaper:
+        await reaper.stop()
+    print(f"  reaper: {reaper.session_stats()}")
+    ok = True
+    if with_reaper:
+        free = sum(len(times) for times in (await storage.get_available_dates()).values())
+        ok = counts[-1] <= counts[0] and handlers.slot_holds.hold_stats()["active"] == 0 and free > 0
+        print(f"  {'OK' if ok else 'FAIL'}: FSM entries stay at one wave, {free} slots free again")
+    await handlers.slot_holds.stop()
+    await fsm_storage.close()
+    return ok
+
+
+async def main(users: int, waves: int, ttl: float, fsm: str) -> int:
+    get_scheduler().configure(0, 0)
+    bot.session = FakeTelegramSession()
+    dp.include_router(main_router)
+    ok = True
+    for with_reaper in (False, True):
+        print(f"=== fsm={fsm} {'with SessionReaper' if with_reaper else 'without eviction'} (idle ttl {ttl:g}s)")
+        ok &= await _run(fsm, users, waves, ttl, with_reaper)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200, help="нових користувачів у кожній хвилі")
+    parser.add_argument("--waves", type=int, default=4)
+    parser.add_argument("--ttl", type=float, default=1.0, help="строк неактивності сесії, с")
+    parser.add_argument("--fsm", choices=("memory", "sqlite"), default="memory")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.users, args.waves, args.ttl, args.fsm)))
@@ -0,0 +1,57 @@
+# /root/telegram-schedule-bot/benchmarks/bench_sheets_gateway.py
+# Бенчмарк: N одночасних користувачів роблять по одному "повільному" виклику Sheets.
+# Порівнюємо прямий синхронний виклик всередині async def (як було в хендлерах)
+# з викликом через sheets_gateway (пул потоків).
+#
+# Запуск з кореня проекту:
+#   python -m benchmarks.bench_sheets_gateway [--users 20] [--latency 0.5]
+
+import argparse
+import asyncio
+import time
+
+from bot import google_sheets, sheets_gateway
+
+
+def _make_slow_lookup(latency: float):
+    def slow_get_client_provided_name(user_id: int):
+        time.sleep(latency)  # імітація round trip до Google
+        return f"User {user_id}"
+    return slow_get_client_provided_name
+
+
+async def _direct_handler(user_id: int):
+    # Так хендлери працювали раніше: синхронний gspread прямо в корутині
+    return google_sheets.get_client_provided_name(user_id)
+
+
+async def _gateway_handler(user_id: int):
+    return await sheets_gateway.get_client_provided_name(user_id)
+
+
+async def _run(handler, users: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(handler(user_id) for user_id in range(users)))
+    return time.perf_counter() - started
+
+
+async def main(users: int, latency: float) -> None:
+    google_sheets.get_client_provided_name = _make_slow_lookup(latency)
+
+    direct = await _run(_direct_handler, users)
+    gateway = await _run(_gateway_handler, users)
+    waves = -(-users // sheets_gateway.SHEETS_MAX_WORKERS)
+
+    print(f"users={users} latency={latency:.2f}s workers={sheets_gateway.SHEETS_MAX_WORKERS}")
+    print(f"  direct (blocking event loop): {direct:7.3f}s  (очікується ~{users * latency:.2f}s)")
+    print(f"  sheets_gateway (thread pool): {gateway:7.3f}s  (очікується ~{waves * latency:.2f}s)")
+    print(f"  speedup: x{direct / gateway:.1f}")
+    sheets_gateway.shutdown_gateway()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.latency))
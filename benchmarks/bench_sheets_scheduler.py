@@ -0,0 +1,121 @@
+# /root/telegram-schedule-bot/benchmarks/bench_sheets_scheduler.py
+# Насичення квоти Sheets: фонові потоки безперервно читають "Графік" і дописують "Заявки",
+# користувацькі потоки читають, а раз на --booking-interval секунд відбувається запис бронювання.
+# Той самий сценарій проганяється двічі: без пріоритетів (усі запити в одній FIFO-черзі)
+# і з пріоритетами sheets_scheduler.py. Друкує затримку операцій кожного класу
+# та статистику планувальника. Завершується з кодом 1, якщо з пріоритетами
+# p95 запису бронювання перевищує кілька інтервалів поповнення токена.
+#
+# Запуск з кореня проекту:
+#   python -m benchmarks.bench_sheets_scheduler [--quota 600] [--duration 8] [--background 16] [--quota-errors 0.0]
+
+import argparse
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from bot import google_sheets
+from bot.fake_sheets import FakeClient, install_fake_client
+from bot.sheets_scheduler import (PRIORITY_BACKGROUND, PRIORITY_BOOKING, PRIORITY_NAMES, PRIORITY_USER,
+                                  QuotaScheduler, install_scheduler, set_priority)
+
+
+def _build_client(latency: float, quota_errors: float) -> FakeClient:
+    client = FakeClient(latency=latency, quota_error_rate=quota_errors, seed=1)
+    schedule = [[google_sheets.DATE_COLUMN, google_sheets.TIME_COLUMN, google_sheets.STATUS_COLUMN]]
+    schedule.extend(["01.01.2030", f"{hour}:00", google_sheets.STATUS_FREE] for hour in range(9, 17))
+    client.create_spreadsheet(google_sheets.SPREADSHEET_NAME, {
+        google_sheets.SCHEDULE_WORKSHEET_NAME: schedule,
+        google_sheets.REQUESTS_WORKSHEET_NAME: [["Ім’я", google_sheets.REQUEST_USER_ID_COLUMN]],
+    })
+    return client
+
+
+def _run_phase(client: FakeClient, scheduler: QuotaScheduler, prioritized: bool, duration: float,
+               background: int, users: int, booking_interval: float) -> dict:
+    install_scheduler(client, scheduler)
+    spreadsheet = client.open(google_sheets.SPREADSHEET_NAME)
+    schedule = spreadsheet.worksheet(google_sheets.SCHEDULE_WORKSHEET_NAME)
+    requests = spreadsheet.worksheet(google_sheets.REQUESTS_WORKSHEET_NAME)
+    latencies = defaultdict(list)
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def worker(kind: str, priority: int, op, interval: float = 0.0):
+        set_priority(priority if prioritized else PRIORITY_USER)
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                op()
+            except Exception:
+                continue  # 429 після вичерпання повторів - не рахуємо
+            with lock:
+                latencies[kind].append(time.perf_counter() - started)
+            if interval:
+                stop.wait(interval)
+
+    operations = [("background read", PRIORITY_BACKGROUND, schedule.get_all_values, 0.0)] * (background // 2)
+    operations += [("background write", PRIORITY_BACKGROUND, lambda: requests.append_rows([["bench", "1"]]), 0.0)] * (background - background // 2)
+    operations += [("user read", PRIORITY_USER, lambda: schedule.get("A2:C9"), 0.2)] * users
+    operations += [("booking write", PRIORITY_BOOKING, lambda: schedule.update_cell(2, 3, google_sheets.STATUS_BOOKED), booking_interval)]
+    threads = [threading.Thread(target=worker, args=op, daemon=True) for op in operations]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+    return latencies
+
+
+def _describe(samples: list) -> str:
+    if not samples:
+        return "n=0"
+    ordered = sorted(samples)
+    p50 = ordered[len(ordered) // 2]
+    p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+    return f"n={len(ordered):5d} p50={p50 * 1000:8.1f} p95={p95 * 1000:8.1f} max={ordered[-1] * 1000:8.1f} ms"
+
+
+def main(quota: float, burst: float, duration: float, background: int, users: int, booking_interval: float,
+         latency: float, quota_errors: float) -> int:
+    client = _build_client(latency, quota_errors)
+    install_fake_client(client)
+    token_interval = 60.0 / quota
+    print(f"quota={quota:g}/min (token every {token_interval * 1000:.0f} ms) burst={burst:g} "
+          f"background threads={background} user threads={users} latency={latency * 1000:.0f}ms 429 rate={quota_errors:g}")
+    failed = False
+    for prioritized in (False, True):
+        scheduler = QuotaScheduler(quota, quota, burst)
+        latencies = _run_phase(client, scheduler, prioritized, duration, background, users, booking_interval)
+        print(f"\n=== {'priorities' if prioritized else 'single FIFO queue'}")
+        for kind in ("booking write", "user read", "background read", "background write"):
+            print(f"  {kind:17s} {_describe(latencies[kind])}")
+        stats = scheduler.queue_stats()
+        waits = {PRIORITY_NAMES[p]: stats["wait"][PRIORITY_NAMES[p]]["p95_ms"] for p in PRIORITY_NAMES}
+        print(f"  scheduler: requests={stats.get('requests', 0)} retries={stats.get('retries', 0)} "
+              f"throttled={stats.get('throttled', 0)} queue wait p95 ms={waits}")
+        if prioritized:
+            bookings = sorted(latencies["booking write"])
+            p95 = bookings[min(len(bookings) - 1, int(0.95 * len(bookings)))] if bookings else float("inf")
+            limit = 3 * token_interval + latency + (2.0 if quota_errors else 0.0)
+            ok = p95 <= limit
+            failed |= not ok
+            print(f"  booking write p95 {p95 * 1000:.0f} ms <= {limit * 1000:.0f} ms: {'OK' if ok else 'FAIL'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quota", type=float, default=600, help="запитів на хвилину для читань і для записів")
+    parser.add_argument("--burst", type=float, default=5)
+    parser.add_argument("--duration", type=float, default=8)
+    parser.add_argument("--background", type=int, default=16)
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--booking-interval", type=float, default=0.25)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--quota-errors", type=float, default=0.0, help="частка відповідей 429")
+    args = parser.parse_args()
+    sys.exit(main(args.quota, args.burst, args.duration, args.background, args.users, args.booking_interval,
+                  args.latency, args.quota_errors))
@@ -0,0 +1,95 @@
+# /root/telegram-schedule-bot/benchmarks/bench_single_flight.py
+# Перевірка single-flight: 100 одночасних промахів кешу по кожному типу читання
+# (графік, довідник клієнтів, індекс бронювань) мають дати рівно одне читання аркуша.
+# Працює зі справжнім кодом google_sheets.py поверх bot/fake_sheets.py,
+# тож мережа та creds.json не потрібні.
+#
+# Запуск з кореня проекту:
+#   python -m benchmarks.bench_single_flight [--callers 100] [--latency 0.2]
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from bot import google_sheets
+from bot.fake_sheets import FakeClient, install_fake_client
+from bot.sheets_scheduler import get_scheduler
+
+READ_ENDPOINTS = ("values.get", "values.batchGet")
+
+
+def _build_client(latency: float) -> FakeClient:
+    client = FakeClient(latency=latency)
+    today = datetime.now(google_sheets.KYIV_TZ).date()
+    schedule = [[google_sheets.DATE_COLUMN, google_sheets.TIME_COLUMN, google_sheets.STATUS_COLUMN]]
+    for day in range(1, 8):
+        date_str = (today + timedelta(days=day)).strftime(google_sheets.DATE_FORMAT_IN_SHEET)
+        schedule.extend([date_str, f"{hour}:00", google_sheets.STATUS_FREE] for hour in range(9, 17))
+    date_str = (today + timedelta(days=1)).strftime(google_sheets.DATE_FORMAT_IN_SHEET)
+    requests = [
+        ["Ім’я", "Контакт", google_sheets.REQUEST_QUESTION_COLUMN, google_sheets.REQUEST_USER_ID_COLUMN,
+         google_sheets.REQUEST_DATE_COLUMN, google_sheets.REQUEST_TIME_COLUMN, "Час запису", "Телефон", "Месенджер",
+         google_sheets.REQUEST_STATUS_COLUMN],
+        ["Ivan", "@ivan", "Питання", "42", date_str, "10:00", "", "+380", "Viber", "Активна"],
+    ]
+    clients = [["user_id", "username", "name", "created", "updated"], ["42", "@ivan", "Ivan", "", ""]]
+    client.create_spreadsheet(google_sheets.SPREADSHEET_NAME, {
+        google_sheets.SCHEDULE_WORKSHEET_NAME: schedule,
+        google_sheets.REQUESTS_WORKSHEET_NAME: requests,
+        google_sheets.CLIENTS_WORKSHEET_NAME: clients,
+    })
+    return client
+
+
+def _fire(callers: int, func, *args) -> float:
+    barrier = threading.Barrier(callers)
+
+    def call():
+        barrier.wait()
+        return func(*args)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        results = list(pool.map(lambda _: call(), range(callers)))
+    elapsed = time.perf_counter() - started
+    assert all(r == results[0] for r in results), "усі викликачі мають отримати однаковий результат"
+    return elapsed
+
+
+def _reads(client: FakeClient) -> int:
+    return sum(client.calls[endpoint] for endpoint in READ_ENDPOINTS)
+
+
+def main(callers: int, latency: float) -> int:
+    client = _build_client(latency)
+    install_fake_client(client)
+    get_scheduler().configure(0, 0)  # рахуємо читання, а не чекання квоти
+    cases = [
+        ("schedule", google_sheets.invalidate_schedule_cache, google_sheets.get_available_dates, ()),
+        ("client_name", google_sheets.invalidate_client_directory, google_sheets.get_client_provided_name, (42,)),
+        ("user_bookings", google_sheets.invalidate_bookings_index, google_sheets.get_user_bookings, (42,)),
+    ]
+    failed = False
+    for kind, invalidate, func, args in cases:
+        func(*args)  # прогрів реєстру аркушів (пошук аркуша та заголовка не рахуємо)
+        invalidate()
+        before = _reads(client)
+        elapsed = _fire(callers, func, *args)
+        fetches = _reads(client) - before
+        ok = fetches == 1
+        failed |= not ok
+        print(f"{kind:14s} callers={callers} sheet reads={fetches} elapsed={elapsed:.3f}s {'OK' if ok else 'FAIL'}")
+    print(f"single-flight stats: {dict(google_sheets._SINGLE_FLIGHT.stats)}")
+    print(f"fake Sheets API calls: {dict(client.calls)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--callers", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    sys.exit(main(args.callers, args.latency))
@@ -0,0 +1,101 @@
+# /root/telegram-schedule-bot/benchmarks/bench_slot_holds.py
+# Утримання слотів поверх bot/fake_sheets.py (SheetsStorage):
+#   1) --users користувачів одночасно утримують різні слоти; утримані слоти зникають
+#      з get_available_dates без жодного читання таблиці;
+#   2) частина користувачів підтверджує запис, решта кидає сценарій;
+#   3) після закінчення строку фонова задача знімає всі покинуті утримання пакетними записами.
+# Друкує звернення до Sheets на кожній фазі та статистику утримань.
+# Завершується з кодом 1, якщо слоти не повернулися у 'вільно' або підтверджені записи загублено.
+#
+# Запуск з кореня проекту:
+#   python -m benchmarks.bench_slot_holds [--users 200] [--ttl 2] [--grace 1.5] [--latency 0.02] 2>/dev/null
+
+import argparse
+import asyncio
+import sys
+import time
+
+from bot import google_sheets, sheets_gateway
+from bot.fake_sheets import FakeClient, install_fake_client
+from bot.sheets_scheduler import get_scheduler
+from bot.slot_holds import SlotHolds
+from bot.storage import SheetsStorage
+
+SLOT_DATE = "01.01.2030"
+
+
+def _slot_time(i: int) -> str:
+    return f"{i // 60:02d}:{i % 60:02d}"
+
+
+def _build_client(slots: int, latency: float) -> FakeClient:
+    client = FakeClient(latency=latency)
+    schedule = [[google_sheets.DATE_COLUMN, google_sheets.TIME_COLUMN, google_sheets.STATUS_COLUMN]]
+    schedule.extend([SLOT_DATE, _slot_time(i), google_sheets.STATUS_FREE] for i in range(slots))
+    client.create_spreadsheet(google_sheets.SPREADSHEET_NAME, {google_sheets.SCHEDULE_WORKSHEET_NAME: schedule})
+    return client
+
+
+def _sheet_statuses(client: FakeClient) -> dict:
+    worksheet = client.open(google_sheets.SPREADSHEET_NAME).worksheet(google_sheets.SCHEDULE_WORKSHEET_NAME)
+    return {row[1]: row[2] for row in worksheet.get_all_values()[1:]}
+
+
+async def main(users: int, ttl: float, grace: float, latency: float) -> int:
+    client = _build_client(users, latency)
+    install_fake_client(client)
+    get_scheduler().configure(0, 0)
+    storage = SheetsStorage()
+    holds = SlotHolds(storage, ttl=ttl, grace=grace)
+    await sheets_gateway.run_sheets_call(google_sheets.refresh_schedule_cache)
+    await holds.start()
+    failed = False
+
+    before = client.calls.copy()
+    started = time.perf_counter()
+    held = await asyncio.gather(*(holds.hold(SLOT_DATE, _slot_time(i), user_id=i) for i in range(users)))
+    print(f"hold     : {sum(held)}/{users} slots held in {time.perf_counter() - started:.3f}s, "
+          f"{sum((client.calls - before).values())} Sheets calls")
+
+    before = client.calls.copy()
+    free = (await storage.get_available_dates()).get(SLOT_DATE, [])
+    reads = sum((client.calls - before).values())
+    ok = not free and reads == 0
+    failed |= not ok
+    print(f"schedule : {len(free)} free slots shown, {reads} Sheets reads {'OK' if ok else 'FAIL'}")
+
+    confirmed_users = range(0, users, 4)
+    before = client.calls.copy()
+    confirmed = await asyncio.gather(*(holds.confirm(SLOT_DATE, _slot_time(i), user_id=i) for i in confirmed_users))
+    print(f"confirm  : {sum(confirmed)}/{len(confirmed_users)} bookings confirmed, {sum((client.calls - before).values())} Sheets calls")
+
+    before = client.calls.copy()
+    started = time.perf_counter()
+    abandoned = users - len(confirmed_users)
+    while holds.stats["expired"] < abandoned and time.perf_counter() - started < ttl + grace + 30:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    swept = client.calls - before  # до перевірки: _sheet_statuses теж читає таблицю
+    statuses = _sheet_statuses(client)
+    booked = sum(1 for status in statuses.values() if status == google_sheets.STATUS_BOOKED)
+    freed = sum(1 for status in statuses.values() if status == google_sheets.STATUS_FREE)
+    ok = booked == len(confirmed_users) and freed == abandoned
+    failed |= not ok
+    print(f"expiry   : {freed} abandoned holds released {elapsed:.3f}s after confirmations, "
+          f"{sum(swept.values())} Sheets calls {dict(swept)}, {booked} bookings kept "
+          f"{'OK' if ok else 'FAIL'}")
+
+    print(f"hold stats: {holds.hold_stats()}")
+    await holds.stop()
+    sheets_gateway.shutdown_gateway()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--ttl", type=float, default=2.0, help="строк утримання в секундах")
+    parser.add_argument("--grace", type=float, default=1.5, help="пауза після першого завершення, щоб зняти утримання однією пачкою")
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.users, args.ttl, args.grace, args.latency)))
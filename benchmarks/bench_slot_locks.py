@@ -0,0 +1,113 @@
+# /root/telegram-schedule-bot/benchmarks/bench_slot_locks.py
+# 500 одночасних натискань на один і той самий слот поверх bot/fake_sheets.py.
+#   1) без замків (прямо sheets_gateway.update_status) - показує подвійні бронювання;
+#   2) через SheetsStorage.update_status із замками slot_locks.py - рівно одне бронювання;
+#   3) 500 одночасних скасувань того ж слота - рівно одне скасування;
+#   4) в "Графік" додається колонка "Версія", і 500 натискань знову йдуть без замків, як із різних
+#      екземплярів бота, - умовний запис (compare-and-set) лишає рівно одне бронювання.
+# Друкує кількість успіхів, звернень до Sheets і статистику замків.
+# Завершується з кодом 1, якщо у фазах 2-4 успіх не рівно один.
+#
+# Запуск з кореня проекту:
+#   python -m benchmarks.bench_slot_locks [--taps 500] [--latency 0.02]
+
+import argparse
+import asyncio
+import sys
+import time
+
+from bot import google_sheets, sheets_gateway
+from bot.fake_sheets import FakeClient, install_fake_client
+from bot.sheets_scheduler import get_scheduler
+from bot.storage import SheetsStorage
+
+SLOT_DATE = "01.01.2030"
+SLOT_TIME = "10:00"
+
+
+def _build_client(latency: float) -> FakeClient:
+    client = FakeClient(latency=latency)
+    schedule = [[google_sheets.DATE_COLUMN, google_sheets.TIME_COLUMN, google_sheets.STATUS_COLUMN]]
+    schedule.extend([SLOT_DATE, f"{hour}:00", google_sheets.STATUS_FREE] for hour in range(9, 17))
+    client.create_spreadsheet(google_sheets.SPREADSHEET_NAME, {google_sheets.SCHEDULE_WORKSHEET_NAME: schedule})
+    return client
+
+
+def _sheet_row(client: FakeClient) -> list:
+    worksheet = client.open(google_sheets.SPREADSHEET_NAME).worksheet(google_sheets.SCHEDULE_WORKSHEET_NAME)
+    for row in worksheet.get_all_values()[1:]:
+        if row[0] == SLOT_DATE and google_sheets.normalize_time_str(row[1]) == SLOT_TIME:
+            return row + [""] * (4 - len(row))
+    return ["", "", "", ""]
+
+
+def _sheet_status(client: FakeClient) -> str:
+    return _sheet_row(client)[2]
+
+
+def _add_version_column(client: FakeClient) -> None:
+    worksheet = client.open(google_sheets.SPREADSHEET_NAME).worksheet(google_sheets.SCHEDULE_WORKSHEET_NAME)
+    worksheet.update_cell(1, 4, google_sheets.SLOT_VERSION_COLUMN)
+    google_sheets.invalidate_worksheet_registry()  # заголовок змінився - реєстр перечитає мапу колонок
+
+
+def _reset_slot(client: FakeClient) -> None:
+    worksheet = client.open(google_sheets.SPREADSHEET_NAME).worksheet(google_sheets.SCHEDULE_WORKSHEET_NAME)
+    worksheet.update_cell(3, 3, google_sheets.STATUS_FREE)  # рядок 3 - 10:00
+    google_sheets.invalidate_schedule_cache()
+    google_sheets.get_available_dates()  # індекс слотів, як після звичайного показу графіка
+
+
+async def _tap_all(client: FakeClient, taps: int, update, new_status: str, expected: str):
+    before = client.calls.copy()
+    started = time.perf_counter()
+    results = await asyncio.gather(*(update(SLOT_DATE, SLOT_TIME, new_status, expected_current_status=expected)
+                                     for _ in range(taps)))
+    elapsed = time.perf_counter() - started
+    calls = client.calls - before
+    return sum(results), elapsed, sum(calls.values())
+
+
+async def main(taps: int, latency: float) -> int:
+    client = _build_client(latency)
+    install_fake_client(client)
+    get_scheduler().configure(0, 0)
+    storage = SheetsStorage()
+    failed = False
+
+    _reset_slot(client)
+    booked, elapsed, calls = await _tap_all(client, taps, sheets_gateway.update_status, google_sheets.STATUS_BOOKED, google_sheets.STATUS_FREE)
+    print(f"without locks : {taps} taps -> {booked} successful bookings, {calls} Sheets calls, {elapsed:.3f}s")
+
+    _reset_slot(client)
+    booked, elapsed, calls = await _tap_all(client, taps, storage.update_status, google_sheets.STATUS_BOOKED, google_sheets.STATUS_FREE)
+    ok = booked == 1 and _sheet_status(client) == google_sheets.STATUS_BOOKED
+    failed |= not ok
+    print(f"slot locks    : {taps} taps -> {booked} successful bookings, {calls} Sheets calls, {elapsed:.3f}s {'OK' if ok else 'FAIL'}")
+
+    cancelled, elapsed, calls = await _tap_all(client, taps, storage.update_status,
+                                               google_sheets.STATUS_CANCELLED_BY_USER_IN_SCHEDULE, google_sheets.STATUS_BOOKED)
+    ok = cancelled == 1 and _sheet_status(client) == google_sheets.STATUS_CANCELLED_BY_USER_IN_SCHEDULE
+    failed |= not ok
+    print(f"cancellations : {taps} taps -> {cancelled} successful cancellations, {calls} Sheets calls, {elapsed:.3f}s {'OK' if ok else 'FAIL'}")
+
+    print(f"slot lock stats: {storage.slot_locks.lock_stats()}")
+
+    _add_version_column(client)
+    _reset_slot(client)
+    booked, elapsed, calls = await _tap_all(client, taps, sheets_gateway.update_status, google_sheets.STATUS_BOOKED, google_sheets.STATUS_FREE)
+    version = _sheet_row(client)[3]
+    ok = booked == 1 and _sheet_status(client) == google_sheets.STATUS_BOOKED and google_sheets._slot_version(version) == 1
+    failed |= not ok
+    print(f"version CAS   : {taps} taps without locks -> {booked} successful bookings, {calls} Sheets calls, "
+          f"{elapsed:.3f}s, version '{version}' {'OK' if ok else 'FAIL'}")
+    sheets_gateway.shutdown_gateway()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--taps", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.taps, args.latency)))
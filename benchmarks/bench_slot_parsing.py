@@ -0,0 +1,149 @@
+# /root/telegram-schedule-bot/benchmarks/bench_slot_parsing.py
+# Мікробенчмарк розбору дат і часу на фікстурах 'Графіка' і 'Заявок' з 10k і 100k рядків.
+# Порівнює попередній розбір (strptime + KYIV_TZ.localize на кожен рядок і ще раз у ключах
+# сортування) з одним проходом через bot/slots.py:
+#   - побудова кешу графіка (google_sheets._build_schedule);
+#   - сортування дат для клавіатури (keyboards.get_dates_keyboard);
+#   - індекс бронювань і вибірка майбутніх бронювань користувача (google_sheets.get_user_bookings).
+# Результати обох варіантів звіряються; завершується з кодом 1, якщо вони різні.
+#
+# Запуск з кореня проекту:
+#   python -m benchmarks.bench_slot_parsing [--rows 10000,100000] [--repeat 3] 2>/dev/null
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bot import google_sheets
+from bot.google_sheets import DATE_FORMAT_IN_SHEET, KYIV_TZ, STATUS_BOOKED, STATUS_FREE, normalize_time_str
+from bot.slots import now_position, parse_day
+
+SCHEDULE_COLUMNS = {google_sheets.DATE_COLUMN: 1, google_sheets.TIME_COLUMN: 2, google_sheets.STATUS_COLUMN: 3}
+REQUEST_HEADER = [google_sheets.REQUEST_USER_ID_COLUMN, google_sheets.REQUEST_DATE_COLUMN, google_sheets.REQUEST_TIME_COLUMN,
+                  google_sheets.REQUEST_STATUS_COLUMN, google_sheets.REQUEST_QUESTION_COLUMN]
+REQUEST_COLUMNS = {name: i + 1 for i, name in enumerate(REQUEST_HEADER)}
+USERS = 50
+
+
+def _fixture(rows: int, now_kyiv: datetime):
+    """Графік на rows слотів (частина днів - у минулому, у вікні 7 днів і далі) і стільки ж заявок."""
+    rnd = random.Random(rows)
+    first_day = now_kyiv.date() - timedelta(days=3)
+    days = max(rows // 24, 1)
+    schedule = [[google_sheets.DATE_COLUMN, google_sheets.TIME_COLUMN, google_sheets.STATUS_COLUMN]]
+    requests = [REQUEST_HEADER]
+    for i in range(rows):
+        day = first_day + timedelta(days=rnd.randrange(min(days, 30)))
+        date_str = day.strftime(DATE_FORMAT_IN_SHEET)
+        hour, minute = 8 + i % 12, rnd.choice((0, 30))
+        time_str = rnd.choice((f"{hour}:{minute:02d}", f"{hour:02d}:{minute:02d}", f" {hour}:{minute:02d} "))
+        schedule.append([date_str, time_str, rnd.choice((STATUS_FREE, STATUS_FREE, STATUS_BOOKED))])
+        requests.append([str(rnd.randrange(USERS)), date_str, time_str, rnd.choice(("Активна", "", "Скасовано клієнтом")), "?"])
+    return schedule, requests
+
+
+# --- попередній розбір (як було до bot/slots.py) ---
+
+def _legacy_build_schedule(all_values: list, columns: dict, now_kyiv: datetime) -> dict:
+    date_col_idx, time_col_idx, status_col_idx = (columns[c] - 1 for c in (
+        google_sheets.DATE_COLUMN, google_sheets.TIME_COLUMN, google_sheets.STATUS_COLUMN))
+    today_kyiv = now_kyiv.date()
+    end_date_kyiv = today_kyiv + timedelta(days=7)
+    processed = {}
+    for row_values in all_values[1:]:
+        date_str = str(row_values[date_col_idx]).strip()
+        time_key = normalize_time_str(row_values[time_col_idx])
+        status_val = str(row_values[status_col_idx]).strip()
+        if not date_str or not time_key or status_val.lower() != STATUS_FREE:
+            continue
+        try:
+            record_date = datetime.strptime(date_str, DATE_FORMAT_IN_SHEET).date()
+        except ValueError:
+            continue
+        if today_kyiv <= record_date < end_date_kyiv:
+            record_time = datetime.strptime(time_key, "%H:%M").time()
+            if KYIV_TZ.localize(datetime.combine(record_date, record_time)) > now_kyiv:
+                processed.setdefault(date_str, []).append(time_key)
+    return {d: sorted(processed[d]) for d in sorted(processed, key=lambda d: datetime.strptime(d, DATE_FORMAT_IN_SHEET).date())}
+
+
+def _legacy_sort_dates(dates: list) -> list:
+    return sorted(dates, key=lambda d_str: datetime.strptime(d_str.strip(), DATE_FORMAT_IN_SHEET).date())
+
+
+def _legacy_user_bookings(rows: list, now_kyiv: datetime) -> dict:
+    index = {}
+    for row in rows[1:]:
+        user_id_str, date_str, time_value, status = row[0], row[1].strip(), row[2], row[3]
+        time_key = normalize_time_str(time_value)
+        if not time_key:
+            continue
+        starts_at = KYIV_TZ.localize(datetime.strptime(f"{date_str} {time_key}", f"{DATE_FORMAT_IN_SHEET} %H:%M"))
+        index.setdefault(user_id_str, []).append((starts_at, date_str, time_key, status))
+    result = {}
+    for user_id_str, records in index.items():
+        active = [r for r in records if r[0] > now_kyiv and r[3].lower() not in ("скасовано клієнтом", "cancelled by user")]
+        active.sort(key=lambda r: r[0])
+        result[user_id_str] = [(date_str, time_key) for _, date_str, time_key, _ in active]
+    return result
+
+
+# --- новий розбір ---
+
+def _sort_dates(dates: list) -> list:
+    return sorted(dates, key=parse_day)
+
+
+def _user_bookings(rows: list, now_kyiv: datetime) -> dict:
+    google_sheets._BOOKINGS_INDEX = {}
+    google_sheets._index_request_rows(rows[1:], 2, REQUEST_HEADER, REQUEST_COLUMNS)
+    now_pos = now_position(now_kyiv)
+    result = {}
+    for user_id_str, records in google_sheets._BOOKINGS_INDEX.items():
+        active = [r for r in records if r.slot.key > now_pos and r.status.lower() not in ("скасовано клієнтом", "cancelled by user")]
+        active.sort(key=lambda r: r.slot.key)
+        result[user_id_str] = [(r.date, r.time) for r in active]
+    return result
+
+
+def _best(fn, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        parse_day.cache_clear()  # кожен прогін - з холодним кешем розібраних дат
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main(levels: list, repeat: int) -> int:
+    now_kyiv = datetime.now(KYIV_TZ)
+    failed = False
+    for rows in levels:
+        schedule, requests = _fixture(rows, now_kyiv)
+        date_keys = sorted({row[0] for row in schedule[1:]}, key=lambda _: random.random()) * (rows // 1000 or 1)
+        cases = [
+            ("schedule cache", lambda: _legacy_build_schedule(schedule, SCHEDULE_COLUMNS, now_kyiv),
+             lambda: google_sheets._build_schedule(schedule, SCHEDULE_COLUMNS, now_kyiv)[0]),
+            ("dates keyboard sort", lambda: _legacy_sort_dates(date_keys), lambda: _sort_dates(date_keys)),
+            ("user bookings", lambda: _legacy_user_bookings(requests, now_kyiv), lambda: _user_bookings(requests, now_kyiv)),
+        ]
+        print(f"\n=== {rows} rows")
+        for name, legacy, current in cases:
+            legacy_time, expected = _best(legacy, repeat)
+            current_time, actual = _best(current, repeat)
+            same = expected == actual
+            failed |= not same
+            print(f"  {name:20s} strptime/localize {legacy_time * 1000:9.1f} ms   slots.py {current_time * 1000:9.1f} ms   "
+                  f"x{legacy_time / current_time:5.1f}  {'same result' if same else 'RESULTS DIFFER'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    sys.exit(main([int(n) for n in args.rows.split(",") if n.strip()], args.repeat))
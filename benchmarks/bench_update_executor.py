@@ -0,0 +1,108 @@
+# /root/telegram-schedule-bot/benchmarks/bench_update_executor.py
+# Виконання оновлень (bot/update_executor.py) на окремому Dispatcher з одним хендлером, який імітує
+# крок сценарію: чекає від 0.2 до 1.8 від --handler-latency с (як запис у Sheets) і запам'ятовує
+# порядок оновлень свого чату. --chats користувачів надсилають по --taps оновлень поспіль. Порівнює послідовну
+# обробку, наївний запуск кожного оновлення окремою задачею (як dp.start_polling з handle_as_tasks)
+# і UpdateExecutor з різною паралельністю: оновлень/с, перестановки в межах чату, очікування в черзі.
+# Завершується з кодом 1, якщо UpdateExecutor переставив оновлення хоч одного чату.
+#
+# Запуск з кореня проекту:
+#   python -m benchmarks.bench_update_executor [--chats 50] [--taps 5] [--concurrency 1,4,16,64]
+#       [--handler-latency 0.05] 2>/dev/null
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import defaultdict
+
+from aiogram import Dispatcher, Router
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Message
+
+from benchmarks.bench_booking_flow import _percentiles  # задає тимчасові шляхи та BOT_TOKEN
+from bot.bot import bot
+from bot.fake_telegram import FakeTelegramSession, UpdateFactory
+from bot.update_executor import UpdateExecutor
+
+
+def _build_dispatcher(latency: float, seen: dict) -> Dispatcher:
+    router = Router()
+    rnd = random.Random(0)
+
+    @router.message()
+    async def step(message: Message):
+        await asyncio.sleep(latency * rnd.uniform(0.2, 1.8))
+        seen[message.chat.id].append(int(message.text))
+
+    dispatcher = Dispatcher(storage=MemoryStorage())
+    dispatcher.include_router(router)
+    return dispatcher
+
+
+def _updates(chats: int, taps: int) -> list:
+    factory = UpdateFactory(bot_id=bot.id)
+    # Оновлення чатів перемішані між собою, як вони приходять з getUpdates
+    return [factory.message(10**6 + chat, text=str(tap)) for tap in range(taps) for chat in range(chats)]
+
+
+def _reordered(seen: dict, taps: int) -> int:
+    return sum(order != list(range(taps)) for order in seen.values())
+
+
+async def _run(mode: str, concurrency: int, chats: int, taps: int, latency: float) -> bool:
+    seen = defaultdict(list)
+    dispatcher = _build_dispatcher(latency, seen)
+    updates = _updates(chats, taps)
+    durations = []
+
+    async def timed(update):
+        started = time.perf_counter()
+        await dispatcher.feed_update(bot, update)
+        durations.append(time.perf_counter() - started)
+
+    stats = ""
+    started = time.perf_counter()
+    if mode == "sequential":
+        for update in updates:
+            await timed(update)
+    elif mode == "tasks":
+        await asyncio.gather(*(asyncio.create_task(timed(update)) for update in updates))
+    else:
+        executor = UpdateExecutor(dispatcher, bot, concurrency=concurrency, max_pending=len(updates))
+        for update in updates:
+            await executor.put(update)
+        await executor.join()
+        executor_stats = executor.executor_stats()
+        stats = (f", wait in queue p50={executor_stats['chat_wait_p50_ms']:8.1f} p95={executor_stats['chat_wait_p95_ms']:8.1f} ms, "
+                 f"max chat depth {executor_stats['max_chat_depth']}")
+        await executor.stop()
+    elapsed = time.perf_counter() - started
+
+    reordered = _reordered(seen, taps)
+    label = f"executor x{concurrency}" if mode == "executor" else mode
+    handled = f", handler {_percentiles(durations)}" if durations else ""
+    print(f"{label:14s}: {len(updates) / elapsed:8.1f} updates/s, {reordered:4d}/{chats} chats reordered{handled}{stats}")
+    return reordered == 0
+
+
+async def main(chats: int, taps: int, levels: list, latency: float) -> int:
+    bot.session = FakeTelegramSession()
+    print(f"=== {chats} chats x {taps} taps, handler {latency * 1000:g} ms (x0.2-1.8)")
+    await _run("sequential", 1, chats, taps, latency)
+    await _run("tasks", 0, chats, taps, latency)  # порядок не гарантовано - лише для порівняння
+    ok = True
+    for concurrency in levels:
+        ok &= await _run("executor", concurrency, chats, taps, latency)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--taps", type=int, default=5, help="оновлень поспіль від кожного чату")
+    parser.add_argument("--concurrency", default="1,4,16,64")
+    parser.add_argument("--handler-latency", type=float, default=0.05)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.chats, args.taps, [int(x) for x in args.concurrency.split(",")], args.handler_latency)))
@@ -0,0 +1,120 @@
+# /root/telegram-schedule-bot/benchmarks/bench_webhook.py
+# Режим webhook (bot/webhook.py) поверх bot/fake_telegram.py і bot/fake_sheets.py: справжній lifespan
+# і ендпоінт FastAPI-застосунку з bot/main.py викликаються напряму через ASGI, без мережі.
+# Для --users одночасних /start порівнює час відповіді Telegram'у, якби оновлення оброблялося
+# в самому запиті (dp.feed_update до відповіді), з відповіддю ендпоінта, що лише ставить оновлення в
+# чергу, і часом, за який bot/update_executor.py обробляє всю чергу. Перевіряє 401 на чужий секрет і 503 при
+# переповненні черги. Завершується з кодом 1, якщо статуси відповідей не ті або оновлення загубилися.
+#
+# Запуск з кореня проекту:
+#   python -m benchmarks.bench_webhook [--users 200] [--sheets-latency 0.02] [--telegram-latency 0.03] 2>/dev/null
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+os.environ["BOT_MODE"] = "webhook"
+os.environ["WEBHOOK_SECRET"] = "bench-secret"
+os.environ.pop("WEBHOOK_URL", None)
+
+from benchmarks.bench_booking_flow import _build_client, _percentiles  # noqa: E402 - задає тимчасові шляхи та BOT_TOKEN
+from bot import main as bot_main  # noqa: E402
+from bot.bot import bot, dp  # noqa: E402
+from bot.fake_sheets import install_fake_client  # noqa: E402
+from bot.fake_telegram import FakeTelegramSession, UpdateFactory  # noqa: E402
+from bot.sheets_scheduler import get_scheduler  # noqa: E402
+from bot.update_executor import UpdateExecutor, get_update_executor  # noqa: E402
+from bot.webhook import SECRET_HEADER, WEBHOOK_PATH  # noqa: E402
+
+
+async def _post(app, path: str, body: bytes, headers: dict) -> int:
+    """Один POST через ASGI-інтерфейс застосунку; повертає HTTP-статус."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()] + [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 0), "server": ("testserver", 80),
+    }
+    delivered = False
+    status = None
+
+    async def receive():
+        nonlocal delivered
+        if delivered:
+            return {"type": "http.disconnect"}
+        delivered = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await bot_main.app(scope, receive, send)
+    return status
+
+
+def _body(update) -> bytes:
+    return update.model_dump_json(by_alias=True, exclude_none=True).encode()
+
+
+async def _timed(coro):
+    started = time.perf_counter()
+    result = await coro
+    return time.perf_counter() - started, result
+
+
+async def main(users: int, sheets_latency: float, telegram_latency: float) -> int:
+    install_fake_client(_build_client(slots_per_day=24, latency=sheets_latency))
+    get_scheduler().configure(0, 0)
+    session = FakeTelegramSession(latency=telegram_latency)
+    bot.session = session
+    updates = UpdateFactory(bot_id=bot.id)
+    headers = {SECRET_HEADER: "bench-secret"}
+    failed = False
+
+    async with bot_main.lifespan(bot_main.app):
+        executor = get_update_executor(dp, bot)
+
+        inline = await asyncio.gather(*(_timed(dp.feed_update(bot, updates.message(10**6 + i, text="/start")))
+                                        for i in range(users)))
+        print(f"in-request processing : {users} updates, response {_percentiles([t for t, _ in inline])}")
+
+        telegram_before = session.calls["SendMessage"]
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(_timed(_post(bot_main.app, WEBHOOK_PATH, _body(updates.message(2 * 10**6 + i, text="/start")),
+                                                        headers)) for i in range(users)))
+        accepted = time.perf_counter() - started
+        await asyncio.wait_for(executor.join(), timeout=60)
+        drained = time.perf_counter() - started
+        statuses = {status for _, status in responses}
+        replies = session.calls["SendMessage"] - telegram_before
+        ok = statuses == {200} and replies >= users
+        failed |= not ok
+        print(f"webhook + queue       : {users} updates, response {_percentiles([t for t, _ in responses])}, "
+              f"all accepted in {accepted * 1000:.1f} ms, processed in {drained * 1000:.1f} ms, {replies} replies "
+              f"{'OK' if ok else 'FAIL'}")
+
+        bad = await _post(bot_main.app, WEBHOOK_PATH, _body(updates.message(3 * 10**6, text="/start")), {SECRET_HEADER: "wrong"})
+        failed |= bad != 401
+        print(f"wrong secret          : HTTP {bad} {'OK' if bad == 401 else 'FAIL'}")
+        print(f"executor stats        : {executor.executor_stats()}")
+
+        small = UpdateExecutor(dp, bot, max_pending=10)  # оновлення не встигають оброблятися між submit
+        rejected = sum(not small.submit(updates.message(4 * 10**6 + i, text="/start")) for i in range(50))
+        failed |= rejected != 40
+        print(f"overflow              : 50 updates into a queue of 10 -> {rejected} rejected with 503 "
+              f"{'OK' if rejected == 40 else 'FAIL'}")
+        await small.stop()  # до зупинки застосунку: прийняті оновлення ще пишуть у сховище станів
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--sheets-latency", type=float, default=0.02)
+    parser.add_argument("--telegram-latency", type=float, default=0.03)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.users, args.sheets_latency, args.telegram_latency)))
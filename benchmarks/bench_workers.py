@@ -0,0 +1,123 @@
+# /root/telegram-schedule-bot/benchmarks/bench_workers.py
+# Пропускна здатність сценарію запису в одному процесі (UpdateExecutor) і з BOT_WORKERS процесами
+# (bot/workers.py) поверх bot/fake_telegram.py і bot/fake_sheets.py. Цей процес - вхід оновлень
+# і власник сховища; --users користувачів проходять увесь сценарій на різні вільні слоти, а всі їхні
+# оновлення подаються одразу (порядок у межах чату тримає виконавець воркера). Друкує оновлень/с
+# і записів/с для кожної кількості воркерів. Приріст можливий лише до кількості ядер (os.cpu_count()).
+# Завершується з кодом 1, якщо хоч один запис не дійшов до 'заброньовано'.
+#
+# Модуль перевантажується в кожному процесі-воркері (spawn), тому на верхньому рівні - лише stdlib.
+#
+# Запуск з кореня проекту:
+#   python -m benchmarks.bench_workers [--workers 1,2,4,8] [--users 100] [--telegram-latency 0.0]
+#       [--sheets-latency 0.0] 2>/dev/null
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+
+def _use_fake_telegram(latency: float) -> None:
+    """Ініціалізатор воркера: Bot процесу-воркера говорить з FakeTelegramSession."""
+    from bot.bot import bot
+    from bot.fake_telegram import FakeTelegramSession
+
+    bot.session = FakeTelegramSession(latency=latency)
+
+
+def _booking_updates(factory, user_id: int, date_str: str, time_str: str) -> list:
+    """Оновлення одного користувача від /start до вибору месенджера на заданий слот."""
+    return [
+        factory.message(user_id, text="/start"),
+        factory.callback(user_id, "book_consultation"),
+        factory.message(user_id, text=f"Клієнт {user_id}"),
+        factory.callback(user_id, f"date_{date_str}"),
+        factory.callback(user_id, f"time_{time_str}"),
+        factory.message(user_id, text="Питання щодо договору оренди"),
+        factory.message(user_id, text=f"+380{user_id % 10**9:09d}"),
+        factory.callback(user_id, "messenger_telegram"),
+    ]
+
+
+async def _run(intake, storage, client, users: int, first_user: int, label: str) -> bool:
+    from benchmarks.bench_booking_flow import _drain, _refill_schedule
+    from bot.bot import bot
+    from bot.fake_telegram import UpdateFactory
+    from bot.google_sheets import STATUS_BOOKED
+
+    await _refill_schedule(storage, client)
+    snapshot = await storage.get_available_dates()
+    slots = [(date_str, time_str) for date_str in snapshot for time_str in snapshot[date_str]][:users]
+    factory = UpdateFactory(bot_id=bot.id)
+    per_user = [_booking_updates(factory, first_user + i, *slot) for i, slot in enumerate(slots)]
+    # Як з getUpdates: оновлення різних користувачів перемішані, кожного - по порядку
+    updates = [user_updates[step] for step in range(len(per_user[0])) for user_updates in per_user]
+
+    started = time.perf_counter()
+    for update in updates:
+        await intake.put(update)
+    await intake.join()
+    elapsed = time.perf_counter() - started
+    await _drain(storage)
+
+    booked = len(await storage.slots_with_status(STATUS_BOOKED))
+    ok = booked == len(slots)
+    print(f"{label:12s}: {len(updates) / elapsed:8.1f} updates/s, {booked / elapsed:7.1f} bookings/s, "
+          f"{booked}/{len(slots)} booked in {elapsed:.2f}s {'OK' if ok else 'FAIL'}")
+    return ok
+
+
+async def main(levels: list, users: int, telegram_latency: float, sheets_latency: float) -> int:
+    from benchmarks.bench_booking_flow import _build_client  # задає тимчасові шляхи та BOT_TOKEN
+    from bot.bot import bot, dp
+    from bot.fake_sheets import install_fake_client
+    from bot.fake_telegram import FakeTelegramSession
+    from bot.handlers import main_router
+    from bot.sheets_scheduler import get_scheduler
+    from bot.slot_holds import get_slot_holds
+    from bot.storage import get_storage
+    from bot.update_executor import UpdateExecutor
+    from bot.workers import WorkerPool
+
+    client = _build_client(slots_per_day=24, latency=sheets_latency)
+    install_fake_client(client)
+    get_scheduler().configure(0, 0)
+    bot.session = FakeTelegramSession(latency=telegram_latency)
+    dp.include_router(main_router)
+    storage = get_storage()
+    await storage.start()
+    slot_holds = get_slot_holds()
+    await slot_holds.start()
+    print(f"=== {users} users x 8 updates, {os.cpu_count()} CPU, telegram latency {telegram_latency * 1000:g}ms, "
+          f"sheets latency {sheets_latency * 1000:g}ms")
+
+    ok = True
+    try:
+        executor = UpdateExecutor(dp, bot)
+        ok &= await _run(executor, storage, client, users, 10**6, "in-process")
+        await executor.stop()
+        for level_no, workers in enumerate(levels):
+            pool = WorkerPool(workers, initializer=_use_fake_telegram, initargs=(telegram_latency,))
+            await pool.start(storage, slot_holds)
+            try:
+                ok &= await _run(pool, storage, client, users, (level_no + 2) * 10**6, f"{workers} workers")
+                print(f"{'':12s}  storage calls over IPC: {pool.executor_stats()['storage_calls']}")
+            finally:
+                await pool.stop()
+    finally:
+        await slot_holds.stop()
+        await storage.close()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4,8", help="кількості процесів-воркерів через кому")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--telegram-latency", type=float, default=0.0)
+    parser.add_argument("--sheets-latency", type=float, default=0.0)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main([int(n) for n in args.workers.split(",")], args.users, args.telegram_latency,
+                              args.sheets_latency)))
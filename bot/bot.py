@@ -6,6 +6,8 @@ import sys
 from dotenv import load_dotenv
 from aiogram import Bot, Dispatcher
 
+from .fsm_storage import create_fsm_storage
+
 # --- Загрузка конфигурации ---
 print("DEBUG [bot.py]: Попытка загрузить файл .env...", file=sys.stderr)
 
@@ -53,7 +55,7 @@ if not BOT_TOKEN:
 print("DEBUG [bot.py]: Попытка инициализации Bot и Dispatcher...", file=sys.stderr)
 try:
     bot = Bot(token=BOT_TOKEN)
-    dp = Dispatcher()
+    dp = Dispatcher(storage=create_fsm_storage())  # стани FSM переживають перезапуск (див. fsm_storage.py)
     print("DEBUG [bot.py]: Bot и Dispatcher успешно инициализированы.", file=sys.stderr)
 except Exception as e:
     error_message = f"КРИТИЧЕСКАЯ ОШИБКА [bot.py]: Не удалось инициализировать Bot/Dispatcher: {e}. Проверьте BOT_TOKEN."
@@ -0,0 +1,378 @@
+# /root/telegram-schedule-bot/bot/fake_sheets.py
+# Локальна заміна Google Sheets для тестів та бенчмарків.
+# Реалізує ту частину API gspread (Client / Spreadsheet / Worksheet), яку використовує бот,
+# з налаштовуваною затримкою, часткою помилок 5xx та відповідями 429 (перевищення квоти).
+# Кожна "мережева" операція проходить через FakeHTTPClient.request(), тож її можна
+# порахувати, загальмувати або обгорнути так само, як справжній gspread.HTTPClient.
+#
+# Приклад:
+#   from bot import google_sheets
+#   from bot.fake_sheets import FakeClient, install_fake_client
+#   client = FakeClient(latency=0.05)
+#   client.create_spreadsheet(google_sheets.SPREADSHEET_NAME, {
+#       google_sheets.SCHEDULE_WORKSHEET_NAME: [["Дата", "Час", "Статус"], ["01.01.2030", "10:00", "вільно"]],
+#   })
+#   install_fake_client(client)
+
+import random
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import gspread
+from gspread.cell import Cell
+from gspread.utils import a1_to_rowcol, numericise_all, rowcol_to_a1
+
+from . import google_sheets
+from .sheets_scheduler import install_scheduler
+
+_A1_PART_RE = re.compile(r"^([A-Za-z]*)(\d*)$")
+
+
+class FakeResponse:
+    """Мінімальна відповідь, достатня для конструктора gspread.exceptions.APIError."""
+
+    def __init__(self, code: int, message: str):
+        self.status_code = code
+        self.text = message
+        self._payload = {"error": {"code": code, "message": message, "status": "FAKE"}}
+
+    def json(self):
+        return self._payload
+
+
+def make_api_error(code: int, message: str) -> gspread.exceptions.APIError:
+    return gspread.exceptions.APIError(FakeResponse(code, message))
+
+
+class FakeHTTPClient:
+    """Імітація мережевого рівня: затримка, помилки та лічильники викликів."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 quota_error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota_error_rate = quota_error_rate
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def request(self, method: str, endpoint: str, **kwargs):
+        with self._lock:
+            self.calls[endpoint] += 1
+            roll = self._random.random()
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if roll < self.quota_error_rate:
+            raise make_api_error(429, "Quota exceeded for quota metric 'Read requests' (fake)")
+        if roll < self.quota_error_rate + self.error_rate:
+            raise make_api_error(503, "The service is currently unavailable (fake)")
+        return None
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.calls.clear()
+
+
+def _parse_a1_range(range_name: str):
+    """'A2:C10' -> (2, 1, 10, 3); відкриті межі ('A5:J', 'A:C') повертаються як None."""
+    if "!" in range_name:
+        range_name = range_name.split("!", 1)[1]
+    start, _, end = range_name.partition(":")
+    end = end or start
+    bounds = []
+    for part in (start, end):
+        match = _A1_PART_RE.match(part)
+        if not match:
+            raise make_api_error(400, f"Unable to parse range: {range_name}")
+        letters, digits = match.groups()
+        col = a1_to_rowcol(f"{letters}1")[1] if letters else None
+        row = int(digits) if digits else None
+        bounds.append((row, col))
+    (r1, c1), (r2, c2) = bounds
+    return r1 or 1, c1 or 1, r2, c2
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet: "FakeSpreadsheet", sheet_id: int, title: str, rows: List[List[str]]):
+        self.spreadsheet = spreadsheet
+        self.client = spreadsheet.client
+        self.id = sheet_id
+        self.title = title
+        self._rows = [[str(v) for v in row] for row in rows]
+
+    # --- службові методи ---
+
+    def _api(self, method: str, endpoint: str) -> None:
+        self.client.http_client.request(method, endpoint)
+
+    @property
+    def _lock(self):
+        return self.spreadsheet.lock
+
+    @property
+    def row_count(self) -> int:
+        return max(len(self._rows), 1000)
+
+    @property
+    def col_count(self) -> int:
+        return max([len(r) for r in self._rows] + [26])
+
+    def _cell_value(self, row: int, col: int) -> str:
+        if row - 1 < len(self._rows) and col - 1 < len(self._rows[row - 1]):
+            return self._rows[row - 1][col - 1]
+        return ""
+
+    def _set_value(self, row: int, col: int, value) -> None:
+        while len(self._rows) < row:
+            self._rows.append([])
+        target = self._rows[row - 1]
+        while len(target) < col:
+            target.append("")
+        target[col - 1] = "" if value is None else str(value)
+
+    def _read_range(self, range_name: str) -> List[List[str]]:
+        r1, c1, r2, c2 = _parse_a1_range(range_name)
+        r2 = r2 or len(self._rows)
+        result = []
+        for row_idx in range(r1, r2 + 1):
+            if row_idx - 1 >= len(self._rows):
+                break
+            row = self._rows[row_idx - 1]
+            last_col = c2 or len(row)
+            values = row[c1 - 1:last_col]
+            while values and values[-1] == "":
+                values.pop()
+            result.append(values)
+        while result and not result[-1]:
+            result.pop()
+        return result
+
+    def _write_range(self, range_name: str, values: List[List]) -> None:
+        r1, c1, _, _ = _parse_a1_range(range_name)
+        for dr, row in enumerate(values):
+            for dc, value in enumerate(row):
+                self._set_value(r1 + dr, c1 + dc, value)
+
+    def _append(self, values: List[List]) -> dict:
+        start = len(self._rows) + 1
+        for row in values:
+            self._rows.append(["" if v is None else str(v) for v in row])
+        end = len(self._rows)
+        width = max([len(r) for r in values] + [1])
+        updated_range = f"'{self.title}'!A{start}:{rowcol_to_a1(end, width)}"
+        return {"updates": {"updatedRange": updated_range, "updatedRows": len(values)}}
+
+    # --- читання ---
+
+    def get_all_values(self, **kwargs) -> List[List[str]]:
+        self._api("GET", "values.get")
+        with self._lock:
+            width = max([len(r) for r in self._rows] + [0])
+            return [row + [""] * (width - len(row)) for row in self._rows]
+
+    def get_all_records(self, head: int = 1, **kwargs) -> List[dict]:
+        self._api("GET", "values.get")
+        with self._lock:
+            if len(self._rows) < head:
+                return []
+            header = self._rows[head - 1]
+            records = []
+            for row in self._rows[head:]:
+                padded = row + [""] * (len(header) - len(row))
+                records.append(dict(zip(header, numericise_all(padded[:len(header)]))))
+            return records
+
+    def row_values(self, row: int, **kwargs) -> List[str]:
+        self._api("GET", "values.get")
+        with self._lock:
+            values = list(self._rows[row - 1]) if row - 1 < len(self._rows) else []
+            while values and values[-1] == "":
+                values.pop()
+            return values
+
+    def col_values(self, col: int, **kwargs) -> List[str]:
+        self._api("GET", "values.get")
+        with self._lock:
+            values = [self._cell_value(r, col) for r in range(1, len(self._rows) + 1)]
+            while values and values[-1] == "":
+                values.pop()
+            return values
+
+    def cell(self, row: int, col: int, **kwargs) -> Cell:
+        self._api("GET", "values.get")
+        with self._lock:
+            return Cell(row, col, self._cell_value(row, col))
+
+    def acell(self, label: str, **kwargs) -> Cell:
+        return self.cell(*a1_to_rowcol(label))
+
+    def find(self, query, in_row: Optional[int] = None, in_column: Optional[int] = None,
+             case_sensitive: bool = True) -> Optional[Cell]:
+        self._api("GET", "values.get")
+        with self._lock:
+            for row_idx, row in enumerate(self._rows, start=1):
+                if in_row is not None and row_idx != in_row:
+                    continue
+                for col_idx, value in enumerate(row, start=1):
+                    if in_column is not None and col_idx != in_column:
+                        continue
+                    if (value == query) if case_sensitive else (value.lower() == str(query).lower()):
+                        return Cell(row_idx, col_idx, value)
+            return None
+
+    def get(self, range_name: Optional[str] = None, **kwargs) -> List[List[str]]:
+        self._api("GET", "values.get")
+        with self._lock:
+            if range_name is None:
+                return [list(r) for r in self._rows]
+            return self._read_range(range_name)
+
+    def batch_get(self, ranges, **kwargs) -> List[List[List[str]]]:
+        self._api("GET", "values.batchGet")
+        with self._lock:
+            return [self._read_range(r) for r in ranges]
+
+    # --- запис ---
+
+    def update_cell(self, row: int, col: int, value) -> dict:
+        self._api("PUT", "values.update")
+        with self._lock:
+            self._set_value(row, col, value)
+        return {"updatedCells": 1}
+
+    def update_acell(self, label: str, value) -> dict:
+        row, col = a1_to_rowcol(label)
+        return self.update_cell(row, col, value)
+
+    def update(self, values=None, range_name: Optional[str] = None, **kwargs) -> dict:
+        # gspread 6: update(values, range_name); допускаємо і старий порядок аргументів
+        if isinstance(values, str):
+            values, range_name = range_name, values
+        self._api("PUT", "values.update")
+        with self._lock:
+            self._write_range(range_name or "A1", values)
+        return {"updatedRange": range_name}
+
+    def batch_update(self, data, **kwargs) -> dict:
+        self._api("POST", "values.batchUpdate")
+        with self._lock:
+            for item in data:
+                self._write_range(item["range"], item["values"])
+        return {"totalUpdatedCells": sum(len(r) for item in data for r in item["values"])}
+
+    def append_row(self, values: List, **kwargs) -> dict:
+        self._api("POST", "values.append")
+        with self._lock:
+            return self._append([values])
+
+    def append_rows(self, values: List[List], **kwargs) -> dict:
+        self._api("POST", "values.append")
+        with self._lock:
+            return self._append(values)
+
+
+class FakeSpreadsheet:
+    def __init__(self, client: "FakeClient", title: str, key: str):
+        self.client = client
+        self.title = title
+        self.id = key
+        self.lock = threading.RLock()
+        self._worksheets: Dict[str, FakeWorksheet] = {}
+        self._next_sheet_id = 1
+
+    def add_worksheet(self, title: str, rows: Optional[List[List[str]]] = None, **kwargs) -> FakeWorksheet:
+        with self.lock:
+            sheet = FakeWorksheet(self, self._next_sheet_id, title, rows or [])
+            self._next_sheet_id += 1
+            self._worksheets[title] = sheet
+            return sheet
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self.client.http_client.request("GET", "spreadsheets.get")
+        with self.lock:
+            if title not in self._worksheets:
+                raise gspread.exceptions.WorksheetNotFound(title)
+            return self._worksheets[title]
+
+    def worksheets(self) -> List[FakeWorksheet]:
+        self.client.http_client.request("GET", "spreadsheets.get")
+        with self.lock:
+            return list(self._worksheets.values())
+
+    def batch_update(self, body: dict) -> dict:
+        """Підтримується лише запит findReplace з matchEntireCell (атомарно в межах одного виклику)."""
+        self.client.http_client.request("POST", "spreadsheets.batchUpdate")
+        replies = []
+        with self.lock:
+            for request in body.get("requests", []):
+                if "findReplace" not in request:
+                    raise make_api_error(400, f"Unsupported fake request: {list(request)}")
+                replies.append({"findReplace": self._find_replace(request["findReplace"])})
+        return {"spreadsheetId": self.id, "replies": replies}
+
+    def _find_replace(self, spec: dict) -> dict:
+        grid = spec["range"]
+        sheet = next(ws for ws in self._worksheets.values() if ws.id == grid["sheetId"])
+        find = spec["find"]
+        match_case = spec.get("matchCase", False)
+        changed = 0
+        for row in range(grid["startRowIndex"] + 1, grid["endRowIndex"] + 1):
+            for col in range(grid["startColumnIndex"] + 1, grid["endColumnIndex"] + 1):
+                value = sheet._cell_value(row, col)
+                matches = value == find if match_case else value.lower() == find.lower()
+                if spec.get("matchEntireCell") and matches:
+                    sheet._set_value(row, col, spec["replacement"])
+                    changed += 1
+        return {"occurrencesChanged": changed, "valuesChanged": changed}
+
+
+class FakeClient:
+    """Замінник gspread.Client. Таблиці створюються через create_spreadsheet()."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 quota_error_rate: float = 0.0, seed: Optional[int] = None):
+        self.http_client = FakeHTTPClient(latency, jitter, error_rate, quota_error_rate, seed)
+        self._spreadsheets: Dict[str, FakeSpreadsheet] = {}
+
+    def create_spreadsheet(self, title: str, worksheets: Dict[str, List[List[str]]]) -> FakeSpreadsheet:
+        spreadsheet = FakeSpreadsheet(self, title, key=f"fake-{len(self._spreadsheets) + 1}")
+        for name, rows in worksheets.items():
+            spreadsheet.add_worksheet(name, rows)
+        self._spreadsheets[spreadsheet.id] = spreadsheet
+        return spreadsheet
+
+    def open(self, title: str) -> FakeSpreadsheet:
+        self.http_client.request("GET", "drive.files.list")
+        for spreadsheet in self._spreadsheets.values():
+            if spreadsheet.title == title:
+                return spreadsheet
+        raise gspread.exceptions.SpreadsheetNotFound(title)
+
+    def open_by_key(self, key: str) -> FakeSpreadsheet:
+        self.http_client.request("GET", "spreadsheets.get")
+        if key not in self._spreadsheets:
+            raise gspread.exceptions.SpreadsheetNotFound(key)
+        return self._spreadsheets[key]
+
+    @property
+    def calls(self) -> Counter:
+        return self.http_client.calls
+
+
+def install_fake_client(client: FakeClient) -> None:
+    """Підміняє клієнт gspread у google_sheets.py та скидає всі кеші, що залежать від нього."""
+    install_scheduler(client)
+    google_sheets._CLIENT = client
+    google_sheets.invalidate_worksheet_registry()
+    google_sheets.invalidate_schedule_cache()
+    google_sheets.invalidate_client_directory()
+    google_sheets.invalidate_bookings_index()
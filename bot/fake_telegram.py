@@ -0,0 +1,145 @@
+# /root/telegram-schedule-bot/bot/fake_telegram.py
+# Локальна заміна Telegram Bot API для бенчмарків.
+# FakeTelegramSession підставляється замість bot.session: запити не йдуть у мережу,
+# а повертають правдоподібні відповіді (Message / True) з налаштовуваною затримкою.
+# Сесія запам'ятовує останню inline-клавіатуру в кожному чаті, тож імітований користувач
+# може "натискати" кнопки, які бот йому реально показав. Як і справжній Telegram, редагування без змін
+# тексту й розмітки відхиляється помилкою "message is not modified". UpdateFactory будує вхідні оновлення.
+#
+# Приклад:
+#   from bot.bot import bot, dp
+#   from bot.fake_telegram import FakeTelegramSession, UpdateFactory
+#   bot.session = FakeTelegramSession(latency=0.03)
+#   updates = UpdateFactory()
+#   await dp.feed_update(bot, updates.message(user_id=1, text="/start"))
+
+import asyncio
+import itertools
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, Chat, Contact, InlineKeyboardMarkup, Message, Update, User
+
+
+class FakeTelegramSession(BaseSession):
+    """Сесія aiogram без мережі: рахує виклики API та відповідає одразу (або з latency)."""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls = Counter()
+        self._message_ids = itertools.count(1_000_000)
+        self._keyboards: Dict[int, Tuple[int, InlineKeyboardMarkup]] = {}
+        self._texts: Dict[Tuple[int, int], Optional[str]] = {}  # (чат, повідомлення) -> поточний текст
+        self.not_modified = 0
+
+    async def make_request(self, bot, method, timeout: Optional[int] = None):
+        self.calls[type(method).__name__] += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+        chat_id = getattr(method, "chat_id", None)
+        message_id = getattr(method, "message_id", None)
+        markup = getattr(method, "reply_markup", None)
+        is_edit = type(method).__name__.startswith("EditMessage")
+        text = getattr(method, "text", None)
+        if is_edit and (chat_id, message_id) in self._texts:
+            current_markup = self._keyboards[chat_id][1] if self._keyboards.get(chat_id, (None,))[0] == message_id else None
+            if self._texts[(chat_id, message_id)] == text and current_markup == markup:
+                self.not_modified += 1
+                raise TelegramBadRequest(method=method, message="Bad Request: message is not modified")
+        if is_edit:
+            if chat_id in self._keyboards and self._keyboards[chat_id][0] == message_id:
+                if isinstance(markup, InlineKeyboardMarkup):
+                    self._keyboards[chat_id] = (message_id, markup)
+                else:
+                    del self._keyboards[chat_id]
+        else:
+            message_id = next(self._message_ids)
+            if isinstance(markup, InlineKeyboardMarkup):
+                self._keyboards[chat_id] = (message_id, markup)
+        if chat_id is not None and message_id is not None:
+            self._texts[(chat_id, message_id)] = text
+
+        returning = getattr(method, "__returning__", bool)
+        if returning is Message or Message in getattr(returning, "__args__", ()):
+            return Message(
+                message_id=message_id,
+                date=datetime.now(),
+                chat=Chat(id=chat_id or 0, type="private"),
+                text=text,
+                reply_markup=markup if isinstance(markup, InlineKeyboardMarkup) else None,
+            ).as_(bot)
+        return True
+
+    async def stream_content(self, url: str, headers=None, timeout: int = 30, chunk_size: int = 65536, raise_for_status: bool = True):
+        raise NotImplementedError("FakeTelegramSession не завантажує файли")
+        yield b""  # pragma: no cover - робить метод async-генератором
+
+    async def close(self) -> None:
+        pass
+
+    def keyboard(self, chat_id: int) -> Tuple[Optional[int], List[str]]:
+        """(message_id, [callback_data кнопок]) останньої inline-клавіатури в чаті."""
+        if chat_id not in self._keyboards:
+            return None, []
+        message_id, markup = self._keyboards[chat_id]
+        return message_id, [button.callback_data for row in markup.inline_keyboard for button in row if button.callback_data]
+
+    def message(self, chat_id: int) -> Tuple[Optional[int], Optional[str], Optional[InlineKeyboardMarkup]]:
+        """(message_id, текст, inline-клавіатура) останнього повідомлення з клавіатурою в чаті - як його бачить користувач."""
+        if chat_id not in self._keyboards:
+            return None, None, None
+        message_id, markup = self._keyboards[chat_id]
+        return message_id, self._texts.get((chat_id, message_id)), markup
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+
+class UpdateFactory:
+    """Будує вхідні оновлення Telegram від імені приватних користувачів."""
+
+    def __init__(self, bot_id: int = 0):
+        self.bot_id = bot_id
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    @staticmethod
+    def user(user_id: int) -> User:
+        return User(id=user_id, is_bot=False, first_name=f"User {user_id}", username=f"user{user_id}")
+
+    def message(self, user_id: int, text: Optional[str] = None, phone_number: Optional[str] = None) -> Update:
+        user = self.user(user_id)
+        contact = Contact(phone_number=phone_number, first_name=user.first_name, user_id=user_id) if phone_number else None
+        return Update(update_id=next(self._update_ids), message=Message(
+            message_id=next(self._message_ids),
+            date=datetime.now(),
+            chat=Chat(id=user_id, type="private"),
+            from_user=user,
+            text=text,
+            contact=contact,
+        ))
+
+    def callback(self, user_id: int, data: str, message_id: Optional[int] = None, text: Optional[str] = None,
+                 reply_markup: Optional[InlineKeyboardMarkup] = None) -> Update:
+        update_id = next(self._update_ids)
+        message = Message(
+            message_id=message_id or next(self._message_ids),
+            date=datetime.now(),
+            chat=Chat(id=user_id, type="private"),
+            from_user=User(id=self.bot_id, is_bot=True, first_name="Bot"),
+            text=text or "",
+            reply_markup=reply_markup,
+        )
+        return Update(update_id=update_id, callback_query=CallbackQuery(
+            id=str(update_id),
+            from_user=self.user(user_id),
+            chat_instance=str(user_id),
+            data=data,
+            message=message,
+        ))
@@ -0,0 +1,199 @@
+# /root/telegram-schedule-bot/bot/fsm_storage.py
+# Постійне сховище станів FSM aiogram. Стандартне MemoryStorage губить усіх, хто посеред запису,
+# при кожному перезапуску (часто вже з утриманим слотом), і його не можна поділити між процесами.
+# SqliteFsmStorage тримає стани в SQLite, а перед базою - обмежений LRU-кеш у пам'яті:
+#   - читання (get_state/get_data на кожне оновлення) йдуть з кешу, у базу - лише при промаху;
+#   - записи (set_state, кілька update_data на один крок сценарію) лише позначають ключ "брудним",
+#     а через FSM_FLUSH_DELAY усі брудні ключі записуються однією транзакцією - кілька змін
+#     одного користувача зливаються в один рядок. При аварійному завершенні втрачається не більше
+#     ніж FSM_FLUSH_DELAY останніх змін; close() (shutdown Dispatcher) записує все.
+# Сховище обирається змінною FSM_STORAGE: sqlite (за замовчуванням) або memory.
+# Кеш і відкладений запис коректні лише тоді, коли файл FSM_STORAGE_PATH відкрито одним процесом:
+# інші процеси читали б застарілі стани і перезаписували б чужі зміни. Тому файл займається
+# ексклюзивним замком (FSM_STORAGE_PATH.lock), і другий процес на тому самому шляху не стартує з
+# RuntimeError. Кілька процесів бота - через BOT_WORKERS (workers.py, у кожного воркера свій файл),
+# а не кілька воркерів uvicorn з одним FSM_STORAGE_PATH.
+
+import asyncio
+import fcntl
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FSM_STORAGE = os.getenv("FSM_STORAGE", "sqlite").strip().lower()
+FSM_STORAGE_PATH = os.getenv("FSM_STORAGE_PATH", os.path.join(_PROJECT_ROOT, "fsm_storage.sqlite3"))
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))  # користувачів у LRU-кеші
+FSM_FLUSH_DELAY = float(os.getenv("FSM_FLUSH_DELAY", "0.2"))  # секунд між першою зміною і записом пачки
+
+
+class SqliteFsmStorage(BaseStorage):
+    """Стани FSM у SQLite з LRU-кешем і відкладеним пакетним записом. Використовується лише з event loop."""
+
+    def __init__(self, path: str = FSM_STORAGE_PATH, cache_size: int = FSM_CACHE_SIZE, flush_delay: float = FSM_FLUSH_DELAY):
+        self.path = path
+        self.cache_size = cache_size
+        self.flush_delay = flush_delay
+        self._key_builder = DefaultKeyBuilder(with_bot_id=True, with_business_connection_id=True, with_destiny=True)
+        self._cache: OrderedDict = OrderedDict()  # ключ -> [стан, дані]; найдавніше використаний - першим
+        self._dirty = set()
+        self._flush_handle = None
+        self.stats = Counter()  # 'hits', 'misses', 'changes', 'rows_written', 'flushes'
+        self._lock_file = open(f"{path}.lock", "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise RuntimeError(
+                f"Файл станів FSM '{path}' вже використовує інший процес. SqliteFsmStorage кешує стани в пам'яті "
+                f"і не підтримує кілька процесів на одному файлі: задайте кожному процесу свій FSM_STORAGE_PATH "
+                f"або запускайте один процес з BOT_WORKERS."
+            ) from None
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            " key TEXT PRIMARY KEY,"
+            " state TEXT,"
+            " data TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS fsm_updated_at ON fsm (updated_at)")
+
+    # --- кеш ---
+
+    def _entry(self, key: StorageKey) -> list:
+        storage_key = self._key_builder.build(key)
+        entry = self._cache.get(storage_key)
+        if entry is not None:
+            self._cache.move_to_end(storage_key)
+            self.stats["hits"] += 1
+            return entry
+        self.stats["misses"] += 1
+        row = self._conn.execute("SELECT state, data FROM fsm WHERE key = ?", (storage_key,)).fetchone()
+        entry = [row[0], json.loads(row[1])] if row else [None, {}]
+        self._cache[storage_key] = entry
+        if len(self._cache) > self.cache_size:
+            if next(iter(self._cache)) in self._dirty:
+                self._flush()  # брудні записи не можна витісняти до запису в базу - пишемо всю пачку наперед
+            while len(self._cache) > self.cache_size and next(iter(self._cache)) not in self._dirty:
+                self._cache.popitem(last=False)
+        return entry
+
+    def _changed(self, key: StorageKey) -> None:
+        self._dirty.add(self._key_builder.build(key))
+        self.stats["changes"] += 1
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_delay, self._flush)
+
+    def _flush(self) -> None:
+        """Одна транзакція на всі зміни з попереднього запису; порожні стани видаляються з бази."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._dirty:
+            return
+        now = time.time()
+        upserts, deletes = [], []
+        for storage_key in self._dirty:
+            state, data = self._cache[storage_key]
+            if state is None and not data:
+                deletes.append((storage_key,))
+            else:
+                upserts.append((storage_key, state, json.dumps(data, ensure_ascii=False), now))
+        try:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT INTO fsm (key, state, data, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET state = excluded.state, data = excluded.data, updated_at = excluded.updated_at",
+                upserts
+            )
+            self._conn.executemany("DELETE FROM fsm WHERE key = ?", deletes)
+            self._conn.execute("COMMIT")
+        except Exception as e:
+            self._conn.execute("ROLLBACK")
+            print(f"ПОМИЛКА [fsm_storage.py]: Не вдалося записати {len(self._dirty)} станів FSM ({type(e).__name__}: {e}), "
+                  f"повтор через {self.flush_delay:g} с.", file=sys.stderr)
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_delay, self._flush)
+            return
+        self.stats["rows_written"] += len(self._dirty)
+        self.stats["flushes"] += 1
+        self._dirty.clear()
+
+    # --- BaseStorage ---
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self._entry(key)[0] = state.state if isinstance(state, State) else state
+        self._changed(key)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return self._entry(key)[0]
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise ValueError(f"Data must be a dict, got {type(data).__name__}")
+        self._entry(key)[1] = data.copy()
+        self._changed(key)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return self._entry(key)[1].copy()
+
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        entry = self._entry(key)
+        entry[1] = {**entry[1], **data}
+        self._changed(key)
+        return entry[1].copy()
+
+    async def close(self) -> None:
+        self._flush()
+        self._conn.close()
+        self._lock_file.close()  # знімає замок файлу
+
+    # --- зняття покинутих сесій (session_reaper.py) ---
+
+    def forget(self, keys: List[StorageKey]) -> None:
+        """Видаляє стани з кешу і бази однією транзакцією."""
+        storage_keys = [self._key_builder.build(key) for key in keys]
+        for storage_key in storage_keys:
+            self._cache.pop(storage_key, None)
+            self._dirty.discard(storage_key)
+        self._conn.execute("BEGIN")
+        self._conn.executemany("DELETE FROM fsm WHERE key = ?", [(k,) for k in storage_keys])
+        self._conn.execute("COMMIT")
+
+    def prune_idle(self, older_than: float, keep: Iterable[StorageKey] = ()) -> int:
+        """
+        Видаляє з бази стани, не змінені з older_than (лишилися з минулих запусків або випали з кешу),
+        крім присутніх у кеші та в keep - сесій, які ще читаються, хоч і не змінюються.
+        """
+        keep_keys = {self._key_builder.build(key) for key in keep}
+        self._conn.execute("BEGIN")
+        stale = [key for (key,) in self._conn.execute("SELECT key FROM fsm WHERE updated_at < ?", (older_than,))
+                 if key not in self._cache and key not in keep_keys]
+        self._conn.executemany("DELETE FROM fsm WHERE key = ?", [(k,) for k in stale])
+        self._conn.execute("COMMIT")
+        return len(stale)
+
+    def fsm_stats(self) -> dict:
+        return {"cached": len(self._cache), "dirty": len(self._dirty), **self.stats}
+
+
+def create_fsm_storage() -> BaseStorage:
+    """Сховище станів для Dispatcher, обране FSM_STORAGE."""
+    if FSM_STORAGE == "memory":
+        storage = MemoryStorage()
+    else:
+        if FSM_STORAGE != "sqlite":
+            print(f"ПОПЕРЕДЖЕННЯ [fsm_storage.py]: Невідомий FSM_STORAGE='{FSM_STORAGE}', використовую 'sqlite'.", file=sys.stderr)
+        storage = SqliteFsmStorage()
+    print(f"INFO [fsm_storage.py]: Сховище станів FSM: {type(storage).__name__}.", file=sys.stderr)
+    return storage
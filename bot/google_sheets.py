@@ -6,8 +6,23 @@ from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime, date, timedelta, timezone  # Додано timezone
 import sys  # Для логування в stderr
 import os  # Потрібен для перевірки шляху
-import copy
+import re
+import socket
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import NamedTuple
 import pytz  # <<< ДОДАЙТЕ ЦЕЙ ІМПОРТ
+from gspread.utils import rowcol_to_a1
+
+from .single_flight import SingleFlight
+from .sheet_tail_sync import AppendOnlySheetMirror
+from .schedule_rows import ScheduleRowMap
+from .schedule_snapshot import ScheduleSnapshot
+from .sheets_registry import SheetSchema, WorksheetRegistry, verify_header
+from .sheets_scheduler import install_scheduler
+from .slots import Slot, format_minute, normalize_time_str, now_position, parse_day, parse_minute, parse_slot
 
 # --- Налаштування ---
 KYIV_TZ = pytz.timezone('Europe/Kiev')  # <<< ЧАСОВИЙ ПОЯС КИЄВА
@@ -15,6 +30,8 @@ KYIV_TZ = pytz.timezone('Europe/Kiev')  # <<< ЧАСОВИЙ ПОЯС КИЄВА
 SERVICE_ACCOUNT_FILE = 'creds.json'
 # Переконайтесь, що назви таблиці та аркушів ТОЧНО відповідають вашим у Google Sheets
 SPREADSHEET_NAME = "ClientRequests"
+# Ключ таблиці (з URL). Якщо не заданий, таблиця один раз шукається за назвою SPREADSHEET_NAME
+SPREADSHEET_KEY = os.getenv("SPREADSHEET_KEY")
 SCHEDULE_WORKSHEET_NAME = "Графік"
 REQUESTS_WORKSHEET_NAME = "Заявки"  # Потрібно для збереження запитів
 
@@ -24,7 +41,13 @@ TIME_COLUMN = 'Час'
 STATUS_COLUMN = 'Статус'
 STATUS_FREE = 'вільно'  # Статус вільного часу (у нижньому регістрі для порівняння)
 STATUS_BOOKED = 'Заброньовано'  # Статус для оновлення
+STATUS_HELD = 'Утримується'  # Слот обрано, бронювання ще не підтверджене (див. slot_holds.py)
 STATUS_CANCELLED_BY_USER_IN_SCHEDULE = 'Вільно (скасовано клієнтом)' # Новий статус для Графіка
+# Необов'язкова колонка "Графіка" для кількох екземплярів бота: лічильник змін слота та хто змінив останнім
+# ('7:host:pid'). Якщо вона є, зміна статусу робиться умовно (compare-and-set, див. _compare_and_set_slot).
+SLOT_VERSION_COLUMN = 'Версія'
+BOT_INSTANCE_ID = os.getenv("BOT_INSTANCE_ID") or f"{socket.gethostname()}:{os.getpid()}"
+SLOT_CAS_ATTEMPTS = 3
 
 # Очікувані назви стовпців в аркуші "Заявки" (для пошуку та оновлення)
 # Ці імена мають ТОЧНО відповідати заголовкам у вашому файлі Google Sheet "Заявки"
@@ -36,8 +59,34 @@ REQUEST_DATE_COLUMN = 'Дата'      # Назва колонки з датою
 REQUEST_TIME_COLUMN = 'Час'       # Назва колонки з часом запису в аркуші "Заявки"
 REQUEST_STATUS_COLUMN = 'Статус Заявки' # Нова колонка для статусу заявки, напр. "Активна", "Скасовано клієнтом"
 REQUEST_QUESTION_COLUMN = 'Питання'
+# Необов'язкова колонка "Заявок": ключ доставки з журналу заявок (requests_journal.py). Якщо вона є,
+# заявку, яка вже дійшла до таблиці, але не встигла позначитися доставленою (збій або таймаут після
+# append), не буде дописано вдруге. Без неї доставка at-least-once і дублікати можливі.
+REQUEST_DELIVERY_KEY_COLUMN = 'Ключ доставки'
 
 CLIENTS_WORKSHEET_NAME = "Клиенты"  # Новая константа
+# Колонки аркуша "Клиенты" задані позиціями (заголовки там не використовуються)
+CLIENT_ID_COLUMN = 'user_id'
+CLIENT_USERNAME_COLUMN = 'username'
+CLIENT_NAME_COLUMN = 'name'
+CLIENT_CREATED_COLUMN = 'created'
+CLIENT_UPDATED_COLUMN = 'updated'
+
+# Схеми аркушів для реєстру (sheets_registry.py)
+SHEET_SCHEMAS = {
+    SCHEDULE_WORKSHEET_NAME: SheetSchema(required=(DATE_COLUMN, TIME_COLUMN, STATUS_COLUMN), optional=(SLOT_VERSION_COLUMN,)),
+    REQUESTS_WORKSHEET_NAME: SheetSchema(
+        required=(REQUEST_USER_ID_COLUMN, REQUEST_DATE_COLUMN, REQUEST_TIME_COLUMN),
+        optional=(REQUEST_STATUS_COLUMN, REQUEST_QUESTION_COLUMN, REQUEST_DELIVERY_KEY_COLUMN),
+    ),
+    CLIENTS_WORKSHEET_NAME: SheetSchema(positional={
+        CLIENT_ID_COLUMN: 1,
+        CLIENT_USERNAME_COLUMN: 2,
+        CLIENT_NAME_COLUMN: 3,
+        CLIENT_CREATED_COLUMN: 4,
+        CLIENT_UPDATED_COLUMN: 5,
+    }),
+}
 
 # !!! ВАЖЛИВО: Вкажіть ТОЧНИЙ формат дати, який використовується у вашому стовпці 'Дата' в Google Sheets !!!
 DATE_FORMAT_IN_SHEET = "%d.%m.%Y"
@@ -46,83 +95,210 @@ DATE_FORMAT_IN_SHEET = "%d.%m.%Y"
 SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
 
 # --- Налаштування Кешу ---
-_CACHED_SCHEDULE_DATA = None
+_CACHED_SCHEDULE_DATA = None  # ScheduleSnapshot - спільний незмінний об'єкт, копії не потрібні
+_SCHEDULE_VERSION = 0  # монотонно зростає з кожним новим знімком
 _LAST_SCHEDULE_FETCH_TIME = None
 CACHE_TTL = timedelta(minutes=5)
 
+# --- Індекс слотів "Графіка": ('дата', 'HH:MM') -> [номер рядка, статус] ---
+_SLOT_INDEX = {}
+# --- Вікно читання "Графіка" (schedule_rows.py) ---
+BOOKING_HORIZON_DAYS = 7  # на скільки днів уперед показуються вільні слоти
+# Раз на стільки секунд аркуш читається повністю (правки адвоката поза вікном, перевірка мапи рядків)
+SCHEDULE_FULL_RELOAD_SECONDS = float(os.getenv("SCHEDULE_FULL_RELOAD_SECONDS", "3600"))
+_SCHEDULE_ROWS = None  # ScheduleRowMap після першого повного читання
+_SCHEDULE_FULL_READ_AT = None  # time.monotonic() останнього повного читання
+_SCHEDULE_LOAD_LOCK = threading.Lock()  # повне і часткове читання не перетинаються
+_SCHEDULE_READ_STATS = Counter()  # 'full', 'window', 'stale_row_map', 'full_rows', 'window_rows'
+# Один замок на кеш дат, індекс слотів та журнал локальних змін слотів
+_SCHEDULE_LOCK = threading.RLock()
+
+# --- Фонове оновлення (stale-while-revalidate) ---
+# Поки фоновий оновлювач активний, застарілий кеш віддається одразу, а перечитування
+# відбувається у фоні. Локальні зміни слотів (бронювання/скасування) латають кеш на місці;
+# вони ж запам'ятовуються, щоб знімок, прочитаний до зміни, не "відкотив" її.
+_BACKGROUND_REFRESH_ACTIVE = False
+_REFRESH_WAKEUP = None  # callable без аргументів, будить фоновий оновлювач
+_RECENT_SLOT_PATCHES = {}  # ('дата', 'HH:MM') -> (статус, time.monotonic() моменту зміни)
+SLOT_PATCH_RETENTION_SECONDS = 600
+
+# --- Об'єднання одночасних однакових читань (графік, ім'я клієнта, бронювання користувача) ---
+_SINGLE_FLIGHT = SingleFlight()
+
+# --- Довідник клієнтів: 'user_id' -> ClientRecord(рядок, username, ім'я) ---
+# Завантажується одним читанням "Клиенты" і оновлюється при кожному збереженні імені,
+# тож пошук імені постійного клієнта не звертається до мережі.
+_CLIENT_DIRECTORY = {}
+_CLIENT_DIRECTORY_LOADED_AT = None  # time.monotonic() останнього завантаження
+_CLIENT_DIRECTORY_LOCK = threading.RLock()  # лише дані довідника, не мережеві записи
+# Збереження імені одного клієнта - по черзі (інакше два одночасні збереження нового клієнта додали б
+# два рядки); різні клієнти записуються паралельно. 'user_id' -> [Lock, скільки потоків тримають або чекають]
+_CLIENT_SAVE_LOCKS = {}
+_CLIENT_SAVE_LOCKS_GUARD = threading.Lock()
+CLIENT_DIRECTORY_TTL_SECONDS = 3600  # періодично перечитуємо, щоб побачити ручні правки в таблиці
+
+# --- Індекс бронювань: 'Telegram ID' -> [BookingRecord, ...] ---
+# Живиться від дзеркала "Заявок": перше читання повне, далі - лише нові рядки в кінці аркуша
+# плюс періодична перевірка контрольних сум старих блоків (ручні правки персоналу).
+_BOOKINGS_INDEX = {}
+_REQUESTS_HEADER = []
+_BOOKINGS_INDEX_LOADED_AT = None  # time.monotonic() останньої синхронізації
+_BOOKINGS_LOCK = threading.RLock()  # дані індексу
+_REQUESTS_SYNC_LOCK = threading.Lock()  # дзеркало + застосування його змін до індексу
+_REQUESTS_MIRROR = AppendOnlySheetMirror(REQUESTS_WORKSHEET_NAME)
+REQUESTS_SYNC_INTERVAL_SECONDS = 30  # як часто дочитувати хвіст "Заявок" при зверненнях до індексу
+
 # --- Авторизація ---
 _CLIENT = None
 
 
+class ClientRecord(NamedTuple):
+    row: int  # номер рядка в аркуші "Клиенты" (з 1)
+    username: str
+    name: str
+
+
+def _load_client_directory():
+    """Одне читання аркуша 'Клиенты' -> { 'user_id': ClientRecord }."""
+    def _read(sheet, columns):
+        all_values = sheet.get_all_values()
+        id_idx = columns[CLIENT_ID_COLUMN] - 1
+        username_idx = columns[CLIENT_USERNAME_COLUMN] - 1
+        name_idx = columns[CLIENT_NAME_COLUMN] - 1
+        directory = {}
+        for row_number, row_values in enumerate(all_values, start=1):
+            padded = row_values + [""] * (max(id_idx, username_idx, name_idx) + 1 - len(row_values))
+            user_id_str = str(padded[id_idx]).strip()
+            if not user_id_str.lstrip("-").isdigit():
+                continue  # заголовок або сміття
+            # Як і sheet.find() раніше - перший рядок з цим user_id
+            directory.setdefault(user_id_str, ClientRecord(row_number, str(padded[username_idx]), str(padded[name_idx]).strip()))
+        return directory
+
+    global _CLIENT_DIRECTORY, _CLIENT_DIRECTORY_LOADED_AT
+    directory = _REGISTRY.run(CLIENTS_WORKSHEET_NAME, _read)
+    with _CLIENT_DIRECTORY_LOCK:
+        _CLIENT_DIRECTORY = directory
+        _CLIENT_DIRECTORY_LOADED_AT = time.monotonic()
+    print(f"DEBUG [google_sheets.py]: Довідник клієнтів завантажено: {len(directory)} записів.", file=sys.stderr)
+    return directory
+
+
+def _client_directory():
+    """Повертає довідник клієнтів, завантажуючи його (один раз на всі одночасні запити) за потреби."""
+    loaded_at = _CLIENT_DIRECTORY_LOADED_AT
+    if loaded_at is not None and time.monotonic() - loaded_at < CLIENT_DIRECTORY_TTL_SECONDS:
+        return _CLIENT_DIRECTORY
+    return _SINGLE_FLIGHT.do("client_directory", _load_client_directory)
+
+
+def invalidate_client_directory():
+    global _CLIENT_DIRECTORY_LOADED_AT
+    _CLIENT_DIRECTORY_LOADED_AT = None
+
+
 def get_client_provided_name(user_id: int):
     """Шукає збережене ім'я клієнта. Повертає ім'я або None."""
-    print(f"DEBUG: Getting client name for user_id: {user_id}...", file=sys.stderr)
     try:
-        client = get_gspread_client()
-        sheet = client.open(SPREADSHEET_NAME).worksheet(CLIENTS_WORKSHEET_NAME)
-        target_cell = None
-        try:
-            target_cell = sheet.find(str(user_id), in_column=1)
-        except gspread.exceptions.CellNotFound:
-            print(f"DEBUG: CellNotFound caught for user_id: {user_id}.", file=sys.stderr)
-            target_cell = None
-        except Exception as e_find:
-            print(f"ERROR during sheet.find() in get_client_provided_name: {type(e_find).__name__} - {e_find}",
-                  file=sys.stderr)
-            return None
-
-        if target_cell:
-            provided_name = sheet.cell(target_cell.row, 3).value
-            if provided_name:
-                print(f"DEBUG: Found name '{provided_name}' for user_id {user_id}.", file=sys.stderr)
-                return str(provided_name)
-            else:
-                print(f"DEBUG: Found user_id {user_id}, but name is empty.", file=sys.stderr)
-                return None
-        else:
-            print(f"DEBUG: Client with user_id {user_id} not found.", file=sys.stderr)
-            return None
+        record = _client_directory().get(str(user_id))
     except Exception as e:
         print(f"ERROR in get_client_provided_name: {type(e).__name__} - {e}", file=sys.stderr)
         return None
 
+    if record and record.name:
+        print(f"DEBUG: Found name '{record.name}' for user_id {user_id}.", file=sys.stderr)
+        return record.name
+    elif record:
+        print(f"DEBUG: Found user_id {user_id}, but name is empty.", file=sys.stderr)
+    else:
+        print(f"DEBUG: Client with user_id {user_id} not found.", file=sys.stderr)
+    return None
 
-def save_or_update_client_name(user_id: int, telegram_username: str, provided_name: str):
-    """Зберігає або оновлює ім'я клієнта, використовуючи час по Києву для позначок."""
+
+def appended_row_number(append_response) -> int:
+    """Номер першого доданого рядка з відповіді values.append ('Аркуш'!A12:E12 -> 12) або None."""
     try:
-        client = get_gspread_client()
-        sheet = client.open(SPREADSHEET_NAME).worksheet(CLIENTS_WORKSHEET_NAME)
-        now_kyiv = datetime.now(KYIV_TZ)
-        now_str = now_kyiv.strftime("%d.%m.%Y %H:%M:%S")
-        target_cell = None
-        try:
-            target_cell = sheet.find(str(user_id), in_column=1)
-        except gspread.exceptions.CellNotFound:
-            target_cell = None
-        except Exception as e_find:
-            print(f"ERROR during sheet.find() in save_or_update_client_name: {type(e_find).__name__} - {e_find}", file=sys.stderr)
-            return
+        updated_range = append_response["updates"]["updatedRange"]
+    except (TypeError, KeyError):
+        return None
+    match = re.search(r"![A-Z]+(\d+)", updated_range)
+    return int(match.group(1)) if match else None
 
-        if target_cell:
-            try:
-                sheet.update_cell(target_cell.row, 2, telegram_username or "")
-                sheet.update_cell(target_cell.row, 3, provided_name)
-                sheet.update_cell(target_cell.row, 5, now_str)
-            except Exception as e_update:
-                print(f"ERROR updating client in '{CLIENTS_WORKSHEET_NAME}': {type(e_update).__name__} - {e_update}", file=sys.stderr)
-        else:
-            try:
-                sheet.append_row([
-                    str(user_id),
+
+@contextmanager
+def _client_save_lock(user_id_str: str):
+    """Замок збереження одного клієнта; живе, поки його хтось тримає або чекає."""
+    with _CLIENT_SAVE_LOCKS_GUARD:
+        entry = _CLIENT_SAVE_LOCKS.setdefault(user_id_str, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _CLIENT_SAVE_LOCKS_GUARD:
+            entry[1] -= 1
+            if not entry[1]:
+                del _CLIENT_SAVE_LOCKS[user_id_str]
+
+
+def save_or_update_client_name(user_id: int, telegram_username: str, provided_name: str):
+    """
+    Зберігає або оновлює ім'я клієнта, використовуючи час по Києву для позначок.
+    Рядок клієнта береться з довідника (без find), зміна записується одним batch_update,
+    а довідник оновлюється одразу після запису (write-through). Довідник може бути старим
+    (до CLIENT_DIRECTORY_TTL_SECONDS), тож перед записом перевіряється, що в рядку досі цей user_id;
+    якщо ні (рядки видалено чи переставлено вручну), довідник перечитується.
+    """
+    now_str = datetime.now(KYIV_TZ).strftime("%d.%m.%Y %H:%M:%S")
+    user_id_str = str(user_id)
+
+    def _save(sheet, columns):
+        _client_directory()  # завантаження (якщо потрібне) - поза замками, щоб не блокувати спільне читання
+        with _client_save_lock(user_id_str):
+            with _CLIENT_DIRECTORY_LOCK:
+                record = _CLIENT_DIRECTORY.get(user_id_str)
+            if record and str(sheet.cell(record.row, columns[CLIENT_ID_COLUMN]).value or "").strip() != user_id_str:
+                print(f"ПОПЕРЕДЖЕННЯ [google_sheets.py]: Рядок {record.row} '{CLIENTS_WORKSHEET_NAME}' вже не клієнта {user_id_str}. "
+                      f"Перечитую довідник.", file=sys.stderr)
+                invalidate_client_directory()
+                record = _client_directory().get(user_id_str)
+            if record:
+                username_a1 = rowcol_to_a1(record.row, columns[CLIENT_USERNAME_COLUMN])
+                name_a1 = rowcol_to_a1(record.row, columns[CLIENT_NAME_COLUMN])
+                sheet.batch_update([
+                    {"range": f"{username_a1}:{name_a1}", "values": [[telegram_username or "", provided_name]]},
+                    {"range": rowcol_to_a1(record.row, columns[CLIENT_UPDATED_COLUMN]), "values": [[now_str]]},
+                ])
+                with _CLIENT_DIRECTORY_LOCK:
+                    _CLIENT_DIRECTORY[user_id_str] = ClientRecord(record.row, telegram_username or "", provided_name)
+            else:
+                response = sheet.append_row([
+                    user_id_str,
                     telegram_username or "",
                     provided_name,
                     now_str,
                     now_str
                 ])
-            except Exception as e_append:
-                print(f"ERROR appending client in '{CLIENTS_WORKSHEET_NAME}': {type(e_append).__name__} - {e_append}", file=sys.stderr)
+                row_number = appended_row_number(response)
+                if row_number:
+                    with _CLIENT_DIRECTORY_LOCK:
+                        _CLIENT_DIRECTORY[user_id_str] = ClientRecord(row_number, telegram_username or "", provided_name)
+                else:
+                    invalidate_client_directory()  # номер рядка невідомий - перечитаємо довідник при наступному зверненні
+
+    try:
+        _REGISTRY.run(CLIENTS_WORKSHEET_NAME, _save)
+        return True
     except Exception as e:
         print(f"ERROR in save_or_update_client_name: {type(e).__name__} - {e}", file=sys.stderr)
+        return False
+
+
+def client_directory_snapshot() -> dict:
+    """Копія довідника клієнтів { 'user_id': ClientRecord } (для реплікатора локального сховища)."""
+    directory = _client_directory()
+    with _CLIENT_DIRECTORY_LOCK:
+        return dict(directory)
 
 
 def get_gspread_client():
@@ -134,96 +310,324 @@ def get_gspread_client():
                 print(error_msg, file=sys.stderr)
                 raise FileNotFoundError(error_msg)
             creds = ServiceAccountCredentials.from_json_keyfile_name(SERVICE_ACCOUNT_FILE, SCOPE)
-            _CLIENT = gspread.authorize(creds)
+            client = gspread.authorize(creds)
+            # Усі запити - через планувальник квот (пріоритети, token bucket, повтори на 429/5xx)
+            install_scheduler(client)
+            _CLIENT = client
         except Exception as e:
             print(f"ПОМИЛКА АВТОРИЗАЦІЇ Google Sheets: {type(e).__name__} - {e}", file=sys.stderr)
             raise
     return _CLIENT
 
 
+# Один реєстр аркушів на процес: таблиця, Worksheet-и та мапи колонок кешуються тут
+_REGISTRY = WorksheetRegistry(get_gspread_client, SPREADSHEET_NAME, SPREADSHEET_KEY, SHEET_SCHEMAS)
+
+
+def invalidate_worksheet_registry(name: str = None):
+    """Скидає закешовані аркуші та схеми (наприклад, після ручної зміни структури таблиці)."""
+    _REGISTRY.invalidate(name)
+
+
 def invalidate_schedule_cache():
-    global _CACHED_SCHEDULE_DATA, _LAST_SCHEDULE_FETCH_TIME
+    global _CACHED_SCHEDULE_DATA, _LAST_SCHEDULE_FETCH_TIME, _SCHEDULE_FULL_READ_AT
+    _SCHEDULE_FULL_READ_AT = None  # наступне читання - повне, з перебудовою мапи рядків
+    if _BACKGROUND_REFRESH_ACTIVE and _CACHED_SCHEDULE_DATA is not None:
+        # Не скидаємо дані: позначаємо їх застарілими і просимо фоновий оновлювач перечитати графік
+        _LAST_SCHEDULE_FETCH_TIME = None
+        _request_background_refresh()
+        print("DEBUG [google_sheets.py]: Кеш розкладу позначено застарілим, запитано фонове оновлення.", file=sys.stderr)
+        return
     _CACHED_SCHEDULE_DATA = None
     _LAST_SCHEDULE_FETCH_TIME = None
     print("DEBUG [google_sheets.py]: Кеш розкладу інвалідовано (скинуто).", file=sys.stderr)
 
 
+def set_background_refresh(active: bool, wakeup=None) -> None:
+    """Вмикає/вимикає режим stale-while-revalidate (викликається з schedule_refresher.py)."""
+    global _BACKGROUND_REFRESH_ACTIVE, _REFRESH_WAKEUP
+    _BACKGROUND_REFRESH_ACTIVE = active
+    _REFRESH_WAKEUP = wakeup if active else None
+
+
+def _request_background_refresh() -> None:
+    wakeup = _REFRESH_WAKEUP
+    if wakeup is not None:
+        wakeup()
+
+
+def schedule_cache_age():
+    """Вік кешу розкладу (timedelta) або None, якщо кеш порожній чи позначений застарілим."""
+    if _CACHED_SCHEDULE_DATA is None or _LAST_SCHEDULE_FETCH_TIME is None:
+        return None
+    return datetime.now(timezone.utc) - _LAST_SCHEDULE_FETCH_TIME
+
+
+def refresh_schedule_cache() -> bool:
+    """Перечитує 'Графік' (для фонового оновлювача). Повертає False, якщо читання не вдалося."""
+    try:
+        _load_schedule()
+        return True
+    except Exception as e:
+        print(f"ПОМИЛКА [google_sheets.py]: фонове оновлення графіка: {type(e).__name__} - {e}", file=sys.stderr)
+        return False
+
+
+def _schedule_column_groups(columns: dict) -> list:
+    """Колонки Дата/Час/Статус, згруповані в суміжні діапазони: [[перша, остання], ...]."""
+    groups = []
+    for col in sorted({columns[DATE_COLUMN], columns[TIME_COLUMN], columns[STATUS_COLUMN]}):
+        if groups and col == groups[-1][1] + 1:
+            groups[-1][1] = col
+        else:
+            groups.append([col, col])
+    return groups
+
+
+def _column_letter(col: int) -> str:
+    return rowcol_to_a1(1, col)[:-1]
+
+
+def _read_schedule_rows(spans: list):
+    """
+    Одне читання 'Графіка' (values.batchGet): заголовок і лише колонки Дата/Час/Статус
+    для кожного проміжку рядків spans = [(перший, останній або None - до кінця аркуша), ...].
+    Повертає ([[(рядок, дата, час, статус), ...] на кожен проміжок], мапа колонок).
+    """
+    def _read(sheet, columns):
+        groups = _schedule_column_groups(columns)
+        ranges = ["1:1"]
+        for first, last in spans:
+            ranges.extend(f"{_column_letter(a)}{first}:{_column_letter(b)}{last or ''}" for a, b in groups)
+        fetched = sheet.batch_get(ranges)
+        header = fetched[0][0] if fetched[0] else []
+        if header:
+            verify_header(SCHEDULE_WORKSHEET_NAME, header, columns)
+        # (номер групи, зсув у групі) для дати, часу і статусу
+        positions = []
+        for name in (DATE_COLUMN, TIME_COLUMN, STATUS_COLUMN):
+            col = columns[name]
+            group_no = next(i for i, (a, b) in enumerate(groups) if a <= col <= b)
+            positions.append((group_no, col - groups[group_no][0]))
+        result = []
+        for span_no, (first, last) in enumerate(spans):
+            values = fetched[1 + span_no * len(groups):1 + (span_no + 1) * len(groups)]
+            count = max((len(v) for v in values), default=0)
+            rows = []
+            for i in range(count):
+                cells = []
+                for group_no, offset in positions:
+                    group_rows = values[group_no]
+                    row = group_rows[i] if i < len(group_rows) else ()
+                    cells.append(row[offset] if offset < len(row) else "")
+                rows.append((first + i, cells[0], cells[1], cells[2]))
+            result.append(rows)
+        return result, columns
+    return _REGISTRY.run(SCHEDULE_WORKSHEET_NAME, _read)
+
+
+def _build_schedule_rows(rows: list, now_kyiv: datetime):
+    """
+    З прочитаних рядків [(рядок, дата, час, статус), ...] будує:
+    - available_slots: { 'дата': ['HH:MM', ...] } - вільні майбутні слоти на BOOKING_HORIZON_DAYS днів;
+    - slot_index: { ('дата', 'HH:MM'): [номер рядка, статус] } - для всіх цих рядків;
+    - days, keys: день і ключ слота кожного рядка (для мапи рядків, 0/None - не слот).
+    """
+    now_pos = now_position(now_kyiv)
+    today_day = now_pos[0]
+    end_day = today_day + BOOKING_HORIZON_DAYS
+    free_by_date = {}  # 'дата' -> (день, [хвилини]) - дата і час кожного рядка розбираються один раз
+    slot_index = {}
+    days, keys = [], []
+
+    for row_number, date_value, time_value, status_value in rows:
+        date_str = str(date_value).strip()
+        day = parse_day(date_str) if date_str else None
+        days.append(day or 0)
+        minute = parse_minute(time_value)
+        if not date_str or minute is None:
+            keys.append(None)
+            continue
+        status_val = str(status_value).strip()
+        slot_key = (date_str, format_minute(minute))
+        keys.append(slot_key)
+        # Перший рядок з такою парою (дата, час) - як і при лінійному пошуку раніше
+        slot_index.setdefault(slot_key, [row_number, status_val])
+
+        if status_val.lower() != STATUS_FREE:
+            continue
+        if day is None or not (today_day <= day < end_day) or (day, minute) <= now_pos:
+            continue
+        free_by_date.setdefault(date_str, (day, []))[1].append(minute)
+
+    available_slots = {
+        date_str: [format_minute(minute) for minute in sorted(minutes)]
+        for date_str, (_, minutes) in sorted(free_by_date.items(), key=lambda item: item[1][0])
+    }
+    return available_slots, slot_index, days, keys
+
+
+def _build_schedule(all_values: list, columns: dict, now_kyiv: datetime):
+    """Те саме для повного знімка аркуша (усі колонки). Повертає (available_slots, slot_index)."""
+    date_col_idx = columns[DATE_COLUMN] - 1
+    time_col_idx = columns[TIME_COLUMN] - 1
+    status_col_idx = columns[STATUS_COLUMN] - 1
+    min_len = max(date_col_idx, time_col_idx, status_col_idx) + 1
+    rows = [(row_number, row[date_col_idx], row[time_col_idx], row[status_col_idx])
+            for row_number, row in enumerate(all_values[1:], start=2) if len(row) >= min_len]
+    return _build_schedule_rows(rows, now_kyiv)[:2]
+
+
+def _load_schedule(full: bool = False):
+    """
+    Читає 'Графік', оновлює кеш доступних дат та індекс слотів. Повертає доступні слоти.
+    Зазвичай читаються лише рядки вікна запису та хвіст аркуша (див. schedule_rows.py);
+    full=True - усі рядки (коли рядок з індексу не збігся зі слотом).
+    Якщо читання вже виконується (холодний кеш, фонове оновлення), нове не починається -
+    усі викликачі отримують результат того самого читання.
+    """
+    if full:
+        return _SINGLE_FLIGHT.do("schedule_full", _read_and_build_schedule, True)
+    return _SINGLE_FLIGHT.do("schedule", _read_and_build_schedule)
+
+
+def _needs_full_schedule_read() -> bool:
+    return (_SCHEDULE_ROWS is None or _SCHEDULE_FULL_READ_AT is None
+            or time.monotonic() - _SCHEDULE_FULL_READ_AT >= SCHEDULE_FULL_RELOAD_SECONDS)
+
+
+def _read_schedule_window(now_kyiv: datetime):
+    """
+    Часткове читання: рядки днів вікна запису за мапою рядків плюс хвіст аркуша,
+    починаючи з останнього відомого рядка. Повертає суцільні відрізки рядків [[(рядок, дата, час, статус), ...], ...].
+    """
+    row_map = _SCHEDULE_ROWS
+    today_day = now_kyiv.toordinal()
+    window = row_map.window(today_day, today_day + BOOKING_HORIZON_DAYS)
+    tail_first = max(row_map.last_row, ScheduleRowMap.FIRST_DATA_ROW)
+    if window is None or window[1] >= tail_first - 1:
+        spans = [(window[0] if window else tail_first, None)]
+    else:
+        spans = [window, (tail_first, None)]
+    fetched, _ = _read_schedule_rows(spans)
+    segments = []
+    for (first, last), span_rows in zip(spans, fetched):
+        # Рядки, відомі мапі, але не повернуті (порожні в кінці діапазону), - порожні (день 0)
+        known_last = last or row_map.last_row
+        segment = span_rows + [(row, "", "", "") for row in range(first + len(span_rows), known_last + 1)]
+        if segment:
+            segments.append(segment)
+    _SCHEDULE_READ_STATS["window_rows"] += sum(len(segment) for segment in segments)
+    return segments
+
+
+def _read_and_build_schedule(full: bool = False):
+    global _CACHED_SCHEDULE_DATA, _LAST_SCHEDULE_FETCH_TIME, _SLOT_INDEX, _SCHEDULE_ROWS, _SCHEDULE_FULL_READ_AT
+    with _SCHEDULE_LOAD_LOCK:
+        load_started = time.monotonic()
+        now_kyiv = datetime.now(KYIV_TZ)
+        partial = None
+        if not full and not _needs_full_schedule_read():
+            segments = _read_schedule_window(now_kyiv)
+            rows = [row for segment in segments for row in segment]
+            available_slots, slot_index, days, keys = _build_schedule_rows(rows, now_kyiv)
+            parts, start = [], 0
+            for segment in segments:
+                parts.append((segment, days[start:start + len(segment)], keys[start:start + len(segment)]))
+                start += len(segment)
+            if all(_SCHEDULE_ROWS.matches(segment[0][0], segment_days) for segment, segment_days, _ in parts):
+                partial = parts
+                _SCHEDULE_READ_STATS["window"] += 1
+            else:
+                _SCHEDULE_READ_STATS["stale_row_map"] += 1
+                print("DEBUG [google_sheets.py]: Рядки 'Графіка' зсунулись відносно мапи. Повне читання...", file=sys.stderr)
+        if partial is None:
+            (rows,), _ = _read_schedule_rows([(ScheduleRowMap.FIRST_DATA_ROW, None)])
+            available_slots, slot_index, days, keys = _build_schedule_rows(rows, now_kyiv)
+            _SCHEDULE_READ_STATS["full"] += 1
+            _SCHEDULE_READ_STATS["full_rows"] += len(rows)
+
+        with _SCHEDULE_LOCK:
+            if partial is None:
+                _SCHEDULE_ROWS = ScheduleRowMap(days, keys)
+                _SCHEDULE_FULL_READ_AT = load_started
+                _SLOT_INDEX = slot_index
+            else:
+                _merge_slot_index(slot_index, partial)
+            # Зміни слотів, зроблені ботом під час читання, могли не потрапити в знімок - накладаємо їх
+            for slot_key, (status, patched_at) in list(_RECENT_SLOT_PATCHES.items()):
+                if patched_at >= load_started:
+                    _apply_slot_patch(available_slots, _SLOT_INDEX, slot_key[0], slot_key[1], status, now_kyiv)
+                elif load_started - patched_at > SLOT_PATCH_RETENTION_SECONDS:
+                    del _RECENT_SLOT_PATCHES[slot_key]
+            _CACHED_SCHEDULE_DATA = _publish_snapshot(available_slots)
+            _LAST_SCHEDULE_FETCH_TIME = datetime.now(timezone.utc)
+            snapshot = _CACHED_SCHEDULE_DATA
+            indexed = len(_SLOT_INDEX)
+    print(f"DEBUG [google_sheets.py]: Графік завантажено ({'повністю' if partial is None else 'частково'}): {len(rows)} рядків, "
+          f"{indexed} слотів в індексі (версія {snapshot.version}).", file=sys.stderr)
+    return snapshot
+
+
+def _merge_slot_index(slot_index: dict, parts: list) -> None:
+    """Замінює в індексі слотів і мапі рядків лише перечитані відрізки [(рядки, дні, ключі), ...] (під _SCHEDULE_LOCK)."""
+    for segment, _, _ in parts:
+        for row_number, _, _, _ in segment:
+            old_key = _SCHEDULE_ROWS.key(row_number)
+            entry = _SLOT_INDEX.get(old_key) if old_key else None
+            if entry and entry[0] == row_number:
+                del _SLOT_INDEX[old_key]
+    for slot_key, entry in slot_index.items():
+        current = _SLOT_INDEX.get(slot_key)
+        if current is None or current[0] > entry[0]:
+            _SLOT_INDEX[slot_key] = entry
+    for segment, days, keys in parts:
+        _SCHEDULE_ROWS.update(segment[0][0], days, keys)
+
+
+def schedule_read_stats() -> dict:
+    """Повні та часткові читання 'Графіка' і кількість прочитаних рядків (для /health)."""
+    row_map = _SCHEDULE_ROWS
+    return dict(_SCHEDULE_READ_STATS, known_rows=len(row_map) if row_map is not None else 0)
+
+
+def _publish_snapshot(available_slots: dict) -> ScheduleSnapshot:
+    """Заморожує слоти в новий знімок. Якщо вміст не змінився, залишає поточний знімок (і його версію)."""
+    global _SCHEDULE_VERSION
+    current = _CACHED_SCHEDULE_DATA
+    if current is not None and current.to_dict() == available_slots:
+        return current
+    _SCHEDULE_VERSION += 1
+    return ScheduleSnapshot(available_slots, _SCHEDULE_VERSION)
+
+
 def get_available_dates():
-    global _CACHED_SCHEDULE_DATA, _LAST_SCHEDULE_FETCH_TIME
-    now_kyiv = datetime.now(KYIV_TZ)
+    """
+    Повертає ScheduleSnapshot { 'дата': ('HH:MM', ...) } з вільними слотами на 7 днів.
+    Знімок незмінний і спільний для всіх викликачів; його version зростає при кожній зміні розкладу.
+    """
     now_utc = datetime.now(timezone.utc)
 
-    if _CACHED_SCHEDULE_DATA is not None and \
-            _LAST_SCHEDULE_FETCH_TIME is not None and \
-            (now_utc - _LAST_SCHEDULE_FETCH_TIME) < CACHE_TTL:
-        return copy.deepcopy(_CACHED_SCHEDULE_DATA)
+    with _SCHEDULE_LOCK:
+        if _CACHED_SCHEDULE_DATA is not None:
+            is_fresh = _LAST_SCHEDULE_FETCH_TIME is not None and (now_utc - _LAST_SCHEDULE_FETCH_TIME) < CACHE_TTL
+            if is_fresh or _BACKGROUND_REFRESH_ACTIVE:
+                if not is_fresh:
+                    # Stale-while-revalidate: віддаємо старі дані одразу, оновлення - у фоні
+                    _request_background_refresh()
+                return _CACHED_SCHEDULE_DATA
 
-    available_slots = {}
     try:
-        client = get_gspread_client()
-        sheet = client.open(SPREADSHEET_NAME).worksheet(SCHEDULE_WORKSHEET_NAME)
-        records = sheet.get_all_records()
-        today_kyiv = now_kyiv.date()
-        end_date_kyiv = today_kyiv + timedelta(days=7)
-        processed_dates_temp = {}
-
-        for record in records:
-            date_str = record.get(DATE_COLUMN)
-            time_val_sheet = record.get(TIME_COLUMN)
-            status_val = record.get(STATUS_COLUMN)
-            time_str_from_sheet = str(time_val_sheet).strip()
-
-            if date_str and time_str_from_sheet and status_val and str(status_val).strip().lower() == STATUS_FREE:
-                try:
-                    record_date_obj = datetime.strptime(str(date_str), DATE_FORMAT_IN_SHEET).date()
-                    if today_kyiv <= record_date_obj < end_date_kyiv:
-                        parsed_time_for_slot = ""
-                        try:
-                            if ':' not in time_str_from_sheet:
-                                if time_str_from_sheet.isdigit() and 0 <= int(time_str_from_sheet) <= 23:
-                                    parsed_time_for_slot = f"{int(time_str_from_sheet):02d}:00"
-                                else:
-                                    continue
-                            else:
-                                parts = time_str_from_sheet.split(':')
-                                if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
-                                    hour, minute = int(parts[0]), int(parts[1])
-                                    if not (0 <= hour <= 23 and 0 <= minute <= 59):
-                                        continue
-                                    parsed_time_for_slot = f"{hour:02d}:{minute:02d}"
-                                else:
-                                    continue
-                            record_time_obj = datetime.strptime(parsed_time_for_slot, "%H:%M").time()
-                        except ValueError:
-                            continue
-
-                        slot_naive_dt = datetime.combine(record_date_obj, record_time_obj)
-                        slot_kyiv_dt = KYIV_TZ.localize(slot_naive_dt)
-                        if slot_kyiv_dt > now_kyiv:
-                            if date_str not in processed_dates_temp:
-                                processed_dates_temp[date_str] = []
-                            processed_dates_temp[date_str].append(parsed_time_for_slot)
-                except ValueError:
-                    continue
-        
-        sorted_date_keys = sorted(
-            processed_dates_temp.keys(),
-            key=lambda d: datetime.strptime(d, DATE_FORMAT_IN_SHEET).date()
-        )
-        for date_key in sorted_date_keys:
-            if processed_dates_temp[date_key]:
-                available_slots[date_key] = sorted(processed_dates_temp[date_key])
-
-        _CACHED_SCHEDULE_DATA = available_slots
-        _LAST_SCHEDULE_FETCH_TIME = now_utc
-        return copy.deepcopy(available_slots)
+        return _load_schedule()
 
     except gspread.exceptions.SpreadsheetNotFound:
         print(f"ПОМИЛКА: Таблицю '{SPREADSHEET_NAME}' не знайдено.", file=sys.stderr)
+        _REGISTRY.invalidate()
         invalidate_schedule_cache()
         raise
     except gspread.exceptions.WorksheetNotFound:
         print(f"ПОМИЛКА: Аркуш '{SCHEDULE_WORKSHEET_NAME}' не знайдено.", file=sys.stderr)
+        _REGISTRY.invalidate()
         invalidate_schedule_cache()
         raise
     except KeyError as e:
@@ -236,234 +640,535 @@ def get_available_dates():
         raise
 
 
+def _lookup_slot(date_str: str, time_key: str):
+    with _SCHEDULE_LOCK:
+        entry = _SLOT_INDEX.get((date_str, time_key))
+        return tuple(entry) if entry else None
+
+
+def cached_slot_status(date_str: str, time_str: str):
+    """Статус слота з індексу (останнє читання 'Графіка' плюс зміни бота) або None."""
+    entry = _lookup_slot(date_str, normalize_time_str(time_str) or str(time_str).strip())
+    return entry[1] if entry else None
+
+
+def schedule_slot_statuses() -> dict:
+    """Перечитує 'Графік' і повертає статуси всіх слотів { ('дата', 'HH:MM'): статус }."""
+    _load_schedule()
+    with _SCHEDULE_LOCK:
+        return {slot_key: entry[1] for slot_key, entry in _SLOT_INDEX.items()}
+
+
+def _is_bookable_slot(date_str: str, time_key: str, now_kyiv: datetime) -> bool:
+    """Чи слот потрапляє у вікно запису (BOOKING_HORIZON_DAYS днів) і ще не минув."""
+    slot = parse_slot(date_str, time_key)
+    if slot is None:
+        return False
+    now_pos = now_position(now_kyiv)
+    return now_pos[0] <= slot.day < now_pos[0] + BOOKING_HORIZON_DAYS and slot.key > now_pos
+
+
+def _apply_slot_patch(available_slots, slot_index, date_str: str, time_key: str, status: str, now_kyiv: datetime) -> None:
+    """Змінює статус одного слота в індексі та в змінному dict доступних дат (на місці)."""
+    entry = slot_index.get((date_str, time_key))
+    if entry:
+        entry[1] = status
+    if available_slots is None:
+        return
+    times = available_slots.get(date_str, [])
+    if status.strip().lower() == STATUS_FREE and _is_bookable_slot(date_str, time_key, now_kyiv):
+        if time_key not in times:
+            times = sorted(times + [time_key])
+            available_slots[date_str] = times
+            # Нова дата могла з'явитися не в кінці - відновлюємо хронологічний порядок ключів
+            ordered = sorted(available_slots.items(), key=lambda item: parse_day(item[0]) or 0)
+            available_slots.clear()
+            available_slots.update(ordered)
+    elif time_key in times:
+        times.remove(time_key)
+        if not times:
+            del available_slots[date_str]
+
+
+def patch_cached_slot(date_str: str, time_key: str, status: str) -> None:
+    """Локально відображає зміну статусу слота в кеші, не скидаючи весь кеш (створює новий знімок)."""
+    global _CACHED_SCHEDULE_DATA
+    with _SCHEDULE_LOCK:
+        _RECENT_SLOT_PATCHES[(date_str, time_key)] = (status, time.monotonic())
+        available_slots = _CACHED_SCHEDULE_DATA.to_dict() if _CACHED_SCHEDULE_DATA is not None else None
+        _apply_slot_patch(available_slots, _SLOT_INDEX, date_str, time_key, status, datetime.now(KYIV_TZ))
+        if available_slots is not None:
+            _CACHED_SCHEDULE_DATA = _publish_snapshot(available_slots)
+    print(f"DEBUG [google_sheets.py]: Кеш розкладу оновлено точково: {date_str} {time_key} -> '{status}'.", file=sys.stderr)
+
+
 def update_status(date_str: str, time_str: str, new_status: str, expected_current_status: str = STATUS_FREE) -> bool:
     """
     Перевіряє, чи слот має очікуваний статус, оновлює його статус та інвалідує кеш.
+    Рядок слота береться з індексу (дата, час) -> номер рядка, тож замість завантаження всього аркуша
+    читається лише один рядок; якщо він більше не відповідає слоту, індекс перебудовується.
     Повертає True, якщо статус успішно оновлено.
     Повертає False, якщо слот не знайдений, або його поточний статус не відповідає expected_current_status.
     Для скасування очікуваний статус буде STATUS_BOOKED, а новий - STATUS_FREE або STATUS_CANCELLED_BY_USER_IN_SCHEDULE.
+    Якщо в 'Графіку' є колонка SLOT_VERSION_COLUMN, запис умовний і безпечний між екземплярами бота.
     """
     print(f"Attempting to update status for {date_str} {time_str} from '{expected_current_status}' to '{new_status}'...", file=sys.stderr)
-    try:
-        client = get_gspread_client()
-        sheet = client.open(SPREADSHEET_NAME).worksheet(SCHEDULE_WORKSHEET_NAME)
-        all_data = sheet.get_all_values()
-        if not all_data:
-            print(f"ERROR in update_status: Sheet '{SCHEDULE_WORKSHEET_NAME}' is empty.", file=sys.stderr)
-            return False
-        header = all_data[0]
-        try:
-            date_col_idx = header.index(DATE_COLUMN)
-            time_col_idx = header.index(TIME_COLUMN)
-            status_col_idx = header.index(STATUS_COLUMN)
-        except ValueError as e:
-            print(f"ERROR in update_status: Column name missing in '{SCHEDULE_WORKSHEET_NAME}': {e}", file=sys.stderr)
-            return False
+    time_key = normalize_time_str(time_str) or str(time_str).strip()
 
-        target_row_gspread_idx = None
-        current_status_in_sheet = None
-        for i, row_values in enumerate(all_data[1:], start=2): # gspread індекси рядків починаються з 1
-            # Перевірка на наявність достатньої кількості елементів в рядку
-            if len(row_values) > max(date_col_idx, time_col_idx, status_col_idx):
-                if row_values[date_col_idx] == date_str and row_values[time_col_idx] == time_str:
-                    target_row_gspread_idx = i
-                    current_status_in_sheet = str(row_values[status_col_idx]).strip().lower()
-                    break
-            else:
-                print(f"Warning in update_status: Row {i} in '{SCHEDULE_WORKSHEET_NAME}' has too few columns. Skipping.", file=sys.stderr)
+    def _update(sheet, columns):
+        index_refreshed = False
+        while True:
+            entry = _lookup_slot(date_str, time_key)
+            row_values = sheet.row_values(entry[0]) if entry else None
+            if entry and _row_matches_slot(row_values, columns, date_str, time_key):
+                break
+            if index_refreshed:
+                print(f"ERROR: Slot for {date_str} {time_str} not found for update in '{SCHEDULE_WORKSHEET_NAME}'.", file=sys.stderr)
+                return False
+            # Індексу ще немає, слот новий, або рядки в таблиці зсунулись - перечитуємо аркуш один раз
+            print(f"DEBUG [google_sheets.py]: Індекс слотів застарів для {date_str} {time_key}. Перебудова...", file=sys.stderr)
+            _load_schedule(full=True)
+            index_refreshed = True
 
+        target_row_gspread_idx = entry[0]
+        status_col_idx = columns[STATUS_COLUMN]
+        current_status_in_sheet = str(row_values[status_col_idx - 1]).strip() if len(row_values) >= status_col_idx else ""
 
-        if target_row_gspread_idx:
-            # Порівнюємо поточний статус в таблиці (в нижньому регістрі) з очікуваним (в нижньому регістрі)
-            if current_status_in_sheet == expected_current_status.lower():
-                sheet.update_cell(target_row_gspread_idx, status_col_idx + 1, new_status) # +1 бо gspread індекси колонок з 1
-                print(f"Status updated for {date_str} {time_str} to '{new_status}'.", file=sys.stderr)
-                invalidate_schedule_cache()
-                return True
-            else:
-                print(f"Slot {date_str} {time_str} has status '{current_status_in_sheet}', but expected '{expected_current_status}'. Update failed.", file=sys.stderr)
-                # Можливо, варто інвалідувати кеш, якщо статус не той, що очікувався, бо хтось інший міг його змінити
-                invalidate_schedule_cache()
-                return False
+        # Порівнюємо поточний статус в таблиці (в нижньому регістрі) з очікуваним (в нижньому регістрі)
+        if current_status_in_sheet.lower() == expected_current_status.lower() and SLOT_VERSION_COLUMN in columns:
+            return _compare_and_set_slot(sheet, columns, target_row_gspread_idx, row_values,
+                                         date_str, time_key, new_status, expected_current_status)
+        if current_status_in_sheet.lower() == expected_current_status.lower():
+            sheet.update_cell(target_row_gspread_idx, status_col_idx, new_status)
+            print(f"Status updated for {date_str} {time_str} to '{new_status}'.", file=sys.stderr)
+            patch_cached_slot(date_str, time_key, new_status)
+            return True
         else:
-            print(f"ERROR: Slot for {date_str} {time_str} not found for update in '{SCHEDULE_WORKSHEET_NAME}'.", file=sys.stderr)
+            print(f"Slot {date_str} {time_str} has status '{current_status_in_sheet}', but expected '{expected_current_status}'. Update failed.", file=sys.stderr)
+            # Хтось інший змінив слот - відображаємо фактичний статус у кеші
+            patch_cached_slot(date_str, time_key, current_status_in_sheet)
             return False
 
+    try:
+        return _REGISTRY.run(SCHEDULE_WORKSHEET_NAME, _update)
     except Exception as e:
         print(f"ERROR in update_status: {type(e).__name__} - {e}", file=sys.stderr)
         return False
 
 
-def get_user_bookings(user_id: int) -> list:
+def update_statuses(changes: list) -> list:
     """
-    Отримує список активних (майбутніх) бронювань для вказаного user_id з аркуша 'Заявки'.
-    Повертає список словників, де кожен словник - це запис про бронювання.
-    АБО список кортежів (row_index, data_dict) для легшого оновлення.
+    Пакетна умовна зміна статусів: [(дата, час, новий, очікуваний), ...] -> [True/False, ...].
+    На будь-яку кількість слотів - два запити: batch_get рядків з індексу (рядки не зсунулись,
+    поточні статус і версія) та один spreadsheets.batchUpdate з findReplace по клітинці статусу
+    (і версії) кожного слота - так само умовно, як у _compare_and_set_slot.
+    Змінюється лише слот, який у момент запису ще мав очікуваний статус.
+    На відміну від update_status, помилки Sheets піднімаються - виклики повторюють пачку цілком.
     """
-    print(f"DEBUG [google_sheets.py]: Fetching active bookings for user_id: {user_id}...", file=sys.stderr)
-    user_bookings = []
-    try:
-        client = get_gspread_client()
-        sheet = client.open(SPREADSHEET_NAME).worksheet(REQUESTS_WORKSHEET_NAME)
-        all_records = sheet.get_all_records() # Отримуємо як список словників
+    if not changes:
+        return []
+    keys = [(date_str, normalize_time_str(time_str) or str(time_str).strip(), new_status, expected)
+            for date_str, time_str, new_status, expected in changes]
 
-        now_kyiv = datetime.now(KYIV_TZ)
+    def _update(sheet, columns):
+        status_col = columns[STATUS_COLUMN]
+        version_col = columns.get(SLOT_VERSION_COLUMN)
+        last_col = max(columns.values())
+        for attempt in (1, 2):
+            entries = [_lookup_slot(date_str, time_key) for date_str, time_key, _, _ in keys]
+            found = [entry for entry in entries if entry]
+            fetched = iter(sheet.batch_get([f"A{e[0]}:{rowcol_to_a1(e[0], last_col)}" for e in found])) if found else iter(())
+            rows = [(next(fetched, None) or [[]])[0] if entry else None for entry in entries]
+            stale = any(entry is None or not _row_matches_slot(row, columns, date_str, time_key)
+                        for entry, row, (date_str, time_key, _, _) in zip(entries, rows, keys))
+            if not stale or attempt == 2:
+                break
+            print("DEBUG [google_sheets.py]: Індекс слотів застарів для пакетного оновлення. Перебудова...", file=sys.stderr)
+            _load_schedule(full=True)
 
-        # Визначення індексів потрібних колонок за їхніми назвами
-        # Це більш надійно, ніж припускати фіксовані індекси
-        # Якщо get_all_records() успішно виконано, то заголовки існують
-        
-        # Примітка: get_all_records() вже повертає дані з заголовками як ключами.
-        # Нам потрібно знайти індекс рядка, якщо ми захочемо оновити його по індексу.
-        # Або ми можемо знайти комірку за значенням user_id, date, time.
-        # Для простоти, ми повернемо дані запису та його оригінальний індекс в таблиці.
-        
-        all_values = sheet.get_all_values()
-        if not all_values:
-            print(f"DEBUG [google_sheets.py]: No data in '{REQUESTS_WORKSHEET_NAME}' sheet.", file=sys.stderr)
-            return []
-            
-        header = all_values[0]
+        results = [False] * len(keys)
+        requests, plan = [], []  # plan: (номер зміни, індекс запиту статусу, версія в рядку, новий токен)
+        for i, (entry, row, (date_str, time_key, new_status, expected)) in enumerate(zip(entries, rows, keys)):
+            if entry is None or not _row_matches_slot(row, columns, date_str, time_key):
+                continue
+            current = str(row[status_col - 1]).strip() if len(row) >= status_col else ""
+            if current.lower() != expected.lower():
+                patch_cached_slot(date_str, time_key, current)
+                continue
+            token = str(row[version_col - 1]).strip() if version_col and len(row) >= version_col else ""
+            new_token = f"{_slot_version(token) + 1}:{BOT_INSTANCE_ID}"
+            plan.append((i, len(requests), token, new_token))
+            requests.append(_find_replace_cell(sheet, entry[0], status_col, expected, new_status))
+            if version_col and token:
+                requests.append(_find_replace_cell(sheet, entry[0], version_col, token, new_token))
+        if not requests:
+            return results
+
+        replies = sheet.spreadsheet.batch_update({"requests": requests}).get("replies", [])
+        first_versions = []
+        for i, reply_idx, token, new_token in plan:
+            reply = replies[reply_idx] if reply_idx < len(replies) else {}
+            if not reply.get("findReplace", {}).get("occurrencesChanged", 0):
+                continue  # слот змінили між читанням і записом
+            date_str, time_key, new_status, _ = keys[i]
+            results[i] = True
+            patch_cached_slot(date_str, time_key, new_status)
+            if version_col and not token:
+                first_versions.append({"range": rowcol_to_a1(entries[i][0], version_col), "values": [[new_token]]})
+        if first_versions:
+            sheet.batch_update(first_versions)
+        print(f"DEBUG [google_sheets.py]: Пакетно оновлено статуси {sum(results)} з {len(keys)} слотів.", file=sys.stderr)
+        return results
+
+    return _REGISTRY.run(SCHEDULE_WORKSHEET_NAME, _update)
+
+
+def slots_with_status(status: str) -> list:
+    """Перечитує 'Графік' і повертає [('дата', 'HH:MM'), ...] слотів із заданим статусом."""
+    wanted = status.strip().lower()
+    return [slot_key for slot_key, current in schedule_slot_statuses().items() if str(current).strip().lower() == wanted]
+
+
+def _slot_version(token: str) -> int:
+    """'7:host:pid' -> 7; порожня або зіпсована клітинка - 0."""
+    head = str(token).strip().split(":", 1)[0]
+    return int(head) if head.isdigit() else 0
+
+
+def _find_replace_cell(sheet, row: int, col: int, find: str, replacement: str) -> dict:
+    """Запит findReplace, обмежений однією клітинкою: спрацьовує, лише якщо вона дорівнює find."""
+    return {"findReplace": {
+        "find": find,
+        "replacement": replacement,
+        "matchCase": False,
+        "matchEntireCell": True,
+        "range": {"sheetId": sheet.id, "startRowIndex": row - 1, "endRowIndex": row,
+                  "startColumnIndex": col - 1, "endColumnIndex": col},
+    }}
+
+
+def _compare_and_set_slot(sheet, columns: dict, row: int, row_values: list, date_str: str, time_key: str,
+                          new_status: str, expected_current_status: str) -> bool:
+    """
+    Умовна зміна статусу слота, безпечна між кількома екземплярами бота.
+    Один spreadsheets.batchUpdate (Google застосовує його атомарно) містить два findReplace по одній клітинці:
+    статус expected -> new і версія 'n:...' -> 'n+1:<цей екземпляр>'. Виграє той, чий запит змінив статус;
+    решта отримує occurrencesChanged == 0 і відмову без читання аркуша. Якщо версія встигла змінитися,
+    а статус знову очікуваний (слот звільнили), рядок перечитується і спроба повторюється.
+    """
+    status_col = columns[STATUS_COLUMN]
+    version_col = columns[SLOT_VERSION_COLUMN]
+    for attempt in range(1, SLOT_CAS_ATTEMPTS + 1):
+        token = str(row_values[version_col - 1]).strip() if len(row_values) >= version_col else ""
+        new_token = f"{_slot_version(token) + 1}:{BOT_INSTANCE_ID}"
+        requests = [_find_replace_cell(sheet, row, status_col, expected_current_status, new_status)]
+        if token:  # findReplace не шукає порожні клітинки - першу версію запишемо після успіху
+            requests.append(_find_replace_cell(sheet, row, version_col, token, new_token))
+        replies = sheet.spreadsheet.batch_update({"requests": requests}).get("replies", [])
+        changed = [reply.get("findReplace", {}).get("occurrencesChanged", 0) for reply in replies]
+        if changed and changed[0]:
+            if not token:
+                sheet.update_cell(row, version_col, new_token)  # перша версія слота
+            elif len(changed) < 2 or not changed[1]:
+                # Версію змінив хтось інший між нашим читанням і записом - піднімаємо її від актуального значення
+                new_token = f"{_slot_version(sheet.cell(row, version_col).value or '') + 1}:{BOT_INSTANCE_ID}"
+                sheet.update_cell(row, version_col, new_token)
+            print(f"Status updated for {date_str} {time_key} to '{new_status}' (версія {new_token}).", file=sys.stderr)
+            patch_cached_slot(date_str, time_key, new_status)
+            return True
+        # Програли: хтось змінив слот раніше. Один рядок - щоб знати фактичний статус
+        row_values = sheet.row_values(row)
+        current_status = str(row_values[status_col - 1]).strip() if len(row_values) >= status_col else ""
+        if current_status.lower() != expected_current_status.lower() or not _row_matches_slot(row_values, columns, date_str, time_key):
+            print(f"Slot {date_str} {time_key} changed concurrently to '{current_status}' (спроба {attempt}). Update failed.", file=sys.stderr)
+            patch_cached_slot(date_str, time_key, current_status)
+            return False
+    print(f"ERROR: Slot {date_str} {time_key}: не вдалося умовно оновити за {SLOT_CAS_ATTEMPTS} спроби.", file=sys.stderr)
+    return False
+
+
+def _row_matches_slot(row_values: list, columns: dict, date_str: str, time_key: str) -> bool:
+    """Чи рядок, прочитаний за номером з індексу, досі описує слот (дата, час)."""
+    date_col_idx = columns[DATE_COLUMN] - 1
+    time_col_idx = columns[TIME_COLUMN] - 1
+    if len(row_values) <= max(date_col_idx, time_col_idx):
+        return False
+    return str(row_values[date_col_idx]).strip() == date_str and \
+        normalize_time_str(row_values[time_col_idx]) == time_key
+
+
+class BookingRecord(NamedTuple):
+    row_index: int  # номер рядка в аркуші "Заявки" (з 1)
+    date: str
+    time: str  # нормалізований 'HH:MM'
+    status: str  # значення колонки 'Статус Заявки' (може бути порожнім)
+    question: str
+    slot: Slot  # розібрані день і хвилина консультації - один раз при індексації
+    data: dict  # повний рядок { заголовок: значення }
+
+
+_CANCELLED_REQUEST_STATUSES = ("скасовано клієнтом", "cancelled by user")
+
+
+def _index_request_rows(rows: list, first_row_number: int, header: list, columns: dict) -> int:
+    """Додає рядки 'Заявок' до індексу бронювань. Повертає кількість проіндексованих бронювань."""
+    user_id_idx = columns[REQUEST_USER_ID_COLUMN] - 1
+    date_idx = columns[REQUEST_DATE_COLUMN] - 1
+    time_idx = columns[REQUEST_TIME_COLUMN] - 1
+    status_idx = columns.get(REQUEST_STATUS_COLUMN, 0) - 1
+    question_idx = columns.get(REQUEST_QUESTION_COLUMN, 0) - 1
+    indexed = 0
+    for row_number, row_values in enumerate(rows, start=first_row_number):
+        padded = [str(v) for v in row_values] + [""] * (len(header) - len(row_values))
+        user_id_str = padded[user_id_idx].strip()
+        date_str = padded[date_idx].strip()
+        minute = parse_minute(padded[time_idx])
+        if not user_id_str or not date_str or minute is None:
+            continue  # запити на дзвінок та неповні рядки - не бронювання
+        day = parse_day(date_str)
+        if day is None:
+            print(f"ПОПЕРЕДЖЕННЯ [google_sheets.py]: Не вдалося розпарсити дату '{date_str}' в рядку {row_number} '{REQUESTS_WORKSHEET_NAME}'. Запис пропущено.", file=sys.stderr)
+            continue
+        slot = Slot(date_str, day, minute)
+        record = BookingRecord(
+            row_index=row_number,
+            date=date_str,
+            time=slot.time,
+            status=padded[status_idx].strip() if status_idx >= 0 else "",
+            question=padded[question_idx] if question_idx >= 0 else "",
+            slot=slot,
+            data=dict(zip(header, padded)),
+        )
+        _BOOKINGS_INDEX.setdefault(user_id_str, []).append(record)
+        indexed += 1
+    return indexed
+
+
+def _sync_requests():
+    """
+    Синхронізує дзеркало 'Заявок' і застосовує зміни до індексу бронювань.
+    Перший виклик (і виявлена ручна правка) - повне читання, решта - лише нові рядки в кінці аркуша.
+    """
+    global _BOOKINGS_INDEX, _REQUESTS_HEADER, _BOOKINGS_INDEX_LOADED_AT
+
+    def _sync(sheet, columns):
         try:
-            # Переконуємось, що необхідні колонки існують в заголовку
-            # Якщо їх немає, функція має повернути порожній список або викликати помилку
-            _ = header.index(REQUEST_USER_ID_COLUMN)
-            _ = header.index(REQUEST_DATE_COLUMN)
-            _ = header.index(REQUEST_TIME_COLUMN)
-            # REQUEST_STATUS_COLUMN може ще не існувати, тому перевіряємо обережно
-            request_status_col_idx = -1
-            if REQUEST_STATUS_COLUMN in header:
-                request_status_col_idx = header.index(REQUEST_STATUS_COLUMN)
-
-        except ValueError as e:
-            print(f"ПОМИЛКА [google_sheets.py]: Одна з обов'язкових колонок ('{REQUEST_USER_ID_COLUMN}', '{REQUEST_DATE_COLUMN}', '{REQUEST_TIME_COLUMN}') не знайдена в аркуші '{REQUESTS_WORKSHEET_NAME}'. Помилка: {e}", file=sys.stderr)
-            return []
+            result = _REQUESTS_MIRROR.sync(sheet)
+            if result.reset and result.rows:
+                verify_header(REQUESTS_WORKSHEET_NAME, result.rows[0], columns)
+        except Exception:
+            # Стан дзеркала міг розійтися з індексом - повтор (або наступна синхронізація) читає все
+            _REQUESTS_MIRROR.reset()
+            raise
+        return result, columns
 
+    with _REQUESTS_SYNC_LOCK:
+        result, columns = _REGISTRY.run(REQUESTS_WORKSHEET_NAME, _sync)
+        with _BOOKINGS_LOCK:
+            if result.reset:
+                _BOOKINGS_INDEX = {}
+                _REQUESTS_HEADER = [str(h).strip() for h in result.rows[0]] if result.rows else []
+                indexed = _index_request_rows(result.rows[1:], 2, _REQUESTS_HEADER, columns) if result.rows else 0
+                print(f"DEBUG [google_sheets.py]: Індекс бронювань побудовано: {indexed} бронювань, {len(_BOOKINGS_INDEX)} користувачів.", file=sys.stderr)
+            elif result.rows:
+                indexed = _index_request_rows(result.rows, result.first_row_number, _REQUESTS_HEADER, columns)
+                print(f"DEBUG [google_sheets.py]: Нових рядків у '{REQUESTS_WORKSHEET_NAME}': {len(result.rows)}, з них бронювань: {indexed}.", file=sys.stderr)
+            _BOOKINGS_INDEX_LOADED_AT = time.monotonic()
+
+
+def _ensure_bookings_index() -> None:
+    loaded_at = _BOOKINGS_INDEX_LOADED_AT
+    if loaded_at is None or time.monotonic() - loaded_at >= REQUESTS_SYNC_INTERVAL_SECONDS:
+        _SINGLE_FLIGHT.do("bookings_index", _sync_requests)
 
-        for row_idx, record in enumerate(all_records, start=2): # start=2 бо get_all_records не включає заголовок, а індекси gspread з 1 (+1 для заголовка)
-            record_user_id_str = str(record.get(REQUEST_USER_ID_COLUMN, '')).strip()
-            record_date_str = record.get(REQUEST_DATE_COLUMN)
-            record_time_str = record.get(REQUEST_TIME_COLUMN) # Може бути числовим або рядком "HH:MM"
-            
-            # Перевіряємо, чи статус заявки не "Скасовано" (якщо така колонка є)
-            current_request_status = ""
-            if request_status_col_idx != -1 and REQUEST_STATUS_COLUMN in record:
-                 current_request_status = str(record.get(REQUEST_STATUS_COLUMN, "")).strip().lower()
-            
-            if current_request_status == "скасовано клієнтом" or \
-               current_request_status == "cancelled by user":
-                # print(f"DEBUG [google_sheets.py]: Skipping booking for user {record_user_id_str} on {record_date_str} {record_time_str} - already cancelled.", file=sys.stderr)
-                continue
 
+def invalidate_bookings_index():
+    """Скидає індекс і дзеркало 'Заявок': наступне звернення перечитає аркуш повністю."""
+    global _BOOKINGS_INDEX_LOADED_AT
+    with _REQUESTS_SYNC_LOCK:
+        _REQUESTS_MIRROR.reset()
+        _BOOKINGS_INDEX_LOADED_AT = None
 
-            if record_user_id_str == str(user_id) and record_date_str and record_time_str:
-                try:
-                    # Нормалізуємо час до формату HH:MM, якщо він числовий
-                    normalized_time_str = record_time_str
-                    if isinstance(record_time_str, (int, float)): # Якщо час це число (наприклад, 9, 10.5)
-                        hour = int(record_time_str)
-                        minute = int((record_time_str * 60) % 60)
-                        normalized_time_str = f"{hour:02d}:{minute:02d}"
-                    elif isinstance(record_time_str, str) and ':' not in record_time_str and record_time_str.isdigit():
-                         normalized_time_str = f"{int(record_time_str):02d}:00"
-
-
-                    booking_date_obj = datetime.strptime(record_date_str, DATE_FORMAT_IN_SHEET).date()
-                    booking_time_obj = datetime.strptime(normalized_time_str, "%H:%M").time()
-                    booking_datetime_naive = datetime.combine(booking_date_obj, booking_time_obj)
-                    booking_datetime_kyiv = KYIV_TZ.localize(booking_datetime_naive)
-
-                    if booking_datetime_kyiv > now_kyiv:
-                        # Зберігаємо оригінальний індекс рядка для можливого оновлення
-                        user_bookings.append({
-                            "row_index": row_idx, # gspread-сумісний індекс рядка
-                            "date": record_date_str,
-                            "time": normalized_time_str, # Зберігаємо нормалізований час
-                            "question": record.get(REQUEST_QUESTION_COLUMN, ""), # Адаптуйте назву колонки
-                            "data": record # Повний запис, якщо потрібні інші поля
-                        })
-                except ValueError as e_parse:
-                    print(f"ПОПЕРЕДЖЕННЯ [google_sheets.py]: Не вдалося розпарсити дату/час для запису user_id {user_id}: '{record_date_str} {record_time_str}'. Помилка: {e_parse}. Запис пропущено.", file=sys.stderr)
-                    continue
-        
-        print(f"DEBUG [google_sheets.py]: Found {len(user_bookings)} active bookings for user_id {user_id}.", file=sys.stderr)
-        # Сортуємо бронювання за датою та часом
-        user_bookings.sort(key=lambda b: (datetime.strptime(b['date'], DATE_FORMAT_IN_SHEET).date(), datetime.strptime(b['time'], "%H:%M").time()))
-        return user_bookings
 
+def requests_sync_stats() -> dict:
+    """Лічильники синхронізації 'Заявок' (повні читання, прочитані рядки хвоста, перевірені блоки)."""
+    return dict(_REQUESTS_MIRROR.stats, synced_rows=_REQUESTS_MIRROR.synced_rows)
+
+
+def _on_requests_appended(rows: list, append_response) -> None:
+    """Додає щойно дописані ботом рядки до дзеркала та індексу (номери рядків - з відповіді append)."""
+    global _BOOKINGS_INDEX_LOADED_AT
+    first_row_number = appended_row_number(append_response)
+    with _REQUESTS_SYNC_LOCK:
+        if not _REQUESTS_MIRROR.loaded:
+            return  # індекс ще не побудовано - рядки прочитає перша синхронізація
+        if not first_row_number or not _REQUESTS_MIRROR.record_append(first_row_number, rows):
+            # Номер рядка невідомий або рядки лягли не за дзеркалом - наступне звернення синхронізує аркуш
+            _BOOKINGS_INDEX_LOADED_AT = None
+            return
+        with _BOOKINGS_LOCK:
+            _index_request_rows(rows, first_row_number, _REQUESTS_HEADER, _REGISTRY.columns(REQUESTS_WORKSHEET_NAME))
+
+
+def _record_request_cell_update(row_index: int, col: int, value) -> None:
+    with _REQUESTS_SYNC_LOCK:
+        _REQUESTS_MIRROR.record_update(row_index, col, value)
+
+
+def _set_indexed_request_status(row_index: int, status: str) -> None:
+    with _BOOKINGS_LOCK:
+        for records in _BOOKINGS_INDEX.values():
+            for i, record in enumerate(records):
+                if record.row_index == row_index:
+                    records[i] = record._replace(status=status)
+                    return
+
+
+def request_bookings_snapshot() -> dict:
+    """Синхронізує 'Заявки' і повертає копію індексу { 'Telegram ID': [BookingRecord, ...] }."""
+    _ensure_bookings_index()
+    with _BOOKINGS_LOCK:
+        return {user_id_str: list(records) for user_id_str, records in _BOOKINGS_INDEX.items()}
+
+
+def get_user_bookings(user_id: int) -> list:
+    """
+    Отримує список активних (майбутніх) бронювань для вказаного user_id з аркуша 'Заявки'.
+    Повертає список словників {row_index, date, time, question, data}, відсортований за датою та часом.
+    Дані беруться з індексу бронювань, тож повторні запити не читають аркуш повністю.
+    """
+    print(f"DEBUG [google_sheets.py]: Fetching active bookings for user_id: {user_id}...", file=sys.stderr)
+    try:
+        _ensure_bookings_index()
     except gspread.exceptions.WorksheetNotFound:
         print(f"ПОМИЛКА [google_sheets.py]: Аркуш '{REQUESTS_WORKSHEET_NAME}' не знайдено при спробі отримати бронювання користувача.", file=sys.stderr)
         return []
-    except KeyError as e:
-        print(f"ПОМИЛКА [google_sheets.py]: Відсутня очікувана колонка в '{REQUESTS_WORKSHEET_NAME}' при отриманні бронювань: {e}", file=sys.stderr)
-        return []
     except Exception as e:
         print(f"ПОМИЛКА в get_user_bookings для user_id {user_id}: {type(e).__name__} - {e}", file=sys.stderr)
-        return []
+        if _BOOKINGS_INDEX_LOADED_AT is None:
+            return []
+        # Після невдалої синхронізації дзеркало скинуто, але вже побудований індекс ще придатний
+        print(f"ПОПЕРЕДЖЕННЯ [google_sheets.py]: Показую бронювання з попередньої синхронізації.", file=sys.stderr)
+
+    now_pos = now_position(datetime.now(KYIV_TZ))
+    with _BOOKINGS_LOCK:
+        records = [
+            record for record in _BOOKINGS_INDEX.get(str(user_id), ())
+            if record.slot.key > now_pos and record.status.lower() not in _CANCELLED_REQUEST_STATUSES
+        ]
+    records.sort(key=lambda record: record.slot.key)
+    print(f"DEBUG [google_sheets.py]: Found {len(records)} active bookings for user_id {user_id}.", file=sys.stderr)
+    return [
+        {
+            "row_index": record.row_index, # gspread-сумісний індекс рядка
+            "date": record.date,
+            "time": record.time, # Нормалізований час
+            "question": record.question,
+            "data": record.data, # Повний запис, якщо потрібні інші поля
+        }
+        for record in records
+    ]
+
 
+def _indexed_booking_slot(user_id: int, row_index: int):
+    """(дата, час) бронювання користувача в рядку row_index за індексом або (None, None)."""
+    with _BOOKINGS_LOCK:
+        for record in _BOOKINGS_INDEX.get(str(user_id), ()):
+            if record.row_index == row_index:
+                return record.date, record.time
+    return None, None
 
-def mark_booking_as_cancelled(row_index: int, user_name: str, user_id: int):
+
+def mark_booking_as_cancelled(row_index: int, user_name: str, user_id: int, date_str: str = None, time_str: str = None):
     """
     Оновлює запис про бронювання в аркуші 'Заявки', позначаючи його як скасоване.
     Наприклад, додає інформацію в нову колонку 'Статус Заявки' або до існуючої колонки 'Питання'.
+    Номер рядка міг застаріти (персонал видалив рядки вище), тож перед записом рядок читається
+    і звіряється з Telegram ID, а також з датою і часом бронювання (аргументи або індекс бронювань).
+    Якщо рядок описує інше бронювання, нічого не пишеться, індекс скидається і повертається False.
     """
     print(f"DEBUG [google_sheets.py]: Marking booking at row {row_index} as cancelled for user_id: {user_id}...", file=sys.stderr)
-    try:
-        client = get_gspread_client()
-        sheet = client.open(SPREADSHEET_NAME).worksheet(REQUESTS_WORKSHEET_NAME)
-        
-        # Перевіряємо наявність колонки REQUEST_STATUS_COLUMN
-        header = sheet.row_values(1) # Отримуємо заголовки
-        status_col_letter = None
-        notes_col_letter = None # Для резервного варіанту - додати до "Питання"
+    cancellation_note = f"Скасовано клієнтом ({user_name}, ID: {user_id}) о {datetime.now(KYIV_TZ).strftime('%d.%m.%Y %H:%M:%S')}"
+    if date_str is None or time_str is None:
+        date_str, time_str = _indexed_booking_slot(user_id, row_index)
+    time_key = normalize_time_str(time_str) if time_str else None
 
-        try:
-            status_col_idx = header.index(REQUEST_STATUS_COLUMN) + 1 # +1 для gspread індексації
-            status_col_letter = gspread.utils.rowcol_to_a1(1, status_col_idx)[0] # Отримуємо літеру колонки
-        except ValueError:
-            print(f"ПОПЕРЕДЖЕННЯ [google_sheets.py]: Колонка '{REQUEST_STATUS_COLUMN}' не знайдена в '{REQUESTS_WORKSHEET_NAME}'. Спробую додати примітку до питання.", file=sys.stderr)
-            # Якщо колонки статусу немає, спробуємо знайти колонку "Питання" для додавання примітки
-            try:
-                # Назва колонки "Питання" жорстко задана в handlers.py при append_row
-                # Це може бути індекс 3 (D), якщо рахувати з 1 (A) для Ім'я, B для Telegram, C для Питання
-                # Давайте знайдемо її за назвою "Питання" або припустимо індекс
-                question_col_name_actual = "Питання" # Як використовується в handlers.py
-                if question_col_name_actual in header:
-                    notes_col_idx = header.index(question_col_name_actual) + 1
-                    notes_col_letter = gspread.utils.rowcol_to_a1(1, notes_col_idx)[0]
-                else: # Резервний варіант, якщо навіть "Питання" немає (малоймовірно)
-                    print(f"ПОПЕРЕДЖЕННЯ [google_sheets.py]: Колонка '{question_col_name_actual}' також не знайдена. Скасування не буде детально позначено в аркуші 'Заявки'.", file=sys.stderr)
-
-            except ValueError:
-                 print(f"ПОПЕРЕДЖЕННЯ [google_sheets.py]: Резервна колонка 'Питання' не знайдена. Скасування не буде детально позначено.", file=sys.stderr)
-
-
-        cancellation_note = f"Скасовано клієнтом ({user_name}, ID: {user_id}) о {datetime.now(KYIV_TZ).strftime('%d.%m.%Y %H:%M:%S')}"
-
-        if status_col_letter:
-            sheet.update_acell(f"{status_col_letter}{row_index}", "Скасовано клієнтом")
+    def _mark(sheet, columns):
+        row_values = sheet.row_values(row_index)
+        padded = [str(v) for v in row_values] + [""] * (max(columns.values()) - len(row_values))
+        if padded[columns[REQUEST_USER_ID_COLUMN] - 1].strip() != str(user_id) or \
+                (date_str and padded[columns[REQUEST_DATE_COLUMN] - 1].strip() != str(date_str).strip()) or \
+                (time_key and normalize_time_str(padded[columns[REQUEST_TIME_COLUMN] - 1]) != time_key):
+            print(f"ПОПЕРЕДЖЕННЯ [google_sheets.py]: Рядок {row_index} '{REQUESTS_WORKSHEET_NAME}' вже не бронювання "
+                  f"{user_id} {date_str} {time_str} (рядки зсунулися). Скасування не записано.", file=sys.stderr)
+            return None
+        # Номери колонок беремо з реєстру замість читання заголовка при кожному скасуванні
+        status_col_idx = columns.get(REQUEST_STATUS_COLUMN)
+        notes_col_idx = columns.get(REQUEST_QUESTION_COLUMN) # Резервний варіант - додати примітку до "Питання"
+
+        if status_col_idx:
+            sheet.update_cell(row_index, status_col_idx, "Скасовано клієнтом")
+            _record_request_cell_update(row_index, status_col_idx, "Скасовано клієнтом")
+            _set_indexed_request_status(row_index, "Скасовано клієнтом")
             # Можна додати детальнішу примітку в іншу колонку, якщо є
             # Наприклад, якщо є колонка "Примітки Адміністратора"
             print(f"DEBUG [google_sheets.py]: Booking at row {row_index} updated with status 'Скасовано клієнтом'.", file=sys.stderr)
 
-        elif notes_col_letter: # Якщо є колонка "Питання"
-            original_question = sheet.acell(f"{notes_col_letter}{row_index}").value or ""
+        elif notes_col_idx: # Якщо є колонка "Питання"
+            print(f"ПОПЕРЕДЖЕННЯ [google_sheets.py]: Колонка '{REQUEST_STATUS_COLUMN}' не знайдена в '{REQUESTS_WORKSHEET_NAME}'. Додаю примітку до питання.", file=sys.stderr)
+            original_question = padded[notes_col_idx - 1]
             updated_question = f"{original_question} [INFO: {cancellation_note}]"
-            sheet.update_acell(f"{notes_col_letter}{row_index}", updated_question)
+            sheet.update_cell(row_index, notes_col_idx, updated_question)
+            _record_request_cell_update(row_index, notes_col_idx, updated_question)
+            # Без колонки статусу скасування видно лише в примітці - прибираємо запис з активних в індексі
+            _set_indexed_request_status(row_index, "Скасовано клієнтом")
             print(f"DEBUG [google_sheets.py]: Cancellation note added to question for booking at row {row_index}.", file=sys.stderr)
         else:
             print(f"INFO [google_sheets.py]: Не вдалося знайти підходящу колонку для позначки про скасування заявки в рядку {row_index}.", file=sys.stderr)
             # Тут можна просто нічого не робити, або додати новий стовпець, якщо є права і бажання
-            
+
         return True
 
+    try:
+        marked = _REGISTRY.run(REQUESTS_WORKSHEET_NAME, _mark)
     except Exception as e:
         print(f"ПОМИЛКА в mark_booking_as_cancelled для рядка {row_index}: {type(e).__name__} - {e}", file=sys.stderr)
         return False
+    if marked is None:
+        invalidate_bookings_index()
+        return False
+    return marked
+
+
+def append_request_rows(rows: list, delivery_keys: list = None):
+    """
+    Додає рядки заявок в аркуш 'Заявки' одним викликом append_rows (викликається flusher-ом журналу).
+    delivery_keys - ключі рядків для колонки REQUEST_DELIVERY_KEY_COLUMN (якщо вона є в аркуші).
+    Повертає відповідь Sheets API. Помилки прокидаються викликачу.
+    """
+    def _append(sheet, columns):
+        key_col = columns.get(REQUEST_DELIVERY_KEY_COLUMN)
+        if key_col and delivery_keys:
+            stamped = []
+            for row, key in zip(rows, delivery_keys):
+                row = list(row) + [""] * max(key_col - len(row), 0)
+                row[key_col - 1] = key
+                stamped.append(row)
+        else:
+            stamped = rows
+        return stamped, sheet.append_rows(stamped)
+
+    appended, response = _REGISTRY.run(REQUESTS_WORKSHEET_NAME, _append)
+    _on_requests_appended(appended, response)
+    return response
+
+
+def delivered_request_keys(delivery_keys: list) -> set:
+    """Які з ключів доставки вже є в 'Заявках' (одне читання колонки; без колонки - жоден)."""
+    def _read(sheet, columns):
+        key_col = columns.get(REQUEST_DELIVERY_KEY_COLUMN)
+        if not key_col:
+            return set()
+        return set(sheet.col_values(key_col)) & set(delivery_keys)
 
-# Функція для збереження заявки (виклик з bot.py)
-# Можна залишити в bot.py або перенести сюди для кращої організації
-# def save_request(...)
-#     client = get_gspread_client()
-#     sheet = client.open(SPREADSHEET_NAME).worksheet(REQUESTS_WORKSHEET_NAME)
-#     sheet.append_row([...])
+    return _REGISTRY.run(REQUESTS_WORKSHEET_NAME, _read)
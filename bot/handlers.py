@@ -26,31 +26,28 @@ from .keyboards import (
     get_confirm_cancellation_keyboard # <<< НОВИЙ ІМПОРТ
 )
 from .google_sheets import (
-    get_available_dates,
-    update_status,
-    get_client_provided_name,
-    save_or_update_client_name,
-    get_gspread_client,  
-    SPREADSHEET_NAME,  
-    REQUESTS_WORKSHEET_NAME,
     STATUS_BOOKED,
     STATUS_FREE, # <<< НОВИЙ ІМПОРТ
     STATUS_CANCELLED_BY_USER_IN_SCHEDULE, # <<< НОВИЙ ІМПОРТ
-    get_user_bookings,           # <<< НОВИЙ ІМПОРТ
-    mark_booking_as_cancelled,   # <<< НОВИЙ ІМПОРТ
     KYIV_TZ,
     # DATE_FORMAT_IN_SHEET # Уже импортирован в keyboards.py
 )
+# Усі дані - через сховище, обране STORAGE_BACKEND (Google Sheets або локальна SQLite з реплікацією в таблицю)
+from .storage import get_storage
+from .slot_holds import get_slot_holds
 from .utils import (
     notify_admin_new_contact, 
     notify_admin_new_booking_extended,
-    notify_admin_cancellation # <<< НОВИЙ ІМПОРТ
+    notify_admin_cancellation, # <<< НОВИЙ ІМПОРТ
+    edit_text_if_changed,
 )
 
 if 'KYIV_TZ' not in globals(): # type: ignore
     KYIV_TZ = pytz.timezone('Europe/Kiev')
 
 main_router = Router(name="main_handlers_router")
+storage = get_storage()
+slot_holds = get_slot_holds()
 
 
 async def show_service_choice_menu(target_message_or_callback: types.TelegramObject, state: FSMContext,
@@ -62,7 +59,7 @@ async def show_service_choice_menu(target_message_or_callback: types.TelegramObj
 
     if isinstance(target_message_or_callback, CallbackQuery):
         try:
-            await target_message_or_callback.message.edit_text(text, reply_markup=keyboard)
+            await edit_text_if_changed(target_message_or_callback.message, text, reply_markup=keyboard)
         except Exception as e_edit:
             print(f"DEBUG [handlers.py]: Не удалось отредактировать сообщение (show_service_choice_menu), отправляю новое. Ошибка: {e_edit}", file=sys.stderr)
             await target_message_or_callback.message.answer(text, reply_markup=keyboard)
@@ -74,11 +71,12 @@ async def show_service_choice_menu(target_message_or_callback: types.TelegramObj
 async def cmd_start_handler(message: Message, state: FSMContext, remembered_name: str = None):
     await state.clear()
     user_id = message.from_user.id
+    await slot_holds.release_user(user_id)  # сценарій запису перервано - утримуваний час знову вільний
     stored_name = None
 
     if not remembered_name:
         try:
-            stored_name = get_client_provided_name(user_id) #
+            stored_name = await storage.get_client_provided_name(user_id) #
         except Exception as e:
             print(f"ОШИБКА [handlers.py]: проверка сохраненного имени клиента: {type(e).__name__} - {e}", file=sys.stderr)
 
@@ -98,7 +96,7 @@ async def cmd_rename_handler(message: Message, state: FSMContext):
 
     if not current_name:
         try:
-            current_name_from_sheet = get_client_provided_name(user_id) #
+            current_name_from_sheet = await storage.get_client_provided_name(user_id) #
             if current_name_from_sheet:
                 current_name = current_name_from_sheet
         except Exception as e:
@@ -131,7 +129,7 @@ async def process_new_name_handler(message: Message, state: FSMContext):
         return
 
     try:
-        save_or_update_client_name(user_id, tg_username, new_name) #
+        await storage.save_or_update_client_name(user_id, tg_username, new_name) #
         await state.update_data(name=new_name)
         await message.answer(f"Ваше ім'я успішно змінено на: <b>{new_name}</b>.", parse_mode="HTML")
         print(f"DEBUG [handlers.py]: Ім'я для user {user_id} оновлено на '{new_name}' через /rename.", file=sys.stderr)
@@ -160,7 +158,7 @@ async def service_choice_callback_handler(callback: CallbackQuery, state: FSMCon
     if not user_name:
         try:
             print(f"DEBUG [handlers.py]: Ім'я не знайдено в FSM для user {user_id}. Запит до get_client_provided_name...", file=sys.stderr)
-            user_name_from_sheet = get_client_provided_name(user_id) #
+            user_name_from_sheet = await storage.get_client_provided_name(user_id) #
             if user_name_from_sheet:
                 user_name = user_name_from_sheet
                 await state.update_data(name=user_name)
@@ -199,7 +197,7 @@ async def service_choice_callback_handler(callback: CallbackQuery, state: FSMCon
         if not user_name: # Якщо ім'я невідоме, попросити його спочатку
             await state.set_state(Form.booking_name) # Можна використати той самий стан для введення імені
             await state.update_data(next_action_after_name="cancel_booking") # Зберігаємо, що робити після введення імені
-            await callback.message.edit_text(
+            await edit_text_if_changed(callback.message,
                 "Для скасування запису мені потрібно знати ваше ім'я, під яким ви робили бронювання.\n"
                 "Будь ласка, напишіть ваше ім'я:", reply_markup=None
             )
@@ -222,7 +220,7 @@ async def callback_name_handler(message: Message, state: FSMContext):
     tg_username = f"@{message.from_user.username}" if message.from_user.username else ""
 
     try:
-        save_or_update_client_name(user_id, tg_username, user_name_provided) #
+        await storage.save_or_update_client_name(user_id, tg_username, user_name_provided) #
         print(f"DEBUG [handlers.py]: Ім'я '{user_name_provided}' збережено/оновлено для user {user_id} (зворотний дзвінок).", file=sys.stderr)
     except Exception as e:
         print(f"ОШИБКА [handlers.py]: збереження імені клієнта (гілка контакту): {type(e).__name__} - {e}", file=sys.stderr)
@@ -247,10 +245,8 @@ async def contact_shared_handler(message: Message, state: FSMContext):
 
     try:
         timestamp = datetime.now(KYIV_TZ).strftime("%d.%m.%Y %H:%M:%S")
-        g_client = get_gspread_client() #
-        sheet = g_client.open(SPREADSHEET_NAME).worksheet(REQUESTS_WORKSHEET_NAME) #
         print(f"DEBUG [handlers.py]: Сохранение SHARED контакта для {user_name}...", file=sys.stderr)
-        sheet.append_row([
+        await storage.append_request_row([
             user_name, contact_info, "Запит на дзвінок (контакт пошарено)",
             telegram_username, "", "", timestamp
         ])
@@ -275,11 +271,9 @@ async def get_phone_number_text_handler(message: Message, state: FSMContext):
     await state.update_data(contact=contact_info)
 
     try:
-        g_client = get_gspread_client() #
-        sheet = g_client.open(SPREADSHEET_NAME).worksheet(REQUESTS_WORKSHEET_NAME) #
         timestamp = datetime.now(KYIV_TZ).strftime("%d.%m.%Y %H:%M:%S")
         print(f"DEBUG [handlers.py]: Сохранение TYPED контакта для {user_name}...", file=sys.stderr)
-        sheet.append_row([
+        await storage.append_request_row([
             user_name, contact_info, "Запит на дзвінок (контакт введено)",
             telegram_username, "", "", timestamp
         ])
@@ -303,7 +297,7 @@ async def booking_name_handler(message: Message, state: FSMContext):
     tg_username = f"@{message.from_user.username}" if message.from_user.username else ""
 
     try:
-        save_or_update_client_name(user_id, tg_username, user_name_provided) #
+        await storage.save_or_update_client_name(user_id, tg_username, user_name_provided) #
         print(f"DEBUG [handlers.py]: Ім'я '{user_name_provided}' збережено/оновлено для user {user_id}.", file=sys.stderr)
     except Exception as e:
         print(f"ОШИБКА [handlers.py]: збереження імені клієнта (гілка бронювання): {type(e).__name__} - {e}", file=sys.stderr)
@@ -334,20 +328,20 @@ async def back_to_date_selection_handler(callback: CallbackQuery, state: FSMCont
     user_data = await state.get_data()
     user_name = user_data.get("name")
     try:
-        available_dates = get_available_dates() #
+        available_dates = await storage.get_available_dates() #
         if not available_dates:
-            await callback.message.edit_text("На жаль, на даний момент немає доступних дат. Повертаю на головне меню.")
+            await edit_text_if_changed(callback.message, "На жаль, на даний момент немає доступних дат. Повертаю на головне меню.")
             await show_service_choice_menu(callback, state, user_name)
             return
         keyboard = get_dates_keyboard(available_dates) #
-        await callback.message.edit_text(
+        await edit_text_if_changed(callback.message,
             f"{user_name}, ось доступні дати для запису (на 7 днів):\nВиберіть дату:",
             reply_markup=keyboard
         )
         await state.set_state(Form.date) #
     except Exception as e:
         print(f"ОШИБКА [handlers.py]: в back_to_date_selection: {type(e).__name__} - {e}", file=sys.stderr)
-        await callback.message.edit_text("Виникла помилка. Повертаю на головне меню.")
+        await edit_text_if_changed(callback.message, "Виникла помилка. Повертаю на головне меню.")
         await show_service_choice_menu(callback, state, user_name)
 
 
@@ -357,19 +351,19 @@ async def get_date_callback_handler(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     selected_date = callback.data.split("date_")[1]
     try:
-        available_dates = get_available_dates() #
+        available_dates = await storage.get_available_dates() #
         if selected_date in available_dates and available_dates[selected_date]:
             available_times = available_dates[selected_date]
             await state.update_data(date=selected_date)
             await state.set_state(Form.time) #
-            keyboard = get_times_keyboard(available_times) #
-            await callback.message.edit_text(
+            keyboard = get_times_keyboard(available_times, getattr(available_dates, "version", None), selected_date) #
+            await edit_text_if_changed(callback.message,
                 f"Доступні часи на {selected_date}:\nВиберіть час:",
                 reply_markup=keyboard
             )
         else:
             keyboard = get_dates_keyboard(available_dates) #
-            await callback.message.edit_text(
+            await edit_text_if_changed(callback.message,
                 "На жаль, ця дата або час на неї вже недоступні. Спробуйте вибрати іншу або натисніть 'Назад'.",
                 reply_markup=keyboard
             )
@@ -389,29 +383,32 @@ async def get_time_callback_handler(callback: CallbackQuery, state: FSMContext):
     user_name = user_data.get("name", f"User {callback.from_user.id}")
 
     if not selected_date:
-        await callback.message.edit_text("Виникла помилка стану (не знайдено обрану дату). Будь ласка, почніть з /start.")
+        await edit_text_if_changed(callback.message, "Виникла помилка стану (не знайдено обрану дату). Будь ласка, почніть з /start.")
         await state.clear()
         return
     try:
-        # При бронюванні, очікуваний поточний статус - 'вільно'
-        booking_successful = update_status(selected_date, selected_time, STATUS_BOOKED, expected_current_status=STATUS_FREE) #
-        if booking_successful:
+        # Слот утримується за користувачем до вибору месенджера ('вільно' -> 'Утримується'), бронюється в messenger_choice_handler
+        hold_successful = await slot_holds.hold(selected_date, selected_time, callback.from_user.id)
+        if hold_successful:
             await state.update_data(time=selected_time)
             await state.set_state(Form.question) #
-            await callback.message.edit_text(
-                f"Час {selected_date} {selected_time} успішно заброньовано!\nТепер, будь ласка, опишіть коротко ваше питання або мету консультації:"
+            hold_minutes = max(1, round(slot_holds.ttl / 60))
+            await edit_text_if_changed(callback.message,
+                f"Час {selected_date} {selected_time} утримується за вами {hold_minutes} хв.\n"
+                f"Щоб підтвердити запис, будь ласка, опишіть коротко ваше питання або мету консультації:"
             )
         else:
-            current_available_dates = get_available_dates() #
+            current_available_dates = await storage.get_available_dates() #
             if selected_date in current_available_dates and current_available_dates[selected_date]:
-                keyboard = get_times_keyboard(current_available_dates[selected_date]) #
-                await callback.message.edit_text(
+                keyboard = get_times_keyboard(current_available_dates[selected_date],
+                                              getattr(current_available_dates, "version", None), selected_date) #
+                await edit_text_if_changed(callback.message,
                     f"На жаль, час {selected_time} на {selected_date} щойно зайняли або став недоступним. Спробуйте обрати інший:",
                     reply_markup=keyboard
                 )
                 await state.set_state(Form.time) #
             else: # Якщо вся дата стала недоступною
-                await callback.message.edit_text(
+                await edit_text_if_changed(callback.message,
                     f"На жаль, на {selected_date} більше немає вільних слотів або дата стала недоступною. Будь ласка, оберіть іншу дату або почніть з /start.",
                     reply_markup=get_dates_keyboard(current_available_dates) if current_available_dates else get_back_to_main_menu_keyboard() #
                 )
@@ -485,7 +482,7 @@ async def back_to_booking_phone_handler(callback: CallbackQuery, state: FSMConte
     
     await state.set_state(Form.booking_phone_number) #
     keyboard = get_share_contact_keyboard() #
-    await callback.message.edit_text( # Редагуємо попереднє повідомлення
+    await edit_text_if_changed(callback.message,  # Редагуємо попереднє повідомлення
         f"Добре, повертаємось до введення номера телефону.\nВаше питання було: \"{question_text}\".\n\n"
         f"Будь ласка, поділіться вашим <b>номером телефону</b>. \n"
         "Натисніть кнопку нижче або введіть номер вручну:",
@@ -510,13 +507,21 @@ async def messenger_choice_handler(callback: CallbackQuery, state: FSMContext):
     telegram_username = f"@{callback.from_user.username}" if callback.from_user.username else f"ID:{user_id}"
 
     if not all([selected_date, selected_time, question, booking_phone_number, chosen_messenger_text]):
-        await callback.message.edit_text("Виникла помилка стану (не всі дані зібрано). Будь ласка, почніть з /start.")
+        await edit_text_if_changed(callback.message, "Виникла помилка стану (не всі дані зібрано). Будь ласка, почніть з /start.")
         await state.clear()
         return
 
     try:
-        g_client = get_gspread_client() #
-        sheet = g_client.open(SPREADSHEET_NAME).worksheet(REQUESTS_WORKSHEET_NAME) #
+        # Утримання -> бронювання; якщо утримання спливло і час уже зайняли, заявку не зберігаємо
+        if not await slot_holds.confirm(selected_date, selected_time, user_id):
+            print(f"DEBUG [handlers.py]: Утримання {selected_date} {selected_time} для {user_name} спливло, час зайнято.", file=sys.stderr)
+            await edit_text_if_changed(callback.message,
+                f"На жаль, час {selected_date} {selected_time} більше не утримується за вами і його вже зайняли.\n"
+                f"Будь ласка, почніть запис знову та оберіть інший час."
+            )
+            await callback.message.answer("Бажаєте повернутися до головного меню?", reply_markup=get_back_to_main_menu_keyboard()) #
+            await state.clear()
+            return
         timestamp = datetime.now(KYIV_TZ).strftime("%d.%m.%Y %H:%M:%S")
         print(f"DEBUG [handlers.py]: Збереження запису для {user_name} з телефоном і месенджером...", file=sys.stderr)
         # Порядок колонок: Ім'я, Телеграм-контакт (UserName/ID), Питання, User ID (числовий), Дата, Час, Час запису (timestamp), Телефон (для консультації), Месенджер, Статус Заявки
@@ -526,7 +531,7 @@ async def messenger_choice_handler(callback: CallbackQuery, state: FSMContext):
         #     selected_date, selected_time, timestamp,
         #     booking_phone_number, chosen_messenger_text, "Активна" # Новий статус
         # ])
-        sheet.append_row([
+        await storage.append_request_row([
             user_name,            # Ім’я
             telegram_username,    # Контакт (if this is what you mean by 'Контакт' or if 'Контакт' is separate)
             question,             # Питання
@@ -540,7 +545,7 @@ async def messenger_choice_handler(callback: CallbackQuery, state: FSMContext):
         ])
         print("DEBUG [handlers.py]: Запис збережено (з телефоном і месенджером, статус 'Активна').", file=sys.stderr)
         await notify_admin_new_booking_extended( bot, ADMIN_CHAT_ID, user_name, selected_date, selected_time, question, telegram_username, user_id, timestamp, booking_phone_number, chosen_messenger_text ) #
-        await callback.message.edit_text(
+        await edit_text_if_changed(callback.message,
             f"Дякую, {user_name}! Ваш запис на консультацію ({selected_date} {selected_time}) підтверджено!\n\n"
             f"<b>Ваш телефон:</b> <code>{booking_phone_number}</code>\n"
             f"<b>Бажаний месенджер:</b> {chosen_messenger_text}",
@@ -572,7 +577,7 @@ async def process_cancellation_request(target_object: types.TelegramObject, stat
     """Обробляє запит на скасування: отримує та показує активні бронювання користувача."""
     try:
         print(f"DEBUG [handlers.py]: Користувач {user_name} (ID: {user_id}) запитує скасування бронювання. Отримання бронювань...", file=sys.stderr)
-        user_active_bookings = get_user_bookings(user_id) #
+        user_active_bookings = await storage.get_user_bookings(user_id) #
 
         message_target = target_object.message if isinstance(target_object, CallbackQuery) else target_object
 
@@ -588,7 +593,7 @@ async def process_cancellation_request(target_object: types.TelegramObject, stat
         text_to_send = f"{user_name}, ось ваші активні записи. Оберіть той, який бажаєте скасувати:"
         
         if isinstance(target_object, CallbackQuery):
-             await target_object.message.edit_text(text_to_send, reply_markup=keyboard)
+             await edit_text_if_changed(target_object.message, text_to_send, reply_markup=keyboard)
         else: # Message
              await target_object.answer(text_to_send, reply_markup=keyboard)
 
@@ -628,7 +633,7 @@ async def select_booking_for_cancellation_handler(callback: CallbackQuery, state
         )
         
         confirm_keyboard = get_confirm_cancellation_keyboard(f"{row_index_str}_{date_str}_{time_str}") #
-        await callback.message.edit_text(
+        await edit_text_if_changed(callback.message,
             f"Ви впевнені, що хочете скасувати запис на <b>{date_str} о {time_str}</b>?",
             reply_markup=confirm_keyboard,
             parse_mode="HTML"
@@ -637,7 +642,7 @@ async def select_booking_for_cancellation_handler(callback: CallbackQuery, state
 
     except (IndexError, ValueError) as e:
         print(f"ОШИБКА [handlers.py]: Некоректний формат callback_data для скасування: {callback.data}. Помилка: {e}", file=sys.stderr)
-        await callback.message.edit_text(
+        await edit_text_if_changed(callback.message,
             "Сталася помилка при обробці вашого вибору. Будь ласка, спробуйте ще раз.",
             reply_markup=get_back_to_main_menu_keyboard() #
         )
@@ -658,7 +663,7 @@ async def confirm_cancellation_yes_handler(callback: CallbackQuery, state: FSMCo
     time_to_cancel = user_data.get("cancellation_time")
 
     if not all([row_to_cancel_index, date_to_cancel, time_to_cancel]):
-        await callback.message.edit_text(
+        await edit_text_if_changed(callback.message,
             "Помилка: не знайдено дані для скасування. Будь ласка, почніть процедуру скасування знову.",
             reply_markup=get_back_to_main_menu_keyboard() #
         )
@@ -668,7 +673,7 @@ async def confirm_cancellation_yes_handler(callback: CallbackQuery, state: FSMCo
     try:
         # 1. Оновити статус в "Графіку" на "вільно (скасовано клієнтом)"
         # Очікуваний поточний статус в "Графіку" - STATUS_BOOKED
-        schedule_updated = update_status(
+        schedule_updated = await storage.update_status(
             date_to_cancel, 
             time_to_cancel, 
             STATUS_CANCELLED_BY_USER_IN_SCHEDULE, # або просто STATUS_FREE, якщо не потрібен окремий статус
@@ -677,19 +682,19 @@ async def confirm_cancellation_yes_handler(callback: CallbackQuery, state: FSMCo
 
         if not schedule_updated:
             # Можливо, слот вже був звільнений або змінений адміністратором
-            await callback.message.edit_text(
+            await edit_text_if_changed(callback.message,
                 f"Не вдалося автоматично оновити графік для {date_to_cancel} {time_to_cancel}. Можливо, цей запис вже було змінено або скасовано. "
                 "Будь ласка, перевірте актуальність інформації або зверніться до адміністратора.",
                 reply_markup=get_back_to_main_menu_keyboard() #
             )
             # Все одно спробуємо позначити заявку як скасовану, якщо вона є
-            mark_booking_as_cancelled(row_to_cancel_index, user_name, user_id) #
+            await storage.mark_booking_as_cancelled(row_to_cancel_index, user_name, user_id) #
             await notify_admin_cancellation(bot, ADMIN_CHAT_ID, user_name, date_to_cancel, time_to_cancel, telegram_username, user_id, datetime.now(KYIV_TZ).strftime("%d.%m.%Y %H:%M:%S"), ) #
             await state.clear()
             return
 
         # 2. Позначити бронювання як скасоване в аркуші "Заявки"
-        request_marked = mark_booking_as_cancelled(row_to_cancel_index, user_name, user_id) #
+        request_marked = await storage.mark_booking_as_cancelled(row_to_cancel_index, user_name, user_id) #
         if not request_marked:
             # Це не критично для користувача, але адмін має знати
             print(f"ПОПЕРЕДЖЕННЯ [handlers.py]: Не вдалося оновити статус заявки в аркуші 'Заявки' для рядка {row_to_cancel_index}, але графік оновлено.", file=sys.stderr)
@@ -707,7 +712,7 @@ async def confirm_cancellation_yes_handler(callback: CallbackQuery, state: FSMCo
             timestamp=datetime.now(KYIV_TZ).strftime("%d.%m.%Y %H:%M:%S")
         ) #
 
-        await callback.message.edit_text(
+        await edit_text_if_changed(callback.message,
             f"Ваш запис на <b>{date_to_cancel} о {time_to_cancel}</b> успішно скасовано.",
             reply_markup=get_back_to_main_menu_keyboard(), #
             parse_mode="HTML"
@@ -716,7 +721,7 @@ async def confirm_cancellation_yes_handler(callback: CallbackQuery, state: FSMCo
 
     except Exception as e:
         print(f"КРИТИЧНА ПОМИЛКА [handlers.py]: під час підтвердження скасування для {user_name} ({date_to_cancel} {time_to_cancel}): {type(e).__name__} - {e}", file=sys.stderr)
-        await callback.message.edit_text(
+        await edit_text_if_changed(callback.message,
             "На жаль, сталася помилка під час скасування вашого запису. Будь ласка, спробуйте пізніше або зв'яжіться з адміністратором.",
             reply_markup=get_back_to_main_menu_keyboard() #
         )
@@ -735,7 +740,7 @@ async def confirm_cancellation_no_handler(callback: CallbackQuery, state: FSMCon
     # або до головного меню.
     # Оскільки ми вже в Form.confirm_cancellation, значить перед цим був список.
     # Тому викликаємо process_cancellation_request знову
-    await callback.message.edit_text("Добре, ваш запис залишається активним. Оновлюю список ваших записів...")
+    await edit_text_if_changed(callback.message, "Добре, ваш запис залишається активним. Оновлюю список ваших записів...")
     await process_cancellation_request(callback, state, user_name, user_id)
     # Або можна просто повернути на головне меню:
     # await callback.message.edit_text("Ваш запис залишається активним.", reply_markup=get_back_to_main_menu_keyboard())
@@ -753,9 +758,10 @@ async def back_to_main_menu_callback_handler(callback: CallbackQuery, state: FSM
     await callback.answer()
     await state.clear()
     user_id = callback.from_user.id
+    await slot_holds.release_user(user_id)
     display_name = None
     try:
-        stored_name = get_client_provided_name(user_id) #
+        stored_name = await storage.get_client_provided_name(user_id) #
         if stored_name:
             display_name = stored_name
             await state.update_data(name=display_name)
@@ -776,13 +782,13 @@ async def show_available_dates_for_booking(target: types.TelegramObject, state:
 
     try:
         print(f"DEBUG [handlers.py]: Користувач {user_name} переходить до вибору дати. Отримання дат...", file=sys.stderr)
-        available_dates = get_available_dates() #
+        available_dates = await storage.get_available_dates() #
 
         if not available_dates:
             no_dates_text = f"На жаль, {user_name}, зараз немає доступних дат для запису. Спробуйте пізніше."
             # Потрібно використати edit_text або answer залежно від типу target
             if isinstance(target, CallbackQuery):
-                await message_to_edit_or_answer.edit_text(no_dates_text, reply_markup=get_service_choice_keyboard()) #
+                await edit_text_if_changed(message_to_edit_or_answer, no_dates_text, reply_markup=get_service_choice_keyboard()) #
                 await state.set_state(Form.service_choice) #
             else: # Message
                 await message_to_edit_or_answer.answer(no_dates_text)
@@ -793,7 +799,7 @@ async def show_available_dates_for_booking(target: types.TelegramObject, state:
         text_to_send = f"Дякую, {user_name}! Ось доступні дати для запису (на 7 днів):\nВиберіть дату:"
 
         if isinstance(target, CallbackQuery):
-            await message_to_edit_or_answer.edit_text(text_to_send, reply_markup=keyboard)
+            await edit_text_if_changed(message_to_edit_or_answer, text_to_send, reply_markup=keyboard)
         else: # Message
             await message_to_edit_or_answer.answer(text_to_send, reply_markup=keyboard)
         await state.set_state(Form.date) #
@@ -803,7 +809,7 @@ async def show_available_dates_for_booking(target: types.TelegramObject, state:
         error_text = "Виникла помилка при отриманні списку дат."
         if isinstance(target, CallbackQuery):
             try:
-                await message_to_edit_or_answer.edit_text(
+                await edit_text_if_changed(message_to_edit_or_answer,
                     f"{error_text} Будь ласка, спробуйте пізніше або поверніться до вибору послуг.",
                     reply_markup=get_service_choice_keyboard()) #
                 await state.set_state(Form.service_choice) #
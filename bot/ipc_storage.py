@@ -0,0 +1,276 @@
+# /root/telegram-schedule-bot/bot/ipc_storage.py
+# Спільне сховище для процесів-воркерів (bot/workers.py). Справжнє сховище (Sheets або SQLite разом
+# з кешем графіка, журналом заявок, реплікатором і замками слотів) живе лише в процесі-власнику, а
+# воркери звертаються до нього через локальний Unix-сокет (STORAGE_BACKEND=ipc, задає сам пул).
+# Тож бронювання з усіх процесів проходять через одні замки слотів і один кеш, а квота Sheets API
+# витрачається одним процесом. Кадр - довжина (4 байти) і pickle; сокет лежить у тимчасовому
+# каталозі, доступному лише користувачу бота. Знімок графіка пересилається лише тоді, коли
+# змінилася його версія, інакше воркер віддає хендлерам той самий об'єкт, що й минулого разу.
+# Утримання слотів (slot_holds.py) теж ведуться лише власником: IpcSlotHolds воркера передає
+# hold/confirm/release_user тим самим з'єднанням, тож утримання воркера, що впав або
+# перезапустився, знімає фонова задача власника, як і будь-які інші. Разом з результатом власник
+# повертає строк утримання користувача і свої hold_stats, тож синхронні expires_in і hold_stats
+# воркера відповідають без окремого виклику.
+
+import asyncio
+import itertools
+import os
+import pickle
+import struct
+import sys
+import time
+from collections import Counter
+from collections.abc import Mapping
+from typing import List, Optional
+
+from .google_sheets import STATUS_FREE
+from .schedule_snapshot import ScheduleSnapshot
+from .storage import Storage
+
+STORAGE_IPC_ADDRESS = os.getenv("STORAGE_IPC_ADDRESS", "")  # шлях до сокета власника сховища
+
+_HEADER = struct.Struct("!I")
+# Методи Storage, які власник виконує на прохання воркерів (get_available_dates - окремо, з версією)
+_REMOTE_METHODS = frozenset({
+    "update_status", "update_statuses", "slots_with_status", "get_user_bookings", "mark_booking_as_cancelled",
+    "get_client_provided_name", "save_or_update_client_name", "append_request_row",
+})
+# Методи SlotHolds власника (у кадрі - з префіксом "slot_holds.")
+_SLOT_HOLD_METHODS = frozenset({"hold", "confirm", "release_user"})
+
+
+def write_frame(writer: asyncio.StreamWriter, message) -> None:
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    writer.write(_HEADER.pack(len(payload)) + payload)
+
+
+async def read_frame(reader: asyncio.StreamReader):
+    """Наступне повідомлення; asyncio.IncompleteReadError - інший бік закрив з'єднання."""
+    (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return pickle.loads(await reader.readexactly(size))
+
+
+class StorageCallError(RuntimeError):
+    """Виклик сховища у процесі-власнику завершився помилкою (текст - тип і повідомлення оригіналу)."""
+
+
+class StorageServer:
+    """Обслуговує сховище і утримання слотів процесу-власника для воркерів. Кожен виклик - окрема задача, як у хендлерах."""
+
+    def __init__(self, storage: Storage, address: str, slot_holds=None):
+        self.storage = storage
+        self.slot_holds = slot_holds
+        self.address = address
+        self._server = None
+        self._tasks = set()
+        self.stats = Counter()  # виклики за методами, 'errors', 'snapshots_sent'
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_unix_server(self._serve, path=self.address)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                call_id, method, args = await read_frame(reader)
+                task = asyncio.create_task(self._answer(writer, call_id, method, args))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # воркер завершився
+        finally:
+            writer.close()
+
+    async def _answer(self, writer: asyncio.StreamWriter, call_id: int, method: str, args: tuple) -> None:
+        self.stats[method] += 1
+        try:
+            if method == "get_available_dates":
+                snapshot = await self.storage.get_available_dates()
+                known_version = args[0]
+                if known_version == snapshot.version:
+                    value = (snapshot.version, None)
+                else:
+                    value = (snapshot.version, {date_str: snapshot[date_str] for date_str in snapshot})
+                    self.stats["snapshots_sent"] += 1
+            elif method in _REMOTE_METHODS:
+                value = await getattr(self.storage, method)(*args)
+            elif method == "slot_holds.state" and self.slot_holds is not None:
+                value = (self.slot_holds.ttl, self.slot_holds.hold_stats())
+            elif method.startswith("slot_holds.") and method[11:] in _SLOT_HOLD_METHODS and self.slot_holds is not None:
+                result = await getattr(self.slot_holds, method[11:])(*args)
+                user_id = args[-1]  # user_id - останній аргумент hold, confirm і release_user
+                value = (result, self.slot_holds.expires_in(user_id), self.slot_holds.hold_stats())
+            else:
+                raise ValueError(f"невідомий метод '{method}'")
+            reply = (call_id, True, value)
+        except Exception as e:
+            self.stats["errors"] += 1
+            reply = (call_id, False, f"{type(e).__name__} - {e}")
+        if writer.is_closing():
+            return
+        write_frame(writer, reply)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    def server_stats(self) -> dict:
+        return {"in_flight": len(self._tasks), **self.stats}
+
+
+class IpcStorage(Storage):
+    """Сховище воркера: кожен метод - виклик того самого методу у процесі-власнику."""
+
+    def __init__(self, address: str = STORAGE_IPC_ADDRESS):
+        self.address = address
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task = None
+        self._calls = {}  # call_id -> Future
+        self._ids = itertools.count()
+        self._snapshot: Optional[ScheduleSnapshot] = None
+        self.stats = Counter()  # 'calls', 'snapshots_received'
+
+    async def start(self) -> None:
+        if not self.address:
+            raise RuntimeError("STORAGE_BACKEND=ipc потребує STORAGE_IPC_ADDRESS")
+        self._reader, self._writer = await asyncio.open_unix_connection(self.address)
+        self._reader_task = asyncio.create_task(self._read_replies(), name="ipc-storage")
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._reader_task is not None:
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+
+    async def _read_replies(self) -> None:
+        try:
+            while True:
+                call_id, ok, value = await read_frame(self._reader)
+                future = self._calls.pop(call_id, None)
+                if future is None or future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(StorageCallError(value))
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            if self._writer is not None:  # не close() цього процесу
+                print(f"ПОМИЛКА [ipc_storage.py]: З'єднання з власником сховища втрачено ({type(e).__name__}).", file=sys.stderr)
+        finally:
+            for future in self._calls.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Власник сховища недоступний"))
+            self._calls.clear()
+
+    async def _call(self, method: str, *args):
+        if self._writer is None or self._reader_task is None or self._reader_task.done():
+            raise ConnectionError("Власник сховища недоступний")
+        call_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._calls[call_id] = future
+        self.stats["calls"] += 1
+        write_frame(self._writer, (call_id, method, args))
+        await self._writer.drain()
+        return await future
+
+    async def get_available_dates(self) -> Mapping:
+        known_version = self._snapshot.version if self._snapshot is not None else None
+        version, dates = await self._call("get_available_dates", known_version)
+        if dates is not None:
+            self._snapshot = ScheduleSnapshot(dates, version=version)
+            self.stats["snapshots_received"] += 1
+        return self._snapshot
+
+    async def update_status(self, date_str: str, time_str: str, new_status: str,
+                            expected_current_status: str = STATUS_FREE) -> bool:
+        return await self._call("update_status", date_str, time_str, new_status, expected_current_status)
+
+    async def update_statuses(self, changes: list) -> List[bool]:
+        return await self._call("update_statuses", changes)
+
+    async def slots_with_status(self, status: str) -> List[tuple]:
+        return await self._call("slots_with_status", status)
+
+    async def get_user_bookings(self, user_id: int) -> List[dict]:
+        return await self._call("get_user_bookings", user_id)
+
+    async def mark_booking_as_cancelled(self, row_index: int, user_name: str, user_id: int) -> bool:
+        return await self._call("mark_booking_as_cancelled", row_index, user_name, user_id)
+
+    async def get_client_provided_name(self, user_id: int) -> Optional[str]:
+        return await self._call("get_client_provided_name", user_id)
+
+    async def save_or_update_client_name(self, user_id: int, telegram_username: str, provided_name: str) -> bool:
+        return await self._call("save_or_update_client_name", user_id, telegram_username, provided_name)
+
+    async def append_request_row(self, row_values: list) -> None:
+        await self._call("append_request_row", row_values)
+
+
+class IpcSlotHolds:
+    """
+    Утримання слотів воркера: hold, confirm і release_user виконує SlotHolds процесу-власника.
+    expires_in і hold_stats - з останніх відповідей власника (користувач завжди в одному воркері,
+    тож його строк утримання змінюють лише виклики цього процесу і зняття після завершення строку).
+    """
+
+    def __init__(self, storage: IpcStorage):
+        self.storage = storage
+        self.ttl = None  # строк утримання власника; відомий після start()
+        self._expires_at = {}  # user_id -> time.time() завершення утримання
+        self._owner_stats = {}
+        self._owner_stats_at = None
+
+    async def start(self) -> None:
+        self.ttl, stats = await self.storage._call("slot_holds.state")
+        self._remember_stats(stats)
+
+    async def stop(self) -> None:
+        pass  # незавершені утримання лишаються у власника і знімаються там
+
+    def _remember_stats(self, stats: dict) -> None:
+        self._owner_stats = stats
+        self._owner_stats_at = time.monotonic()
+
+    async def _call(self, method: str, user_id: int, *args):
+        result, expires_in, stats = await self.storage._call(f"slot_holds.{method}", *args, user_id)
+        if expires_in:
+            self._expires_at[user_id] = time.time() + expires_in
+        else:
+            self._expires_at.pop(user_id, None)
+        self._remember_stats(stats)
+        return result
+
+    async def hold(self, date_str: str, time_str: str, user_id: int) -> bool:
+        return await self._call("hold", user_id, date_str, time_str)
+
+    async def confirm(self, date_str: str, time_str: str, user_id: int) -> bool:
+        return await self._call("confirm", user_id, date_str, time_str)
+
+    async def release_user(self, user_id: int) -> bool:
+        return await self._call("release_user", user_id)
+
+    def expires_in(self, user_id) -> float:
+        """Скільки секунд лишилося до завершення утримання користувача (0 - утримання немає)."""
+        expires_at = self._expires_at.get(user_id)
+        if expires_at is None:
+            return 0.0
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            del self._expires_at[user_id]  # власник уже зняв утримання
+            return 0.0
+        return remaining
+
+    def hold_stats(self) -> dict:
+        """hold_stats власника з останньої відповіді (owner_stats_age_s - скільки секунд тому)."""
+        age = round(time.monotonic() - self._owner_stats_at, 1) if self._owner_stats_at is not None else None
+        return {**self._owner_stats, "owner_stats_age_s": age}
@@ -1,11 +1,10 @@
 # /root/telegram-schedule-bot/bot/keyboards.py
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
-from datetime import datetime
-from typing import List, Dict, Any # Для тайп хінтів
+from typing import Callable, List, Dict, Any, Optional, Tuple # Для тайп хінтів
 
-# Импортируем формат даты из google_sheets.py, где он определен
-from .google_sheets import DATE_FORMAT_IN_SHEET
+from .schedule_snapshot import ScheduleSnapshot
+from .slots import parse_day
 
 MESSENGER_OPTIONS = {
     "viber": "Viber",
@@ -15,8 +14,7 @@ MESSENGER_OPTIONS = {
     "teams": "Teams"
 }
 
-def get_messenger_choice_keyboard() -> InlineKeyboardMarkup:
-    """Створює inline-клавіатуру для вибору месенджера."""
+def _build_messenger_choice_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     for callback_data_key, text in MESSENGER_OPTIONS.items():
         builder.button(text=text, callback_data=f"messenger_{callback_data_key}")
@@ -24,8 +22,7 @@ def get_messenger_choice_keyboard() -> InlineKeyboardMarkup:
     builder.row(InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_booking_phone")) # Кнопка назад до введення номера
     return builder.as_markup()
 
-def get_service_choice_keyboard() -> InlineKeyboardMarkup:
-    """Создает inline-клавиатуру для начального выбора услуги."""
+def _build_service_choice_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(text="📞 Залишити контакт", callback_data="ask_contact")
     builder.button(text="📅 Записатися на консультацію", callback_data="book_consultation")
@@ -33,21 +30,18 @@ def get_service_choice_keyboard() -> InlineKeyboardMarkup:
     builder.adjust(1) # Кожна кнопка в новому рядку для кращої читабельності
     return builder.as_markup()
 
-def get_dates_keyboard(dates_dict: dict) -> InlineKeyboardMarkup:
-    """
-    Создает inline-клавиатуру с доступными датами и кнопкой 'Назад'.
-    dates_dict: Словарь { 'дата_строка': ['время1', 'время2'], ... }
-    """
+def _build_dates_keyboard(dates_dict) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
-    try:
-        sorted_dates = sorted(
-            dates_dict.keys(),
-            key=lambda d_str: datetime.strptime(d_str.strip(), DATE_FORMAT_IN_SHEET).date()
-        )
-    except Exception as e_sort:
-        import sys
-        print(f"ОШИБКА [keyboards.py]: Ошибка сортировки дат: {e_sort}. Используются несортированные ключи.", file=sys.stderr)
-        sorted_dates = list(dates_dict.keys())
+    if isinstance(dates_dict, ScheduleSnapshot):
+        sorted_dates = list(dates_dict)  # знімок уже впорядкований за датою при побудові кешу
+    else:
+        parsed = {d_str: parse_day(d_str) for d_str in dates_dict}
+        if None in parsed.values():
+            import sys
+            print(f"ОШИБКА [keyboards.py]: Ошибка сортировки дат: {[d for d, day in parsed.items() if day is None]}. Используются несортированные ключи.", file=sys.stderr)
+            sorted_dates = list(dates_dict.keys())
+        else:
+            sorted_dates = sorted(dates_dict.keys(), key=parsed.__getitem__)
 
     for date_str in sorted_dates:
         builder.button(text=date_str, callback_data=f"date_{date_str}")
@@ -55,8 +49,7 @@ def get_dates_keyboard(dates_dict: dict) -> InlineKeyboardMarkup:
     builder.row(InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_service_choice_from_date"))
     return builder.as_markup()
 
-def get_times_keyboard(times_list: list) -> InlineKeyboardMarkup:
-    """Создает inline-клавиатуру с доступным временем и кнопкой 'Назад'."""
+def _build_times_keyboard(times_list) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     for time_str in sorted(times_list): # Сортуємо час для консистентності
         builder.button(text=time_str, callback_data=f"time_{time_str}")
@@ -64,21 +57,96 @@ def get_times_keyboard(times_list: list) -> InlineKeyboardMarkup:
     builder.row(InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_date_selection"))
     return builder.as_markup()
 
-def get_share_contact_keyboard() -> ReplyKeyboardMarkup:
-    """Создает reply-клавиатуру для запроса номера телефона пользователя."""
+
+def get_dates_keyboard(dates_dict: dict) -> InlineKeyboardMarkup:
+    """
+    Создает inline-клавиатуру с доступными датами и кнопкой 'Назад'.
+    dates_dict: Словарь { 'дата_строка': ['время1', 'время2'], ... } або ScheduleSnapshot -
+    для знімка розмітка будується один раз на його версію.
+    """
+    if isinstance(dates_dict, ScheduleSnapshot):
+        return _cached_markup(dates_dict.version, None, lambda: _build_dates_keyboard(dates_dict))
+    return _build_dates_keyboard(dates_dict)
+
+
+def get_times_keyboard(times_list: list, schedule_version: Optional[int] = None, date_str: Optional[str] = None) -> InlineKeyboardMarkup:
+    """
+    Создает inline-клавиатуру с доступным временем и кнопкой 'Назад'.
+    Якщо передано версію знімка розкладу і дату, з якого взято times_list, розмітка береться з кешу.
+    """
+    if schedule_version is None or date_str is None:
+        return _build_times_keyboard(times_list)
+    return _cached_markup(schedule_version, date_str, lambda: _build_times_keyboard(times_list))
+
+def _build_share_contact_keyboard() -> ReplyKeyboardMarkup:
     builder = ReplyKeyboardBuilder()
     builder.button(text="📱 Поділитися моїм номером телефону", request_contact=True)
     builder.adjust(1)
     return builder.as_markup(resize_keyboard=True, one_time_keyboard=True)
 
 
-def get_back_to_main_menu_keyboard() -> InlineKeyboardMarkup:
-    """Створює inline-клавіатуру з кнопкою 'Повернутися на головне меню'."""
+def _build_back_to_main_menu_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(text="⬅️ Повернутися на головне меню", callback_data="main_menu_start")
     return builder.as_markup()
 
 
+# --- Готові клавіатури ---
+# Статичні меню будуються один раз при імпорті; хендлери лише передають ту саму розмітку в Telegram
+# і не змінюють її. Клавіатури дат і часу залежать тільки від знімка розкладу, тож кешуються
+# за його версією (для часу - ще й за датою); старі версії викидаються, щойно з'являється новіша.
+
+_MESSENGER_CHOICE_KEYBOARD = _build_messenger_choice_keyboard()
+_SERVICE_CHOICE_KEYBOARD = _build_service_choice_keyboard()
+_SHARE_CONTACT_KEYBOARD = _build_share_contact_keyboard()
+_BACK_TO_MAIN_MENU_KEYBOARD = _build_back_to_main_menu_keyboard()
+
+_MARKUP_CACHE: Dict[Tuple[int, Optional[str]], InlineKeyboardMarkup] = {}  # (версія знімка, дата або None) -> розмітка
+_MARKUP_CACHE_VERSION = 0
+_MARKUP_CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+def _cached_markup(version: int, date_str: Optional[str], build: Callable[[], InlineKeyboardMarkup]) -> InlineKeyboardMarkup:
+    global _MARKUP_CACHE_VERSION
+    if version > _MARKUP_CACHE_VERSION:
+        _MARKUP_CACHE.clear()
+        _MARKUP_CACHE_VERSION = version
+    elif version < _MARKUP_CACHE_VERSION:
+        return build()  # хендлер тримає застарілий знімок - не витісняємо актуальні клавіатури
+    key = (version, date_str)
+    markup = _MARKUP_CACHE.get(key)
+    if markup is None:
+        _MARKUP_CACHE_STATS["misses"] += 1
+        markup = _MARKUP_CACHE[key] = build()
+    else:
+        _MARKUP_CACHE_STATS["hits"] += 1
+    return markup
+
+
+def keyboard_cache_stats() -> dict:
+    return {"version": _MARKUP_CACHE_VERSION, "cached": len(_MARKUP_CACHE), **_MARKUP_CACHE_STATS}
+
+
+def get_messenger_choice_keyboard() -> InlineKeyboardMarkup:
+    """Inline-клавіатура для вибору месенджера."""
+    return _MESSENGER_CHOICE_KEYBOARD
+
+
+def get_service_choice_keyboard() -> InlineKeyboardMarkup:
+    """Inline-клавіатура для початкового вибору послуги."""
+    return _SERVICE_CHOICE_KEYBOARD
+
+
+def get_share_contact_keyboard() -> ReplyKeyboardMarkup:
+    """Reply-клавіатура для запиту номера телефону користувача."""
+    return _SHARE_CONTACT_KEYBOARD
+
+
+def get_back_to_main_menu_keyboard() -> InlineKeyboardMarkup:
+    """Inline-клавіатура з кнопкою 'Повернутися на головне меню'."""
+    return _BACK_TO_MAIN_MENU_KEYBOARD
+
+
 def get_user_bookings_keyboard(bookings: List[Dict[str, Any]]) -> InlineKeyboardMarkup:
     """
     Створює inline-клавіатуру зі списком бронювань користувача для скасування.
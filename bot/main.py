@@ -1,14 +1,33 @@
 # /root/telegram-schedule-bot/main.py
 import asyncio
 import sys
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from contextlib import asynccontextmanager
+from aiogram.types import Update
 import uvicorn  # Для запуска из командной строки, если нужно
 
 # Импортируем bot и dp из bot.bot
 from .bot import bot, dp
 # Импортируем главный роутер из bot.handlers
 from .handlers import main_router  # Убедитесь, что main_router экспортируется из bot/handlers.py
+from .keyboards import keyboard_cache_stats
+from .google_sheets import schedule_read_stats
+from .session_reaper import get_session_reaper
+from .sheets_scheduler import get_scheduler
+from .slot_holds import get_slot_holds
+from .slot_locks import get_slot_locks
+from .storage import get_storage
+from .utils import edit_stats
+from .update_executor import get_update_executor, poll_updates
+from .workers import BOT_WORKERS, get_worker_pool
+from .webhook import WEBHOOK_PATH, WEBHOOK_SECRET, SECRET_HEADER, is_webhook_mode, secret_matches, set_webhook
+
+WEBHOOK_MODE = is_webhook_mode()  # BOT_MODE=webhook - обновления приходят POST-запросами на WEBHOOK_PATH
+
+
+def updates_intake():
+    """Куда передаются обновления: процессы-воркеры (BOT_WORKERS > 0) или очередь этого процесса."""
+    return get_worker_pool() if BOT_WORKERS else get_update_executor(dp, bot)
 
 print("DEBUG [main.py]: Инициализация FastAPI приложения...", file=sys.stderr)
 
@@ -16,24 +35,54 @@ print("DEBUG [main.py]: Инициализация FastAPI приложения.
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("INFO [main.py]: Запуск FastAPI приложения...", file=sys.stderr)
+    # Проверка конфигурации - до запуска фоновых задач, которые иначе остались бы без остановки
+    if WEBHOOK_MODE and not WEBHOOK_SECRET:
+        raise RuntimeError("КРИТИЧЕСКАЯ ОШИБКА [main.py]: BOT_MODE=webhook требует WEBHOOK_SECRET.")
     print("INFO [main.py]: Регистрация Aiogram роутеров...", file=sys.stderr)
 
     # Регистрируем наш главный роутер (который содержит все остальные хендлеры)
     dp.include_router(main_router)
     print("INFO [main.py]: Aiogram роутеры зарегистрированы.", file=sys.stderr)
 
-    print("INFO [main.py]: Запуск Telegram бота (polling)...", file=sys.stderr)
-    # Запускаем polling Aiogram в фоновом режиме
-    # skip_updates=True - пропускаем старые сообщения при старте
-    asyncio.create_task(dp.start_polling(bot, skip_updates=True))
+    # Фоновые задачи хранилища: для Google Sheets - прогрев/обновление кеша расписания и доставка
+    # журнала заявок, для SQLite - синхронизация локальной базы с таблицей
+    await get_storage().start()
+    # Снятие просроченных удержаний слотов (после старта хранилища: удержания подхватываются из него)
+    await get_slot_holds().start()
+    # Снятие брошенных сессий FSM (освобождает удержанный слот, удаляет состояние)
+    get_session_reaper(dp.storage).install(dp)
+    await get_session_reaper(dp.storage).start()
+
+    if BOT_WORKERS:
+        # Обновления обрабатывают процессы-воркеры (bot/workers.py), хранилище и удержания слотов остаются в этом процессе
+        await get_worker_pool().start(get_storage(), get_slot_holds())
+    # Обновления из polling и webhook выполняются через очередь по чатам (bot/update_executor.py):
+    # разные чаты - параллельно, обновления одного чата - по порядку
+    await dp.emit_startup(bot=bot)
+    polling_task = None
+    if WEBHOOK_MODE:
+        print("INFO [main.py]: Запуск Telegram бота (webhook)... Webhook обслуживает один процесс uvicorn; "
+              f"для нескольких процессов - BOT_WORKERS (сейчас {BOT_WORKERS}), а не --workers uvicorn.", file=sys.stderr)
+        await set_webhook(dp, bot)
+    else:
+        print("INFO [main.py]: Запуск Telegram бота (polling)...", file=sys.stderr)
+        polling_task = asyncio.create_task(poll_updates(dp, bot, updates_intake()))
 
     yield  # Приложение FastAPI работает здесь
 
     # Код ниже выполнится при остановке FastAPI
     print("INFO [main.py]: Остановка FastAPI приложения...", file=sys.stderr)
-    print("INFO [main.py]: Остановка Telegram бота (polling)...", file=sys.stderr)
-    await dp.stop_polling()
+    if polling_task is not None:
+        print("INFO [main.py]: Остановка Telegram бота (polling)...", file=sys.stderr)
+        polling_task.cancel()
+        await asyncio.gather(polling_task, return_exceptions=True)
+    # Webhook не снимаем: при перезапуске Telegram придержит обновления до нового старта; принятые - дорабатываем
+    await updates_intake().stop()
+    await get_session_reaper(dp.storage).stop()
+    await dp.emit_shutdown(bot=bot)  # закрывает хранилище состояний FSM
     await bot.session.close()  # Важно для корректного закрытия сессии бота
+    await get_slot_holds().stop()
+    await get_storage().close()
     print("INFO [main.py]: Aiogram polling остановлен, сессия закрыта.", file=sys.stderr)
 
 
@@ -42,7 +91,43 @@ app = FastAPI(lifespan=lifespan)
 
 @app.get("/")
 async def read_root():
-    return {"message": "Lawyer Bot FastAPI is running. Bot is polling."}
+    return {"message": f"Lawyer Bot FastAPI is running. Bot mode: {'webhook' if WEBHOOK_MODE else 'polling'}."}
+
+
+@app.post(WEBHOOK_PATH)
+async def telegram_webhook(request: Request):
+    # Только проверка секрета и постановка в очередь: 200 сразу, обработка - в bot/update_executor.py
+    if not WEBHOOK_MODE:
+        return Response(status_code=404)
+    if not secret_matches(request.headers.get(SECRET_HEADER)):
+        return Response(status_code=401)
+    try:
+        update = Update.model_validate(await request.json(), context={"bot": bot})
+    except Exception as e:
+        print(f"ПРЕДУПРЕЖДЕНИЕ [main.py]: Некорректное обновление от webhook: {type(e).__name__} - {e}", file=sys.stderr)
+        return Response(status_code=400)
+    if not updates_intake().submit(update):
+        return Response(status_code=503)  # очередь полна - Telegram повторит доставку
+    return Response(status_code=200)
+
+
+@app.get("/health")
+async def health():
+    # Глубина очереди изменений, ещё не доставленных в Google Sheets, и ожидание квоты Sheets API
+    return {
+        "status": "ok",
+        "requests_journal_backlog": get_storage().backlog_depth(),
+        "sheets_scheduler": get_scheduler().queue_stats(),
+        "slot_locks": get_slot_locks().lock_stats(),
+        "slot_holds": get_slot_holds().hold_stats(),
+        "keyboards": keyboard_cache_stats(),
+        "telegram_edits": edit_stats(),
+        "schedule_reads": schedule_read_stats(),
+        "sessions": get_session_reaper(dp.storage).session_stats(),
+        "bot_mode": "webhook" if WEBHOOK_MODE else "polling",
+        "updates": updates_intake().executor_stats(),
+        "fsm_storage": dp.storage.fsm_stats() if hasattr(dp.storage, "fsm_stats") else type(dp.storage).__name__,
+    }
 
 
 # Блок для запуска Uvicorn, если этот файл запускается напрямую
@@ -0,0 +1,198 @@
+# /root/telegram-schedule-bot/bot/requests_journal.py
+# Локальний журнал заявок (write-behind) для аркуша "Заявки".
+# Хендлер записує рядок заявки в SQLite (мікросекунди, переживає перезапуск) і одразу відповідає
+# користувачу. Фоновий flusher пачками переносить записи в Google Sheets одним append_rows;
+# якщо Sheets недоступні, записи чекають у журналі і доставляються пізніше, а не губляться.
+# Кожен рядок несе ключ доставки (id запису і час його створення) у колонці google_sheets.REQUEST_DELIVERY_KEY_COLUMN.
+# Після старту і після невдалого append пачка могла вже дійти до таблиці, тож перед наступною
+# доставкою ключі звіряються з аркушем і вже присутні записи лише позначаються доставленими.
+# Якщо колонки в аркуші немає, доставка at-least-once: збій між append і позначкою дасть дублікат.
+
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import List, Tuple
+
+from . import google_sheets
+from .sheets_gateway import run_sheets_call
+from .sheets_scheduler import PRIORITY_BACKGROUND
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUESTS_JOURNAL_PATH = os.getenv("REQUESTS_JOURNAL_PATH", os.path.join(_PROJECT_ROOT, "requests_journal.sqlite3"))
+JOURNAL_FLUSH_BATCH_SIZE = 200  # максимум рядків в одному append_rows
+JOURNAL_FLUSH_INTERVAL = 5.0  # секунд між перевірками, якщо ніхто не розбудив flusher
+JOURNAL_MAX_RETRY_DELAY = 60.0  # секунд, верхня межа експоненційної паузи після помилок Sheets
+JOURNAL_RETENTION_SECONDS = 7 * 24 * 3600  # скільки зберігати вже доставлені записи
+
+
+class RequestsJournal:
+    """Append-only журнал рядків заявок у SQLite. Потокобезпечний."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS request_journal ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " row_json TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " flushed_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS request_journal_pending ON request_journal (id) WHERE flushed_at IS NULL"
+        )
+
+    def append(self, row_values: list) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO request_journal (row_json, created_at) VALUES (?, ?)",
+                (json.dumps(row_values, ensure_ascii=False), time.time())
+            )
+            return cursor.lastrowid
+
+    def pending(self, limit: int) -> List[Tuple[int, str, list]]:
+        """Недоставлені записи [(id, ключ доставки, рядок), ...] у порядку додавання."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, created_at, row_json FROM request_journal WHERE flushed_at IS NULL ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        # Час створення в ключі: id почнуться з 1 знову, якщо файл журналу буде видалено
+        return [(entry_id, f"{entry_id}-{int(created_at * 1000)}", json.loads(row_json)) for entry_id, created_at, row_json in rows]
+
+    def mark_flushed(self, entry_ids: List[int]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("UPDATE request_journal SET flushed_at = ? WHERE id = ?", [(now, i) for i in entry_ids])
+            self._conn.execute("DELETE FROM request_journal WHERE flushed_at < ?", (now - JOURNAL_RETENTION_SECONDS,))
+            self._conn.execute("COMMIT")
+
+    def backlog_depth(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM request_journal WHERE flushed_at IS NULL").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_JOURNAL = None
+_flusher_task = None
+_wakeup_event = None
+_stopping = False
+_delivery_unconfirmed = True  # після старту і після невдалого append ключі пачки спершу звіряються з аркушем
+
+
+def get_journal() -> RequestsJournal:
+    global _JOURNAL
+    if _JOURNAL is None:
+        _JOURNAL = RequestsJournal(REQUESTS_JOURNAL_PATH)
+    return _JOURNAL
+
+
+def enqueue_request_row(row_values: list) -> int:
+    """Зберігає рядок заявки в журнал і будить flusher. Повертає id запису в журналі."""
+    entry_id = get_journal().append(row_values)
+    if _wakeup_event is not None:
+        _wakeup_event.set()
+    print(f"DEBUG [requests_journal.py]: Заявку #{entry_id} записано в журнал.", file=sys.stderr)
+    return entry_id
+
+
+def backlog_depth() -> int:
+    """Кількість заявок, які ще не доставлені в Google Sheets."""
+    return get_journal().backlog_depth()
+
+
+async def flush_journal_once() -> int:
+    """Переносить одну пачку записів журналу в 'Заявки'. Повертає кількість доставлених рядків."""
+    global _delivery_unconfirmed
+    journal = get_journal()
+    batch = journal.pending(JOURNAL_FLUSH_BATCH_SIZE)
+    if not batch:
+        return 0
+    already = 0
+    if _delivery_unconfirmed:
+        present = await run_sheets_call(google_sheets.delivered_request_keys, [key for _, key, _ in batch],
+                                        priority=PRIORITY_BACKGROUND)
+        _delivery_unconfirmed = False
+        if present:
+            journal.mark_flushed([entry_id for entry_id, key, _ in batch if key in present])
+            batch = [entry for entry in batch if entry[1] not in present]
+            already = len(present)
+            print(f"INFO [requests_journal.py]: {already} заявок уже є в таблиці, повторно не дописуються.", file=sys.stderr)
+            if not batch:
+                return already
+    try:
+        await run_sheets_call(google_sheets.append_request_rows, [row for _, _, row in batch], [key for _, key, _ in batch],
+                              priority=PRIORITY_BACKGROUND)
+    except Exception:
+        _delivery_unconfirmed = True  # таймаут не означає, що рядки не записано
+        raise
+    # Якщо процес впаде між append_rows і цією позначкою, після старту пачку буде знайдено за ключами
+    journal.mark_flushed([entry_id for entry_id, _, _ in batch])
+    print(f"DEBUG [requests_journal.py]: Доставлено {len(batch)} заявок у '{google_sheets.REQUESTS_WORKSHEET_NAME}'.", file=sys.stderr)
+    return already + len(batch)
+
+
+async def _flusher_loop() -> None:
+    retry_delay = 1.0
+    while True:
+        try:
+            delivered = await flush_journal_once()
+            retry_delay = 1.0
+            if delivered == JOURNAL_FLUSH_BATCH_SIZE:
+                continue  # у журналі ще є записи - не чекаємо
+            wait = JOURNAL_FLUSH_INTERVAL
+        except Exception as e:
+            print(f"ПОМИЛКА [requests_journal.py]: доставка заявок у Sheets: {type(e).__name__} - {e}. "
+                  f"Повтор через {retry_delay:.0f} с (у журналі: {backlog_depth()}).", file=sys.stderr)
+            wait = retry_delay
+            retry_delay = min(retry_delay * 2, JOURNAL_MAX_RETRY_DELAY)
+        try:
+            await asyncio.wait_for(_wakeup_event.wait(), timeout=wait)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup_event.clear()
+        if _stopping:
+            return  # wait_for може проковтнути cancel(), якщо подія спрацювала одночасно з ним
+
+
+async def start_journal_flusher() -> None:
+    """Запускає фоновий flusher. Недоставлені до перезапуску записи відправляються одразу."""
+    global _flusher_task, _wakeup_event
+    if _flusher_task is not None:
+        return
+    _wakeup_event = asyncio.Event()
+    backlog = backlog_depth()
+    if backlog:
+        print(f"INFO [requests_journal.py]: У журналі {backlog} недоставлених заявок, відправляю...", file=sys.stderr)
+    _flusher_task = asyncio.create_task(_flusher_loop(), name="requests-journal-flusher")
+
+
+async def stop_journal_flusher() -> None:
+    """Зупиняє flusher після останньої спроби доставити те, що є в журналі."""
+    global _flusher_task, _wakeup_event, _stopping
+    if _flusher_task is None:
+        return
+    _stopping = True
+    _flusher_task.cancel()
+    try:
+        await _flusher_task
+    except asyncio.CancelledError:
+        pass
+    _flusher_task = None
+    _wakeup_event = None
+    _stopping = False
+    try:
+        await flush_journal_once()
+    except Exception as e:
+        print(f"ПОПЕРЕДЖЕННЯ [requests_journal.py]: Не вдалося доставити заявки при зупинці ({type(e).__name__}). "
+              f"Вони залишаться в журналі ({backlog_depth()}).", file=sys.stderr)
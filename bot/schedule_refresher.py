@@ -0,0 +1,78 @@
+# /root/telegram-schedule-bot/bot/schedule_refresher.py
+# Фоновий оновлювач кешу розкладу (stale-while-revalidate).
+# Запускається з lifespan FastAPI (main.py): прогріває кеш до старту polling-у,
+# далі періодично перечитує "Графік" у пулі потоків Sheets. Поки він працює,
+# хендлери завжди отримують дані з кешу і ніколи не чекають на читання таблиці.
+
+import asyncio
+import os
+import sys
+
+from . import google_sheets
+from .sheets_gateway import run_sheets_call
+from .sheets_scheduler import PRIORITY_BACKGROUND
+
+SCHEDULE_REFRESH_INTERVAL = float(os.getenv("SCHEDULE_REFRESH_INTERVAL", "60"))  # секунд
+SCHEDULE_REFRESH_RETRY_DELAY = 10.0  # пауза після невдалого читання, секунд
+
+_refresh_task = None
+_wakeup_event = None
+_stopping = False
+
+
+async def _refresh_once() -> bool:
+    try:
+        return await run_sheets_call(google_sheets.refresh_schedule_cache, priority=PRIORITY_BACKGROUND)
+    except Exception as e:
+        print(f"ПОМИЛКА [schedule_refresher.py]: {type(e).__name__} - {e}", file=sys.stderr)
+        return False
+
+
+async def _refresher_loop() -> None:
+    delay = SCHEDULE_REFRESH_INTERVAL
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup_event.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup_event.clear()
+        if _stopping:
+            return  # wait_for може проковтнути cancel(), якщо подія спрацювала одночасно з ним
+        refreshed = await _refresh_once()
+        delay = SCHEDULE_REFRESH_INTERVAL if refreshed else min(SCHEDULE_REFRESH_RETRY_DELAY, SCHEDULE_REFRESH_INTERVAL)
+
+
+async def start_schedule_refresher() -> None:
+    """Прогріває кеш розкладу і запускає фонове оновлення."""
+    global _refresh_task, _wakeup_event
+    if _refresh_task is not None:
+        return
+    loop = asyncio.get_running_loop()
+    _wakeup_event = asyncio.Event()
+
+    def wakeup() -> None:
+        # Може викликатися з потоків пулу Sheets (update_status, invalidate_schedule_cache)
+        loop.call_soon_threadsafe(_wakeup_event.set)
+
+    if not await _refresh_once():
+        print("ПОПЕРЕДЖЕННЯ [schedule_refresher.py]: Не вдалося прогріти кеш розкладу, спробую у фоні.", file=sys.stderr)
+        _wakeup_event.set()
+    google_sheets.set_background_refresh(True, wakeup)
+    _refresh_task = asyncio.create_task(_refresher_loop(), name="schedule-refresher")
+    print(f"INFO [schedule_refresher.py]: Фонове оновлення графіка запущено (кожні {SCHEDULE_REFRESH_INTERVAL:g} с).", file=sys.stderr)
+
+
+async def stop_schedule_refresher() -> None:
+    global _refresh_task, _stopping
+    google_sheets.set_background_refresh(False)
+    if _refresh_task is None:
+        return
+    _stopping = True
+    _refresh_task.cancel()
+    try:
+        await _refresh_task
+    except asyncio.CancelledError:
+        pass
+    _refresh_task = None
+    _stopping = False
+    print("INFO [schedule_refresher.py]: Фонове оновлення графіка зупинено.", file=sys.stderr)
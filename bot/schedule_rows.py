@@ -0,0 +1,68 @@
+# /root/telegram-schedule-bot/bot/schedule_rows.py
+# Мапа рядків аркуша 'Графік': який день (date.toordinal()) записаний у кожному рядку
+# і в яких межах рядків лежить кожен день. За нею завантажувач графіка читає лише рядки,
+# що можуть потрапити у вікно запису, плюс хвіст аркуша (нові рядки), а не всю історію.
+# Мапа будується при повному читанні й перевіряється кожним частковим: якщо день хоч одного
+# прочитаного рядка не збігся з мапою (рядки вставили/видалили), потрібне повне читання.
+
+from array import array
+from typing import List, Optional, Tuple
+
+
+class ScheduleRowMap:
+    """Не потокобезпечна: нею користується лише завантажувач графіка під своїм замком."""
+
+    FIRST_DATA_ROW = 2  # рядок 1 - заголовок
+
+    def __init__(self, days: List[int], keys: List[Optional[tuple]]):
+        self._days = array('l', days)  # рядок - 2 -> день або 0 (порожня/нерозпізнана дата)
+        self._keys = list(keys)  # рядок - 2 -> ('дата', 'HH:MM') слота в індексі або None
+        self._day_rows = {}  # день -> [перший рядок, останній рядок]
+        self._index_days(self.FIRST_DATA_ROW, days)
+
+    def _index_days(self, first_row: int, days: List[int]) -> None:
+        for row, day in enumerate(days, start=first_row):
+            if not day:
+                continue
+            bounds = self._day_rows.get(day)
+            if bounds is None:
+                self._day_rows[day] = [row, row]
+            else:
+                bounds[0] = min(bounds[0], row)
+                bounds[1] = max(bounds[1], row)
+
+    @property
+    def last_row(self) -> int:
+        """Останній рядок з даними при попередньому читанні (1 - аркуш порожній)."""
+        return len(self._days) + self.FIRST_DATA_ROW - 1
+
+    def window(self, first_day: int, end_day: int) -> Optional[Tuple[int, int]]:
+        """Межі рядків, що містять дні first_day <= день < end_day, або None, якщо таких днів немає."""
+        spans = [self._day_rows[day] for day in range(first_day, end_day) if day in self._day_rows]
+        if not spans:
+            return None
+        return min(first for first, _ in spans), max(last for _, last in spans)
+
+    def matches(self, first_row: int, days: List[int]) -> bool:
+        """Чи прочитані рядки (лише ті, що вже є в мапі) мають ті самі дні, що й при попередньому читанні."""
+        offset = first_row - self.FIRST_DATA_ROW
+        known = min(len(days), len(self._days) - offset)
+        return all(self._days[offset + i] == days[i] for i in range(max(known, 0)))
+
+    def key(self, row: int) -> Optional[tuple]:
+        offset = row - self.FIRST_DATA_ROW
+        return self._keys[offset] if 0 <= offset < len(self._keys) else None
+
+    def update(self, first_row: int, days: List[int], keys: List[Optional[tuple]]) -> None:
+        """Записує дні та ключі прочитаних рядків; рядки за межами мапи (новий хвіст) додаються."""
+        offset = first_row - self.FIRST_DATA_ROW
+        for i, (day, key) in enumerate(zip(days, keys)):
+            if offset + i < len(self._days):
+                self._keys[offset + i] = key  # день уже перевірено matches()
+            else:
+                self._days.append(day)
+                self._keys.append(key)
+        self._index_days(first_row, days)
+
+    def __len__(self) -> int:
+        return len(self._days)
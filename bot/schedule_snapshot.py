@@ -0,0 +1,41 @@
+# /root/telegram-schedule-bot/bot/schedule_snapshot.py
+# Незмінний знімок доступного розкладу.
+# Кеш віддає один і той самий об'єкт усім хендлерам без копіювання: змінити його неможливо,
+# а кожна зміна розкладу створює новий знімок з більшим номером версії.
+# Версію можуть використовувати похідні кеші (наприклад, клавіатури).
+
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Dict, Iterable, Tuple
+
+
+class ScheduleSnapshot(Mapping):
+    """
+    Відображення { 'дата': ('HH:MM', ...) } лише для читання.
+    Поводиться як dict для хендлерів (in, [], len, порожній знімок - False).
+    Дати йдуть у хронологічному порядку (так знімок будують обидва сховища), тож клавіатури їх не сортують.
+    """
+    __slots__ = ("_dates", "version")
+
+    def __init__(self, dates: Dict[str, Iterable[str]], version: int):
+        self._dates = MappingProxyType({date_str: tuple(times) for date_str, times in dates.items()})
+        self.version = version
+
+    def __getitem__(self, date_str: str) -> Tuple[str, ...]:
+        return self._dates[date_str]
+
+    def __iter__(self):
+        return iter(self._dates)
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    def __repr__(self) -> str:
+        return f"ScheduleSnapshot(version={self.version}, dates={dict(self._dates)!r})"
+
+    def to_dict(self) -> Dict[str, list]:
+        """Змінна копія (для побудови наступного знімка)."""
+        return {date_str: list(times) for date_str, times in self._dates.items()}
+
+
+EMPTY_SCHEDULE = ScheduleSnapshot({}, version=0)
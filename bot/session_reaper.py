@@ -0,0 +1,172 @@
+# /root/telegram-schedule-bot/bot/session_reaper.py
+# Зняття покинутих сесій FSM. Кожен, хто натиснув /start, лишає в сховищі станів запис (стан, ім'я,
+# дата, час, питання, cancellation_*), і якщо користувач не дійшов до state.clear(), запис живе вічно.
+# Middleware на рівні оновлень запам'ятовує час останньої активності кожного ключа FSM, а фонова
+# задача бере з купи (за часом закінчення) сесії, неактивні довше SESSION_IDLE_SECONDS: звільняє
+# утримуваний користувачем слот (slot_holds.release_user) і видаляє стан зі сховища.
+# У пам'яті лишаються лише сесії, активні протягом останніх SESSION_IDLE_SECONDS.
+
+import asyncio
+import heapq
+import itertools
+import os
+import sys
+import time
+from collections import Counter
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from .fsm_storage import SqliteFsmStorage
+from .slot_holds import get_slot_holds
+
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "1800"))  # неактивність, після якої сесія знімається
+# Зняття чекає ще стільки секунд після найранішого закінчення, щоб забрати сусідні сесії однією пачкою
+SESSION_SWEEP_GRACE = float(os.getenv("SESSION_SWEEP_GRACE", "30"))
+
+
+class SessionActivity(BaseMiddleware):
+    """Зовнішня middleware оновлень (після FSM middleware Dispatcher): відмічає активність ключа FSM."""
+
+    def __init__(self, reaper: "SessionReaper"):
+        self.reaper = reaper
+
+    async def __call__(self, handler, event, data):
+        try:
+            return await handler(event, data)
+        finally:
+            state = data.get("state")
+            if state is not None:
+                self.reaper.touch(state.key)
+
+
+class SessionReaper:
+    """Сесії FSM одного процесу бота (один event loop)."""
+
+    def __init__(self, storage: BaseStorage, slot_holds=None, ttl: float = SESSION_IDLE_SECONDS,
+                 grace: float = SESSION_SWEEP_GRACE):
+        self.storage = storage
+        self.slot_holds = slot_holds
+        self.ttl = ttl
+        self.grace = grace
+        self._last_seen = {}  # StorageKey -> час останньої активності
+        self._heap = []  # (час закінчення, n, StorageKey); по одному запису на живу сесію
+        self._seq = itertools.count()
+        self.stats = Counter()  # 'evicted', 'released_holds', 'pruned', 'sweeps'
+        self._task = None
+        self._wakeup_event = None
+        self._stopping = False
+
+    def touch(self, key: StorageKey) -> None:
+        now = time.time()
+        if key not in self._last_seen:
+            heapq.heappush(self._heap, (now + self.ttl, next(self._seq), key))
+            if self._heap[0][2] == key and self._wakeup_event is not None:
+                self._wakeup_event.set()  # перша сесія в купі - перерахувати паузу
+        self._last_seen[key] = now  # старий запис у купі перевіриться і пересунеться при знятті
+
+    def install(self, dispatcher) -> None:
+        dispatcher.update.outer_middleware(SessionActivity(self))
+
+    async def sweep_once(self) -> int:
+        """Знімає всі сесії, неактивні довше ttl. Повертає кількість знятих."""
+        now = time.time()
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, key = heapq.heappop(self._heap)
+            last_seen = self._last_seen.get(key)
+            if last_seen is None:
+                continue
+            if last_seen + self.ttl > now:
+                heapq.heappush(self._heap, (last_seen + self.ttl, next(self._seq), key))  # сесія була активна
+                continue
+            del self._last_seen[key]
+            expired.append(key)
+        if not expired:
+            return 0
+
+        if self.slot_holds is not None:
+            for key in expired:
+                try:
+                    if await self.slot_holds.release_user(key.user_id):
+                        self.stats["released_holds"] += 1
+                except Exception as e:
+                    print(f"ПОМИЛКА [session_reaper.py]: Не вдалося звільнити слот user {key.user_id}: {type(e).__name__} - {e}",
+                          file=sys.stderr)
+            expired = [key for key in expired if key not in self._last_seen]  # повернулися, поки звільнялися слоти
+            if not expired:
+                return 0
+        try:
+            self._forget(expired)
+        except Exception as e:
+            print(f"ПОМИЛКА [session_reaper.py]: Не вдалося видалити {len(expired)} сесій: {type(e).__name__} - {e}", file=sys.stderr)
+            return 0
+        self.stats["evicted"] += len(expired)
+        self.stats["sweeps"] += 1
+        print(f"DEBUG [session_reaper.py]: Знято неактивних сесій: {len(expired)}, живих {len(self._last_seen)}.", file=sys.stderr)
+        return len(expired)
+
+    def _forget(self, keys: list) -> None:
+        if isinstance(self.storage, SqliteFsmStorage):
+            self.storage.forget(keys)
+            self.stats["pruned"] += self.storage.prune_idle(time.time() - self.ttl, keep=self._last_seen)
+        elif isinstance(self.storage, MemoryStorage):
+            for key in keys:
+                self.storage.storage.pop(key, None)  # set_state(None) лишив би запис у defaultdict
+
+    async def _loop_forever(self) -> None:
+        while True:
+            wait = max(self._heap[0][0] + self.grace - time.time(), 0.0) if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup_event.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup_event.clear()
+            if self._stopping:
+                return
+            try:
+                await self.sweep_once()
+            except Exception as e:
+                print(f"ПОМИЛКА [session_reaper.py]: {type(e).__name__} - {e}", file=sys.stderr)
+
+    async def start(self) -> None:
+        """Видаляє сесії, що лишилися неактивними з минулих запусків, і запускає зняття у фоні."""
+        if self._task is not None:
+            return
+        self._wakeup_event = asyncio.Event()
+        if isinstance(self.storage, SqliteFsmStorage):
+            self.stats["pruned"] += self.storage.prune_idle(time.time() - self.ttl)
+        self._task = asyncio.create_task(self._loop_forever(), name="session-reaper")
+        print(f"INFO [session_reaper.py]: Зняття сесій після {self.ttl:g} с неактивності, "
+              f"видалено старих: {self.stats['pruned']}.", file=sys.stderr)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup_event.set()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._stopping = False
+
+    def session_stats(self) -> dict:
+        return {
+            "live": len(self._last_seen),
+            "next_expiry_s": round(max(self._heap[0][0] - time.time(), 0.0), 1) if self._heap else None,
+            **self.stats,
+        }
+
+
+_SESSION_REAPER = None
+
+
+def get_session_reaper(storage: BaseStorage) -> SessionReaper:
+    """Зняття сесій для сховища станів Dispatcher (dp.storage) і утримань слотів процесу."""
+    global _SESSION_REAPER
+    if _SESSION_REAPER is None:
+        _SESSION_REAPER = SessionReaper(storage, get_slot_holds())
+    return _SESSION_REAPER
@@ -0,0 +1,157 @@
+# /root/telegram-schedule-bot/bot/sheet_tail_sync.py
+# Інкрементальна синхронізація аркуша, в який лише дописують рядки (наприклад, "Заявки").
+# Після першого повного читання дзеркало пам'ятає, скільки рядків уже синхронізовано,
+# і при кожному оновленні читає тільки хвіст разом з останнім відомим рядком (A{n}:J). Якщо цей
+# рядок у таблиці вже інший або його немає (персонал видалив чи вставив рядки вище), номери рядків
+# зсунулися - дзеркало перечитується повністю. Щоб помітити ручні правки персоналу у старих рядках,
+# раз на VERIFY_INTERVAL дзеркало разом з хвостом читає один блок уже відомих рядків (по колу)
+# і порівнює його контрольну суму з локальною; розбіжність - теж повне перечитування.
+
+import hashlib
+import json
+import sys
+import time
+from collections import Counter
+from typing import List, NamedTuple, Optional
+
+from gspread.utils import rowcol_to_a1
+
+VERIFY_BLOCK_ROWS = 500  # рядків в одному блоці перевірки
+VERIFY_INTERVAL_SECONDS = 300  # як часто перевіряти черговий блок
+
+
+class SyncResult(NamedTuple):
+    reset: bool  # True - дзеркало перечитане повністю, rows містить увесь аркуш (з заголовком)
+    first_row_number: int  # номер (з 1) першого рядка в rows
+    rows: List[list]
+
+
+def _normalize_row(row_values) -> list:
+    """Рядок у вигляді, в якому його повертає Sheets API: рядки, без порожніх комірок у кінці."""
+    values = ["" if v is None else str(v) for v in row_values]
+    while values and values[-1] == "":
+        values.pop()
+    return values
+
+
+def _checksum(rows: List[list]) -> bytes:
+    rows = list(rows)
+    while rows and not rows[-1]:
+        rows.pop()  # API не повертає порожні рядки в кінці діапазону
+    return hashlib.blake2b(json.dumps(rows, ensure_ascii=False).encode("utf-8"), digest_size=16).digest()
+
+
+class AppendOnlySheetMirror:
+    """
+    Локальна копія append-only аркуша. Не потокобезпечна: викликач тримає власний lock
+    навколо sync()/record_append()/record_update() і застосування їх результату.
+    """
+
+    def __init__(self, name: str, block_rows: int = VERIFY_BLOCK_ROWS, verify_interval: float = VERIFY_INTERVAL_SECONDS):
+        self.name = name
+        self.block_rows = block_rows
+        self.verify_interval = verify_interval
+        self.stats = Counter()  # full_loads, tail_reads, tail_rows, verified_blocks, mismatches
+        self.reset()
+
+    def reset(self) -> None:
+        """Забуває стан: наступний sync() перечитає аркуш повністю."""
+        self._rows = None  # усі рядки аркуша, з заголовком (індекс 0 = рядок 1)
+        self._next_block = 0
+        self._last_verify = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._rows is not None
+
+    @property
+    def synced_rows(self) -> int:
+        """Скільки рядків аркуша (з заголовком) уже є в дзеркалі."""
+        return len(self._rows) if self._rows is not None else 0
+
+    @property
+    def header(self) -> list:
+        return list(self._rows[0]) if self._rows else []
+
+    def _last_column(self) -> str:
+        width = max(len(self._rows[0]) if self._rows else 0, 1)
+        return rowcol_to_a1(1, width)[:-1]
+
+    def _verify_range(self) -> Optional[tuple]:
+        """Наступний блок для перевірки: (перший рядок, останній рядок) або None, якщо ще рано."""
+        if not self._rows or time.monotonic() - self._last_verify < self.verify_interval:
+            return None
+        blocks = (len(self._rows) + self.block_rows - 1) // self.block_rows
+        block = self._next_block % blocks
+        first = block * self.block_rows + 1
+        return first, min(first + self.block_rows - 1, len(self._rows))
+
+    def _full_load(self, sheet) -> SyncResult:
+        self._rows = [_normalize_row(row) for row in sheet.get_all_values()]
+        self._next_block = 0
+        self._last_verify = time.monotonic()
+        self.stats["full_loads"] += 1
+        print(f"DEBUG [sheet_tail_sync.py]: '{self.name}' перечитано повністю: {len(self._rows)} рядків.", file=sys.stderr)
+        return SyncResult(True, 1, [list(row) for row in self._rows])
+
+    def sync(self, sheet) -> SyncResult:
+        """
+        Підтягує нові рядки аркуша. Звичайний виклик - одне читання хвоста (разом з блоком
+        перевірки, якщо настав час, через один batch_get). Повертає рядки, яких дзеркало ще не бачило.
+        """
+        if self._rows is None:
+            return self._full_load(sheet)
+
+        last_column = self._last_column()
+        tail_range = f"A{len(self._rows)}:{last_column}"  # з останнім синхронізованим рядком
+        verify = self._verify_range()
+        if verify:
+            first, last = verify
+            tail, block = sheet.batch_get([tail_range, f"A{first}:{last_column}{last}"])
+            self._last_verify = time.monotonic()
+            self._next_block += 1
+            self.stats["verified_blocks"] += 1
+            remote = [_normalize_row(row) for row in block]
+            if _checksum(remote) != _checksum(self._rows[first - 1:last]):
+                self.stats["mismatches"] += 1
+                print(f"INFO [sheet_tail_sync.py]: Рядки {first}-{last} '{self.name}' змінено вручну. Повна синхронізація.", file=sys.stderr)
+                return self._full_load(sheet)
+        else:
+            tail = sheet.get(tail_range)
+
+        if not tail or _normalize_row(tail[0]) != self._rows[-1]:
+            self.stats["mismatches"] += 1
+            print(f"INFO [sheet_tail_sync.py]: Рядок {len(self._rows)} '{self.name}' зсунувся або видалений. Повна синхронізація.", file=sys.stderr)
+            return self._full_load(sheet)
+        first_row_number = len(self._rows) + 1
+        new_rows = [_normalize_row(row) for row in tail[1:]]
+        self._rows.extend(new_rows)
+        self.stats["tail_reads"] += 1
+        self.stats["tail_rows"] += len(new_rows)
+        return SyncResult(False, first_row_number, [list(row) for row in new_rows])
+
+    def record_append(self, first_row_number: int, rows: List[list]) -> bool:
+        """
+        Враховує рядки, які ми самі щойно дописали. True - рядки йдуть одразу за дзеркалом і прийняті.
+        False - дзеркало ще не завантажене або рядки лягли не одразу за ним (чужі рядки між ними
+        чи видалені рядки вище): дзеркало скидається, наступний sync() перечитає аркуш повністю.
+        """
+        if self._rows is None:
+            return False
+        if first_row_number != len(self._rows) + 1:
+            self.stats["mismatches"] += 1
+            print(f"INFO [sheet_tail_sync.py]: Дописані рядки '{self.name}' почалися з {first_row_number}, "
+                  f"очікувався {len(self._rows) + 1}. Повна синхронізація.", file=sys.stderr)
+            self.reset()
+            return False
+        self._rows.extend(_normalize_row(row) for row in rows)
+        return True
+
+    def record_update(self, row_number: int, col: int, value) -> None:
+        """Враховує власний запис у комірку, щоб перевірка блоку не вважала його ручною правкою."""
+        if self._rows is None or row_number > len(self._rows):
+            return
+        row = list(self._rows[row_number - 1])
+        row.extend([""] * (col - len(row)))
+        row[col - 1] = "" if value is None else str(value)
+        self._rows[row_number - 1] = _normalize_row(row)
@@ -0,0 +1,96 @@
+# /root/telegram-schedule-bot/bot/sheets_gateway.py
+# Асинхронний шлюз до Google Sheets.
+# Усі функції google_sheets.py синхронні (gspread), тому хендлери не викликають їх напряму,
+# а чекають на обгортки з цього модуля: виклик виконується в обмеженому пулі потоків
+# з таймаутом, і повільний запит до Google не зупиняє polling для інших користувачів.
+# Пріоритет виклику (sheets_scheduler.py) передається в потік пулу разом із контекстом.
+
+import asyncio
+import contextvars
+import math
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from . import google_sheets
+from .google_sheets import STATUS_FREE
+from .sheets_scheduler import PRIORITY_BOOKING, set_priority
+
+# --- Налаштування пулу ---
+SHEETS_MAX_WORKERS = int(os.getenv("SHEETS_MAX_WORKERS", "8"))
+SHEETS_CALL_TIMEOUT = float(os.getenv("SHEETS_CALL_TIMEOUT", "20"))  # секунд, включно з очікуванням у черзі пулу
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=SHEETS_MAX_WORKERS, thread_name_prefix="sheets")
+
+
+class SheetsTimeoutError(TimeoutError):
+    """Виклик Google Sheets не завершився за SHEETS_CALL_TIMEOUT."""
+
+
+async def run_sheets_call(func, *args, timeout: float = None, priority: int = None, **kwargs):
+    """
+    Виконує синхронну функцію func(*args, **kwargs) у пулі потоків Sheets.
+    Якщо результат не готовий за timeout секунд, піднімає SheetsTimeoutError
+    (сам потік дозавершиться у фоні - gspread не підтримує скасування запиту).
+    timeout=math.inf - чекати до кінця виклику (викликач обмежує очікування сам, див. SheetsStorage).
+    priority - клас запитів для планувальника квот (за замовчуванням - пріоритет поточного контексту).
+    """
+    loop = asyncio.get_running_loop()
+    call_timeout = SHEETS_CALL_TIMEOUT if timeout is None else timeout
+    context = contextvars.copy_context()
+    if priority is not None:
+        context.run(set_priority, priority)
+    future = loop.run_in_executor(_EXECUTOR, context.run, partial(func, *args, **kwargs))
+    if call_timeout == math.inf:
+        return await future
+    try:
+        return await asyncio.wait_for(future, timeout=call_timeout)
+    except asyncio.TimeoutError as e:
+        func_name = getattr(func, "__name__", repr(func))
+        print(f"ПОМИЛКА [sheets_gateway.py]: {func_name} не завершився за {call_timeout} с.", file=sys.stderr)
+        raise SheetsTimeoutError(f"{func_name} timed out after {call_timeout}s") from e
+
+
+def shutdown_gateway() -> None:
+    """Зупиняє пул потоків (викликається при зупинці FastAPI)."""
+    _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    print("INFO [sheets_gateway.py]: Пул потоків Google Sheets зупинено.", file=sys.stderr)
+
+
+# --- Асинхронні обгортки над google_sheets.py ---
+
+async def get_available_dates():
+    return await run_sheets_call(google_sheets.get_available_dates)
+
+
+async def update_status(date_str: str, time_str: str, new_status: str, expected_current_status: str = STATUS_FREE,
+                        timeout: float = None) -> bool:
+    return await run_sheets_call(
+        google_sheets.update_status, date_str, time_str, new_status,
+        expected_current_status=expected_current_status, timeout=timeout, priority=PRIORITY_BOOKING
+    )
+
+
+async def update_statuses(changes: list, timeout: float = None) -> list:
+    return await run_sheets_call(google_sheets.update_statuses, changes, timeout=timeout, priority=PRIORITY_BOOKING)
+
+
+async def slots_with_status(status: str) -> list:
+    return await run_sheets_call(google_sheets.slots_with_status, status)
+
+
+async def get_client_provided_name(user_id: int):
+    return await run_sheets_call(google_sheets.get_client_provided_name, user_id)
+
+
+async def save_or_update_client_name(user_id: int, telegram_username: str, provided_name: str):
+    return await run_sheets_call(google_sheets.save_or_update_client_name, user_id, telegram_username, provided_name)
+
+
+async def get_user_bookings(user_id: int) -> list:
+    return await run_sheets_call(google_sheets.get_user_bookings, user_id)
+
+
+async def mark_booking_as_cancelled(row_index: int, user_name: str, user_id: int):
+    return await run_sheets_call(google_sheets.mark_booking_as_cancelled, row_index, user_name, user_id, priority=PRIORITY_BOOKING)
@@ -0,0 +1,138 @@
+# /root/telegram-schedule-bot/bot/sheets_registry.py
+# Реєстр відкритих аркушів Google Sheets.
+# Таблиця відкривається один раз (за ключем, якщо він відомий), а об'єкти Worksheet
+# кешуються разом із перевіреною мапою "назва колонки -> номер колонки (з 1)".
+# Так кожна дія користувача не починається з пошуку таблиці в Drive та читання заголовків.
+
+import sys
+import threading
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+import gspread
+
+
+class SheetSchema(NamedTuple):
+    """
+    Очікувана структура аркуша.
+    required   - колонки, без яких аркуш не можна використовувати (шукаються в заголовку);
+    optional   - колонки, які використовуються, якщо присутні;
+    positional - фіксовані позиції колонок (для аркушів, де заголовок не важливий).
+    """
+    required: Tuple[str, ...] = ()
+    optional: Tuple[str, ...] = ()
+    positional: Optional[Dict[str, int]] = None
+
+
+class SchemaMismatchError(Exception):
+    """Структура аркуша не відповідає закешованій/очікуваній схемі."""
+
+
+def is_schema_error(exc: Exception) -> bool:
+    """Чи схоже, що помилка спричинена зміною структури аркуша (а не мережею/квотою)."""
+    if isinstance(exc, (SchemaMismatchError, gspread.exceptions.WorksheetNotFound)):
+        return True
+    if isinstance(exc, gspread.exceptions.APIError):
+        code = getattr(exc, "code", None)
+        text = str(exc).lower()
+        if code == 404:
+            return True
+        if code == 400 and ("grid limits" in text or "unable to parse range" in text):
+            return True
+    return False
+
+
+class WorksheetRegistry:
+    """Потокобезпечний кеш Spreadsheet/Worksheet та мап колонок."""
+
+    def __init__(self, client_factory: Callable[[], gspread.Client], spreadsheet_name: str,
+                 spreadsheet_key: Optional[str] = None, schemas: Optional[Dict[str, SheetSchema]] = None):
+        self._client_factory = client_factory
+        self._spreadsheet_name = spreadsheet_name
+        self._spreadsheet_key = spreadsheet_key
+        self._schemas = schemas or {}
+        self._lock = threading.RLock()
+        self._spreadsheet = None
+        self._worksheets: Dict[str, gspread.Worksheet] = {}
+        self._columns: Dict[str, Dict[str, int]] = {}
+
+    def spreadsheet(self):
+        with self._lock:
+            if self._spreadsheet is None:
+                client = self._client_factory()
+                if self._spreadsheet_key:
+                    self._spreadsheet = client.open_by_key(self._spreadsheet_key)
+                else:
+                    # Пошук за назвою робимо лише один раз, далі працюємо за ключем
+                    self._spreadsheet = client.open(self._spreadsheet_name)
+                    self._spreadsheet_key = self._spreadsheet.id
+                print(f"DEBUG [sheets_registry.py]: Таблицю відкрито (key={self._spreadsheet_key}).", file=sys.stderr)
+            return self._spreadsheet
+
+    def get(self, name: str) -> Tuple[gspread.Worksheet, Dict[str, int]]:
+        """Повертає (worksheet, columns), завантажуючи та перевіряючи схему за потреби."""
+        with self._lock:
+            if name not in self._worksheets:
+                sheet = self.spreadsheet().worksheet(name)
+                self._columns[name] = self._load_columns(name, sheet)
+                self._worksheets[name] = sheet
+            return self._worksheets[name], self._columns[name]
+
+    def worksheet(self, name: str) -> gspread.Worksheet:
+        return self.get(name)[0]
+
+    def columns(self, name: str) -> Dict[str, int]:
+        return self.get(name)[1]
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Скидає кеш одного аркуша (або всієї таблиці, якщо name=None)."""
+        with self._lock:
+            if name is None:
+                self._spreadsheet = None
+                self._worksheets.clear()
+                self._columns.clear()
+            else:
+                self._worksheets.pop(name, None)
+                self._columns.pop(name, None)
+        print(f"DEBUG [sheets_registry.py]: Кеш аркуша '{name or '*'}' інвалідовано.", file=sys.stderr)
+
+    def run(self, name: str, operation: Callable[[gspread.Worksheet, Dict[str, int]], object]):
+        """
+        Виконує operation(worksheet, columns). Якщо операція впала через невідповідність схеми,
+        кеш аркуша скидається, схема перечитується і операція повторюється один раз.
+        """
+        sheet, columns = self.get(name)
+        try:
+            return operation(sheet, columns)
+        except Exception as e:
+            if not is_schema_error(e):
+                raise
+            print(f"ПОПЕРЕДЖЕННЯ [sheets_registry.py]: Схема аркуша '{name}' змінилась ({type(e).__name__}: {e}). Перезавантаження...",
+                  file=sys.stderr)
+            if isinstance(e, gspread.exceptions.WorksheetNotFound):
+                self.invalidate()
+            else:
+                self.invalidate(name)
+            sheet, columns = self.get(name)
+            return operation(sheet, columns)
+
+    def _load_columns(self, name: str, sheet: gspread.Worksheet) -> Dict[str, int]:
+        schema = self._schemas.get(name, SheetSchema())
+        if schema.positional is not None:
+            return dict(schema.positional)
+
+        header = [str(h).strip() for h in sheet.row_values(1)]
+        missing = [col for col in schema.required if col not in header]
+        if missing:
+            raise SchemaMismatchError(f"В аркуші '{name}' відсутні колонки: {missing}")
+        columns = {}
+        for col_name in schema.required + schema.optional:
+            if col_name in header:
+                columns[col_name] = header.index(col_name) + 1
+        return columns
+
+
+def verify_header(name: str, header_row: list, columns: Dict[str, int]) -> None:
+    """Перевіряє, що в щойно прочитаному заголовку колонки стоять там, де їх очікує кеш."""
+    for col_name, col_idx in columns.items():
+        if len(header_row) < col_idx or str(header_row[col_idx - 1]).strip() != col_name:
+            raise SchemaMismatchError(f"Колонка '{col_name}' аркуша '{name}' більше не в позиції {col_idx}")
@@ -0,0 +1,217 @@
+# /root/telegram-schedule-bot/bot/sheets_replicator.py
+# Двостороння синхронізація локального сховища (sqlite_storage.py) з Google Sheets.
+# push: записи outbox по порядку переносяться в таблицю (заявки - пачками одним append_rows,
+#       статуси слотів - пачками одним умовним batchUpdate);
+# pull: періодично читаються "Графік", "Заявки" (інкрементально) і "Клиенты", і правки адвоката
+#       потрапляють у локальну базу. Усі звернення до Sheets - через пул потоків шлюзу.
+
+import asyncio
+import os
+import sys
+
+from . import google_sheets
+from .sheets_gateway import run_sheets_call
+from .sheets_scheduler import PRIORITY_BACKGROUND, PRIORITY_BOOKING
+
+SHEETS_PULL_INTERVAL = float(os.getenv("SHEETS_PULL_INTERVAL", "60"))  # секунд між читаннями таблиці
+REPLICATION_PUSH_BATCH = 200  # записів outbox за один прохід
+REPLICATION_IDLE_INTERVAL = 5.0  # секунд між перевірками outbox, якщо ніхто не розбудив
+REPLICATION_MAX_RETRY_DELAY = 60.0  # верхня межа експоненційної паузи після помилок Sheets
+
+# Типи записів outbox, які вміє переносити реплікатор
+OUTBOX_SLOT_STATUS = "slot_status"
+OUTBOX_REQUEST_APPEND = "request_append"
+OUTBOX_REQUEST_CANCEL = "request_cancel"
+OUTBOX_CLIENT_UPSERT = "client_upsert"
+
+
+class ReplicationError(Exception):
+    """Запис outbox не вдалося доставити (повториться пізніше)."""
+
+
+class SheetsReplicator:
+    def __init__(self, store, pull_interval: float = SHEETS_PULL_INTERVAL):
+        self.store = store
+        self.pull_interval = pull_interval
+        self._task = None
+        self._wakeup_event = None
+        self._loop = None
+        self._stopping = False
+
+    # --- pull ---
+
+    async def pull_once(self) -> None:
+        statuses = await run_sheets_call(google_sheets.schedule_slot_statuses, priority=PRIORITY_BACKGROUND)
+        changed_slots = self.store.merge_slots(statuses)
+        bookings = await run_sheets_call(google_sheets.request_bookings_snapshot, priority=PRIORITY_BACKGROUND)
+        changed_requests = self.store.merge_requests(bookings)
+        directory = await run_sheets_call(google_sheets.client_directory_snapshot, priority=PRIORITY_BACKGROUND)
+        changed_clients = self.store.merge_clients(directory)
+        if changed_slots or changed_requests or changed_clients:
+            print(f"DEBUG [sheets_replicator.py]: З таблиці отримано змін: слотів {changed_slots}, "
+                  f"заявок {changed_requests}, клієнтів {changed_clients}.", file=sys.stderr)
+
+    # --- push ---
+
+    async def _push_slot_statuses(self, entries: list) -> None:
+        """Поспіль ідучі зміни статусів слотів - одним пакетним умовним записом (утримання, їх зняття, бронювання)."""
+        changes = [(payload["date"], payload["time"], payload["status"], payload["expected"]) for _, _, payload in entries]
+        # Бронювання вже збережене локально, але адвокат бачить лише таблицю - це критичний запис
+        results = await run_sheets_call(google_sheets.update_statuses, changes, priority=PRIORITY_BOOKING)
+        for (date_str, time_key, status, expected), updated in zip(changes, results):
+            if updated:
+                continue
+            # False означає, що в момент запису слот мав інший статус - розрізняємо за кешем слотів
+            sheet_status = google_sheets.cached_slot_status(date_str, time_key)
+            if sheet_status is not None and sheet_status.lower() == status.lower():
+                continue  # зміна вже є в таблиці
+            if sheet_status is None or sheet_status.lower() == expected.lower():
+                raise ReplicationError(f"слот {date_str} {time_key} не оновлено")
+            # Адвокат змінив слот у таблиці раніше, ніж дійшла зміна бота: таблиця має пріоритет,
+            # наступний pull поверне фактичний статус у локальну базу
+            print(f"ПОПЕРЕДЖЕННЯ [sheets_replicator.py]: Конфлікт для {date_str} {time_key}: у таблиці '{sheet_status}', "
+                  f"бот змінював '{expected}' -> '{status}'. Залишаю значення з таблиці.", file=sys.stderr)
+
+    async def _push_request_appends(self, entries: list) -> None:
+        rows = [payload["row"] for _, _, payload in entries]
+        response = await run_sheets_call(google_sheets.append_request_rows, rows, priority=PRIORITY_BACKGROUND)
+        first_row_number = google_sheets.appended_row_number(response)
+        if first_row_number:
+            self.store.set_request_sheet_rows({
+                payload["request_id"]: first_row_number + offset for offset, (_, _, payload) in enumerate(entries)
+            })
+
+    async def _push_request_cancel(self, payload: dict) -> None:
+        ref = self.store.request_sheet_ref(payload["request_id"])
+        if ref is None:
+            print(f"ПОПЕРЕДЖЕННЯ [sheets_replicator.py]: Рядок заявки #{payload['request_id']} у таблиці невідомий, "
+                  f"скасування не перенесено.", file=sys.stderr)
+            return
+        sheet_row, date_str, time_str = ref
+        # False - і тоді, коли рядок уже описує інше бронювання: повтор піде після pull, який перепризначить рядок
+        if not await run_sheets_call(google_sheets.mark_booking_as_cancelled, sheet_row, payload["user_name"], payload["user_id"],
+                                     date_str, time_str, priority=PRIORITY_BOOKING):
+            raise ReplicationError(f"заявку в рядку {sheet_row} не позначено скасованою")
+
+    async def _push_client(self, payload: dict) -> None:
+        if not await run_sheets_call(google_sheets.save_or_update_client_name, payload["user_id"], payload["username"], payload["name"],
+                                     priority=PRIORITY_BACKGROUND):
+            raise ReplicationError(f"клієнта {payload['user_id']} не збережено")
+
+    async def push_once(self) -> int:
+        """Переносить одну пачку outbox по порядку. Повертає кількість доставлених записів."""
+        batch = self.store.outbox_batch(REPLICATION_PUSH_BATCH)
+        delivered = 0
+        i = 0
+        while i < len(batch):
+            entry_id, kind, payload = batch[i]
+            if kind == OUTBOX_REQUEST_APPEND:
+                # Поспіль ідучі заявки - одним append_rows
+                j = i
+                while j < len(batch) and batch[j][1] == OUTBOX_REQUEST_APPEND:
+                    j += 1
+                group = batch[i:j]
+                await self._push_request_appends(group)
+                self.store.ack([e[0] for e in group])
+                delivered += len(group)
+                i = j
+                continue
+            if kind == OUTBOX_SLOT_STATUS:
+                # Поспіль ідучі зміни різних слотів - однією пачкою; повтор того ж слота відкриває нову пачку,
+                # бо умову кожної зміни перевіряють за статусом, прочитаним до запису
+                j, slots = i, set()
+                while j < len(batch) and batch[j][1] == OUTBOX_SLOT_STATUS:
+                    slot = (batch[j][2]["date"], batch[j][2]["time"])
+                    if slot in slots:
+                        break
+                    slots.add(slot)
+                    j += 1
+                group = batch[i:j]
+                await self._push_slot_statuses(group)
+                self.store.ack([e[0] for e in group])
+                delivered += len(group)
+                i = j
+                continue
+            if kind == OUTBOX_REQUEST_CANCEL:
+                await self._push_request_cancel(payload)
+            elif kind == OUTBOX_CLIENT_UPSERT:
+                await self._push_client(payload)
+            else:
+                print(f"ПОПЕРЕДЖЕННЯ [sheets_replicator.py]: Невідомий тип запису outbox '{kind}', пропускаю.", file=sys.stderr)
+            self.store.ack([entry_id])
+            delivered += 1
+            i += 1
+        if delivered:
+            print(f"DEBUG [sheets_replicator.py]: У таблицю перенесено {delivered} змін.", file=sys.stderr)
+        return delivered
+
+    # --- фонова задача ---
+
+    async def _loop_forever(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_pull = loop.time() + self.pull_interval
+        retry_delay = 1.0
+        while True:
+            try:
+                delivered = await self.push_once()
+                if loop.time() >= next_pull:
+                    await self.pull_once()
+                    next_pull = loop.time() + self.pull_interval
+                retry_delay = 1.0
+                if delivered == REPLICATION_PUSH_BATCH:
+                    continue  # в outbox ще є записи - не чекаємо
+                wait = min(REPLICATION_IDLE_INTERVAL, max(next_pull - loop.time(), 0))
+            except Exception as e:
+                print(f"ПОМИЛКА [sheets_replicator.py]: {type(e).__name__} - {e}. "
+                      f"Повтор через {retry_delay:.0f} с (в outbox: {self.store.outbox_depth()}).", file=sys.stderr)
+                wait = retry_delay
+                retry_delay = min(retry_delay * 2, REPLICATION_MAX_RETRY_DELAY)
+            try:
+                await asyncio.wait_for(self._wakeup_event.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup_event.clear()
+            if self._stopping:
+                return  # wait_for може проковтнути cancel(), якщо подія спрацювала одночасно з ним
+
+    def wake(self) -> None:
+        """Будить реплікатор після запису в outbox (можна викликати з будь-якого потоку)."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup_event.set)
+
+    async def start(self) -> None:
+        """Підтягує стан таблиці (перший запуск заповнює локальну базу) і запускає фонову синхронізацію."""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup_event = asyncio.Event()
+        try:
+            await self.push_once()  # зміни, не доставлені до перезапуску, - раніше за pull
+            await self.pull_once()
+        except Exception as e:
+            print(f"ПОПЕРЕДЖЕННЯ [sheets_replicator.py]: Початкова синхронізація з таблицею не вдалася "
+                  f"({type(e).__name__}: {e}). Працюю з локальною базою, повторю у фоні.", file=sys.stderr)
+        self.store.on_outbox_write = self.wake
+        self._task = asyncio.create_task(self._loop_forever(), name="sheets-replicator")
+        print(f"INFO [sheets_replicator.py]: Синхронізацію з Google Sheets запущено (читання кожні {self.pull_interval:g} с).", file=sys.stderr)
+
+    async def stop(self) -> None:
+        """Зупиняє синхронізацію після останньої спроби доставити outbox."""
+        if self._task is None:
+            return
+        self.store.on_outbox_write = None
+        self._stopping = True
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await self.push_once()
+        except Exception as e:
+            print(f"ПОПЕРЕДЖЕННЯ [sheets_replicator.py]: Не вдалося доставити зміни при зупинці ({type(e).__name__}). "
+                  f"Вони залишаться в outbox ({self.store.outbox_depth()}).", file=sys.stderr)
+        self._loop = None
+        self._stopping = False
+        print("INFO [sheets_replicator.py]: Синхронізацію з Google Sheets зупинено.", file=sys.stderr)
@@ -0,0 +1,221 @@
+# /root/telegram-schedule-bot/bot/sheets_scheduler.py
+# Центральний планувальник запитів до Google Sheets з урахуванням квот.
+# Кожен HTTP-запит gspread (і FakeHTTPClient з fake_sheets.py) проходить через QuotaScheduler:
+#   - окремі token bucket-и для читань (GET) і записів, налаштовані під хвилинні квоти Sheets API;
+#   - черга за пріоритетом: записи бронювань/скасувань > читання для користувача > фонові задачі,
+#     а фонові запити не забирають останні SHEETS_CRITICAL_RESERVE токенів;
+#   - повтор на 429/5xx з експоненційною паузою та jitter (429 також пригальмовує весь bucket);
+#   - статистика очікування в черзі по кожному пріоритету (див. /health).
+# Пріоритет задається contextvar-ом: run_sheets_call(..., priority=...) переносить його в потік пулу.
+
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from functools import partial
+
+import gspread
+
+# Квоти Sheets API за замовчуванням - 60 читань і 60 записів за хвилину на користувача (сервісний акаунт).
+# 0 - без обмеження (лише пріоритети та повтори)
+SHEETS_READ_QUOTA_PER_MINUTE = float(os.getenv("SHEETS_READ_QUOTA_PER_MINUTE", "60"))
+SHEETS_WRITE_QUOTA_PER_MINUTE = float(os.getenv("SHEETS_WRITE_QUOTA_PER_MINUTE", "60"))
+SHEETS_BURST = float(os.getenv("SHEETS_BURST", "10"))  # скільки запитів можна зробити підряд без пауз
+SHEETS_CRITICAL_RESERVE = 2  # токени, які фонові запити залишають для бронювань і користувачів
+SHEETS_MAX_RETRIES = 5
+SHEETS_BACKOFF_BASE = 1.0  # секунд, подвоюється з кожною спробою
+SHEETS_BACKOFF_MAX = 32.0
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Пріоритети (менше число - раніше в черзі)
+PRIORITY_BOOKING = 0
+PRIORITY_USER = 1
+PRIORITY_BACKGROUND = 2
+PRIORITY_NAMES = {PRIORITY_BOOKING: "booking", PRIORITY_USER: "user", PRIORITY_BACKGROUND: "background"}
+
+_PRIORITY = contextvars.ContextVar("sheets_priority", default=PRIORITY_USER)
+
+READ = "read"
+WRITE = "write"
+
+
+def current_priority() -> int:
+    return _PRIORITY.get()
+
+
+def set_priority(priority: int) -> None:
+    """Задає пріоритет запитів до Sheets для поточного контексту (потоку/задачі)."""
+    _PRIORITY.set(priority)
+
+
+@contextmanager
+def sheets_priority(priority: int):
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+class TokenBucket:
+    """Класичний token bucket. Не потокобезпечний - ним керує QuotaScheduler під своїм замком."""
+
+    def __init__(self, per_minute: float, capacity: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self, reserve: float = 0.0) -> float:
+        """Забирає токен і повертає 0, або повертає, скільки секунд чекати до наступної спроби."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        needed = 1.0 + min(reserve, self.capacity - 1.0)
+        if self.tokens >= needed:
+            self.tokens -= 1.0
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """Після 429: жодних запитів цього типу найближчі seconds секунд, bucket - порожній."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self._updated = time.monotonic()
+
+
+class QuotaScheduler:
+    """Потокобезпечний допуск запитів до Sheets за квотою та пріоритетом."""
+
+    def __init__(self, read_per_minute: float = SHEETS_READ_QUOTA_PER_MINUTE,
+                 write_per_minute: float = SHEETS_WRITE_QUOTA_PER_MINUTE, burst: float = SHEETS_BURST,
+                 max_retries: int = SHEETS_MAX_RETRIES):
+        self._cond = threading.Condition()
+        self._buckets = {READ: TokenBucket(read_per_minute, burst), WRITE: TokenBucket(write_per_minute, burst)}
+        self._queues = {READ: [], WRITE: []}
+        self._tickets = itertools.count()
+        self.max_retries = max_retries
+        self.stats = Counter()  # 'requests', 'retries', 'throttled' (429), 'server_errors', 'gave_up'
+        self._waits = {priority: deque(maxlen=500) for priority in PRIORITY_NAMES}
+        self._max_wait = {priority: 0.0 for priority in PRIORITY_NAMES}
+
+    def configure(self, read_per_minute: float, write_per_minute: float, burst: float = SHEETS_BURST) -> None:
+        """Змінює квоти на льоту (бенчмарки, ручне налаштування)."""
+        with self._cond:
+            self._buckets = {READ: TokenBucket(read_per_minute, burst), WRITE: TokenBucket(write_per_minute, burst)}
+            self._cond.notify_all()
+
+    def acquire(self, kind: str, priority: int) -> float:
+        """Чекає своєї черги і токена. Повертає час очікування в секундах."""
+        started = time.monotonic()
+        reserve = SHEETS_CRITICAL_RESERVE if priority >= PRIORITY_BACKGROUND else 0.0
+        with self._cond:
+            queue = self._queues[kind]
+            ticket = (priority, next(self._tickets))
+            heapq.heappush(queue, ticket)
+            try:
+                while True:
+                    if queue[0] == ticket:
+                        delay = self._buckets[kind].try_take(reserve)
+                        if delay <= 0:
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+            finally:
+                queue.remove(ticket)
+                heapq.heapify(queue)
+                self._cond.notify_all()
+            waited = time.monotonic() - started
+            self._waits[priority].append(waited)
+            self._max_wait[priority] = max(self._max_wait[priority], waited)
+            self.stats["requests"] += 1
+        return waited
+
+    def _pause(self, kind: str, seconds: float) -> None:
+        with self._cond:
+            self._buckets[kind].pause(seconds)
+            self._cond.notify_all()
+
+    def request(self, send, method: str, endpoint: str, **kwargs):
+        """Виконує send(method, endpoint, **kwargs) з допуском за квотою та повторами на 429/5xx."""
+        kind = READ if method.upper() == "GET" else WRITE
+        priority = current_priority()
+        for attempt in itertools.count():
+            self.acquire(kind, priority)
+            try:
+                return send(method, endpoint, **kwargs)
+            except gspread.exceptions.APIError as e:
+                code = getattr(e, "code", None)
+                # append не ідемпотентний: після 5xx рядки могли вже додатися, тож повторюємо лише 429
+                retryable = code == 429 or (code in RETRYABLE_STATUS_CODES and not endpoint.endswith("append"))
+                if not retryable or attempt >= self.max_retries:
+                    if retryable:
+                        self.stats["gave_up"] += 1
+                    raise
+                delay = min(SHEETS_BACKOFF_MAX, SHEETS_BACKOFF_BASE * 2 ** attempt)
+                delay = random.uniform(delay / 2, delay)
+                with self._cond:
+                    self.stats["retries"] += 1
+                    self.stats["throttled" if code == 429 else "server_errors"] += 1
+                if code == 429:
+                    self._pause(kind, delay)
+                print(f"ПОПЕРЕДЖЕННЯ [sheets_scheduler.py]: {code} на {method} {endpoint} "
+                      f"({PRIORITY_NAMES.get(priority, priority)}), повтор #{attempt + 1} через {delay:.1f} с.", file=sys.stderr)
+                time.sleep(delay)
+
+    def queue_stats(self) -> dict:
+        """Очікування в черзі по пріоритетах (мс) та лічильники - для /health."""
+        with self._cond:
+            waits = {}
+            for priority, name in PRIORITY_NAMES.items():
+                samples = sorted(self._waits[priority])
+                waits[name] = {
+                    "count": len(samples),
+                    "avg_ms": round(sum(samples) / len(samples) * 1000, 1) if samples else 0.0,
+                    "p95_ms": round(samples[int(0.95 * (len(samples) - 1))] * 1000, 1) if samples else 0.0,
+                    "max_ms": round(self._max_wait[priority] * 1000, 1),
+                }
+            return {
+                "queued": {kind: len(queue) for kind, queue in self._queues.items()},
+                "wait": waits,
+                **self.stats,
+            }
+
+
+_SCHEDULER = QuotaScheduler()
+
+
+def get_scheduler() -> QuotaScheduler:
+    return _SCHEDULER
+
+
+def install_scheduler(client, scheduler: QuotaScheduler = None) -> None:
+    """
+    Пускає всі запити client.http_client через планувальник.
+    Підміняється метод екземпляра, тож це працює і для внутрішніх викликів gspread
+    (values_get, values_append... викликають self.request), і для FakeHTTPClient.
+    """
+    scheduler = scheduler or _SCHEDULER
+    http_client = client.http_client
+    send = getattr(http_client, "_unscheduled_request", None) or http_client.request
+    http_client._unscheduled_request = send
+    http_client.request = partial(scheduler.request, send)
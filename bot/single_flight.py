@@ -0,0 +1,57 @@
+# /root/telegram-schedule-bot/bot/single_flight.py
+# Об'єднання одночасних однакових запитів (single-flight).
+# Якщо кілька потоків одночасно просять те саме (наприклад, графік при холодному кеші),
+# виконується лише один виклик, а решта чекає і отримує його результат (або його виняток).
+
+import threading
+from collections import Counter
+
+
+class _InFlightCall:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Потокобезпечна група викликів, згрупованих за ключем."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = Counter()  # 'executed' - реальні виклики, 'shared' - виклики, що отримали чужий результат
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+                self.stats["executed"] += 1
+            else:
+                self.stats["shared"] += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,247 @@
+# /root/telegram-schedule-bot/bot/slot_holds.py
+# Тимчасове утримання слотів на час заповнення заявки.
+# Натиснутий час переходить 'вільно' -> 'Утримується' і підтверджується в 'заброньовано' лише
+# після вибору месенджера. Якщо користувач кинув сценарій, утримання спливає через SLOT_HOLD_SECONDS:
+# фонова задача бере з купи (за часом завершення) всі прострочені утримання і повертає слоти
+# в 'вільно' одним пакетним записом storage.update_statuses.
+# Утримуваний слот не 'вільно', тож get_available_dates приховує його без додаткових читань таблиці:
+# статус змінюється в кеші графіка (або в локальній базі SQLite) разом із записом.
+
+import asyncio
+import heapq
+import itertools
+import os
+import sys
+import time
+from collections import Counter
+
+from .google_sheets import STATUS_BOOKED, STATUS_FREE, STATUS_HELD, normalize_time_str
+from .storage import STORAGE_BACKEND, get_storage
+
+SLOT_HOLD_SECONDS = float(os.getenv("SLOT_HOLD_SECONDS", "600"))  # скільки слот чекає на завершення заявки
+# Зняття чекає ще стільки секунд після найранішого завершення, щоб забрати сусідні утримання тією ж пачкою
+SLOT_HOLD_SWEEP_GRACE = float(os.getenv("SLOT_HOLD_SWEEP_GRACE", "5"))
+SLOT_HOLD_SWEEP_BATCH = 100  # утримань, що знімаються одним записом
+SLOT_HOLD_RETRY_DELAY = 30.0  # секунд до повторного зняття, якщо запис не вдався
+
+
+class Hold:
+    __slots__ = ("date", "time", "user_id", "expires_at")
+
+    def __init__(self, date_str: str, time_key: str, user_id, expires_at: float):
+        self.date = date_str
+        self.time = time_key
+        self.user_id = user_id  # None - утримання, знайдене в таблиці при старті (власник невідомий)
+        self.expires_at = expires_at
+
+
+class SlotHolds:
+    """Утримання слотів одного процесу бота (один event loop)."""
+
+    def __init__(self, storage, ttl: float = SLOT_HOLD_SECONDS, grace: float = SLOT_HOLD_SWEEP_GRACE):
+        self.storage = storage
+        self.ttl = ttl
+        self.grace = grace
+        self._holds = {}  # (дата, час) -> Hold
+        self._by_user = {}  # user_id -> (дата, час)
+        self._heap = []  # (expires_at, n, Hold); зняті й підтверджені утримання видаляються ліниво
+        self._seq = itertools.count()
+        self.stats = Counter()  # 'held', 'confirmed', 'released', 'expired', 'adopted', 'sweeps'
+        self._task = None
+        self._wakeup_event = None
+        self._stopping = False
+
+    @staticmethod
+    def _key(date_str: str, time_str: str) -> tuple:
+        return str(date_str).strip(), normalize_time_str(time_str) or str(time_str).strip()
+
+    def _track(self, key: tuple, user_id, expires_at: float) -> None:
+        hold = Hold(key[0], key[1], user_id, expires_at)
+        self._holds[key] = hold
+        if user_id is not None:
+            self._by_user[user_id] = key
+        heapq.heappush(self._heap, (expires_at, next(self._seq), hold))
+        if self._heap[0][2] is hold and self._wakeup_event is not None:
+            self._wakeup_event.set()  # нове утримання спливає раніше за всі інші - перерахувати паузу
+
+    def _untrack(self, key: tuple):
+        hold = self._holds.pop(key, None)
+        if hold is not None and hold.user_id is not None and self._by_user.get(hold.user_id) == key:
+            del self._by_user[hold.user_id]
+        return hold
+
+    def _restore(self, key: tuple, user_id, expires_at: float) -> None:
+        """
+        Знову стежить за утриманням, запис якого не вдався: False (SheetsStorage повертає його і на помилку API)
+        або виняток (таймаут шлюзу Sheets, обрив IPC з власником сховища).
+        """
+        if key not in self._holds:  # за час запису слот могли утримати знову
+            self._track(key, user_id, expires_at)
+
+    def expires_in(self, user_id) -> float:
+        """Скільки секунд лишилося до завершення утримання користувача (0 - утримання немає)."""
+        key = self._by_user.get(user_id)
+        return max(self._holds[key].expires_at - time.time(), 0.0) if key else 0.0
+
+    async def hold(self, date_str: str, time_str: str, user_id: int) -> bool:
+        """Утримує вільний слот за користувачем. Попереднє утримання користувача знімається."""
+        await self.release_user(user_id)
+        key = self._key(date_str, time_str)
+        try:
+            held = await self.storage.update_status(date_str, time_str, STATUS_HELD, expected_current_status=STATUS_FREE)
+        except Exception:
+            # Запис міг дійти до таблиці - зняття скоро поверне слот у 'вільно', якщо він утримується
+            self._restore(key, None, time.time() + SLOT_HOLD_RETRY_DELAY)
+            raise
+        if not held:
+            return False
+        self._track(key, user_id, time.time() + self.ttl)
+        self.stats["held"] += 1
+        return True
+
+    async def confirm(self, date_str: str, time_str: str, user_id: int) -> bool:
+        """
+        Перетворює утримання користувача на бронювання. Якщо утримання вже спливло, а слот ще вільний, - бронює його.
+        Утримання, підхоплене після перезапуску (власник невідомий), теж підтверджується: хендлери передають
+        слот зі стану FSM користувача, а стан переживає перезапуск.
+        """
+        key = self._key(date_str, time_str)
+        hold = self._holds.get(key)
+        if hold is not None and hold.user_id in (user_id, None):
+            self._untrack(key)
+            try:
+                confirmed = await self.storage.update_status(date_str, time_str, STATUS_BOOKED, expected_current_status=STATUS_HELD)
+            except Exception:
+                self._restore(key, user_id, hold.expires_at)
+                raise
+            if confirmed:
+                self.stats["confirmed"] += 1
+                return True
+            # Якщо слот лишився 'Утримується', без стеження його не зняв би ніхто
+            self._restore(key, user_id, hold.expires_at)
+        if await self.storage.update_status(date_str, time_str, STATUS_BOOKED, expected_current_status=STATUS_FREE):
+            restored = self._holds.get(key)
+            if restored is not None and restored.user_id == user_id:
+                self._untrack(key)
+            self.stats["confirmed"] += 1
+            return True
+        return False
+
+    async def release_user(self, user_id: int) -> bool:
+        """Повертає в 'вільно' слот, який утримує користувач (вихід у меню, /start, новий вибір часу)."""
+        key = self._by_user.get(user_id)
+        if key is None:
+            return False
+        hold = self._untrack(key)
+        try:
+            released = await self.storage.update_status(key[0], key[1], STATUS_FREE, expected_current_status=STATUS_HELD)
+        except Exception:
+            self._restore(key, None, hold.expires_at)
+            raise
+        if released:
+            self.stats["released"] += 1
+        else:
+            self._restore(key, None, hold.expires_at)  # користувач утримання вже не має, слот звільнить зняття
+        return released
+
+    # --- зняття прострочених утримань ---
+
+    async def sweep_once(self) -> int:
+        """Знімає всі прострочені утримання пакетами. Повертає кількість звільнених слотів."""
+        now = time.time()
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, hold = heapq.heappop(self._heap)
+            key = (hold.date, hold.time)
+            if self._holds.get(key) is hold:
+                self._untrack(key)
+                expired.append(key)
+        freed = 0
+        for start in range(0, len(expired), SLOT_HOLD_SWEEP_BATCH):
+            batch = expired[start:start + SLOT_HOLD_SWEEP_BATCH]
+            try:
+                results = await self.storage.update_statuses([(d, t, STATUS_FREE, STATUS_HELD) for d, t in batch])
+            except Exception as e:
+                print(f"ПОМИЛКА [slot_holds.py]: Не вдалося зняти {len(batch)} утримань: {type(e).__name__} - {e}. "
+                      f"Повтор через {SLOT_HOLD_RETRY_DELAY:.0f} с.", file=sys.stderr)
+                for key in batch:
+                    if key not in self._holds:  # за цей час слот могли знову утримати
+                        self._track(key, None, time.time() + SLOT_HOLD_RETRY_DELAY)
+                continue
+            freed += sum(results)
+        if expired:
+            self.stats["expired"] += freed
+            self.stats["sweeps"] += 1
+            print(f"DEBUG [slot_holds.py]: Знято прострочених утримань: {freed} з {len(expired)}.", file=sys.stderr)
+        return freed
+
+    async def _loop_forever(self) -> None:
+        while True:
+            wait = max(self._heap[0][0] + self.grace - time.time(), 0.0) if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup_event.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup_event.clear()
+            if self._stopping:
+                return
+            try:
+                await self.sweep_once()
+            except Exception as e:
+                print(f"ПОМИЛКА [slot_holds.py]: {type(e).__name__} - {e}", file=sys.stderr)
+
+    async def start(self) -> None:
+        """Підхоплює утримання, що лишилися в сховищі після перезапуску, і запускає їх зняття у фоні."""
+        if self._task is not None:
+            return
+        self._wakeup_event = asyncio.Event()
+        await self._adopt()
+        self._task = asyncio.create_task(self._loop_forever(), name="slot-holds")
+        print(f"INFO [slot_holds.py]: Утримання слотів: {self.ttl:g} с, підхоплено {self.stats['adopted']}.", file=sys.stderr)
+
+    async def _adopt(self) -> None:
+        try:
+            # Власники попередніх утримань невідомі, тож даємо їм повний строк від старту
+            for date_str, time_str in await self.storage.slots_with_status(STATUS_HELD):
+                key = self._key(date_str, time_str)
+                if key not in self._holds:
+                    self._track(key, None, time.time() + self.ttl)
+                    self.stats["adopted"] += 1
+        except Exception as e:
+            print(f"ПОПЕРЕДЖЕННЯ [slot_holds.py]: Не вдалося прочитати утримані слоти ({type(e).__name__}: {e}).", file=sys.stderr)
+
+    async def stop(self) -> None:
+        """Зупиняє фонове зняття. Утримання лишаються в сховищі й будуть підхоплені при наступному старті."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup_event.set()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._stopping = False
+
+    def hold_stats(self) -> dict:
+        return {
+            "active": len(self._holds),
+            "next_expiry_s": round(max(self._heap[0][0] - time.time(), 0.0), 1) if self._heap else None,
+            **self.stats,
+        }
+
+
+_SLOT_HOLDS = None
+
+
+def get_slot_holds() -> SlotHolds:
+    """Утримання слотів поверх сховища процесу (get_storage()); у процесі-воркері - утримання власника."""
+    global _SLOT_HOLDS
+    if _SLOT_HOLDS is None:
+        storage = get_storage()
+        if STORAGE_BACKEND == "ipc":
+            from .ipc_storage import IpcSlotHolds
+            _SLOT_HOLDS = IpcSlotHolds(storage)
+        else:
+            _SLOT_HOLDS = SlotHolds(storage)
+    return _SLOT_HOLDS
@@ -0,0 +1,84 @@
+# /root/telegram-schedule-bot/bot/slot_locks.py
+# Асинхронні замки на слоти графіка (дата, час).
+# update_status у Google Sheets - це "прочитати рядок -> перевірити статус -> записати",
+# тож два користувачі, що одночасно натиснули той самий час, могли обидва побачити "вільно".
+# Бронювання та скасування одного слота виконуються під його замком по черзі; інші слоти не блокуються.
+# Хто чекав на замок, дізнається результат попереднього власника (SlotLock.status) і, якщо слот
+# уже не в очікуваному статусі, отримує відмову одразу - без звернення до таблиці.
+
+import asyncio
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+
+from .google_sheets import normalize_time_str
+
+
+class SlotLock:
+    __slots__ = ("lock", "users", "status")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0  # власник + ті, хто чекає; замок видаляється, коли 0
+        self.status = None  # статус слота, встановлений останнім власником (None - невідомо)
+
+
+class SlotLockManager:
+    """Замки створюються на вимогу і живуть, поки хтось тримає або чекає слот (один event loop)."""
+
+    def __init__(self):
+        self._slots = {}
+        self.stats = Counter()  # 'acquired', 'contended', 'decided_without_sheets'
+        self._waits = deque(maxlen=500)  # очікування замка в секундах (лише для тих, хто чекав)
+        self._max_queue = 0
+
+    @staticmethod
+    def _key(date_str: str, time_str: str) -> tuple:
+        return str(date_str).strip(), normalize_time_str(time_str) or str(time_str).strip()
+
+    @asynccontextmanager
+    async def hold(self, date_str: str, time_str: str):
+        """async with manager.hold(дата, час) as slot: ... - ексклюзивний доступ до слота."""
+        key = self._key(date_str, time_str)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = SlotLock()
+        slot.users += 1
+        self._max_queue = max(self._max_queue, slot.users)
+        contended = slot.lock.locked()
+        started = time.perf_counter()
+        try:
+            async with slot.lock:
+                self.stats["acquired"] += 1
+                if contended:
+                    self.stats["contended"] += 1
+                    self._waits.append(time.perf_counter() - started)
+                yield slot
+        finally:
+            slot.users -= 1
+            if slot.users == 0:
+                del self._slots[key]
+
+    def settled(self, slot: SlotLock, expected_status: str) -> bool:
+        """Чи попередній власник уже залишив слот не в expected_status (тоді відповідь - відмова)."""
+        if slot.status is not None and slot.status.strip().lower() != expected_status.strip().lower():
+            self.stats["decided_without_sheets"] += 1
+            return True
+        return False
+
+    def lock_stats(self) -> dict:
+        waits = sorted(self._waits)
+        return {
+            "held_slots": len(self._slots),
+            "max_queue": self._max_queue,
+            "wait_p95_ms": round(waits[int(0.95 * (len(waits) - 1))] * 1000, 1) if waits else 0.0,
+            "wait_max_ms": round(waits[-1] * 1000, 1) if waits else 0.0,
+            **self.stats,
+        }
+
+
+_SLOT_LOCKS = SlotLockManager()
+
+
+def get_slot_locks() -> SlotLockManager:
+    return _SLOT_LOCKS
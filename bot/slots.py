@@ -0,0 +1,106 @@
+# /root/telegram-schedule-bot/bot/slots.py
+# Компактне представлення слота розкладу: порядковий номер дня (date.toordinal()) і хвилина доби.
+# Дата і час з таблиці розбираються один раз - при побудові кешу графіка, індексу бронювань
+# або локальної бази; далі сортування, порівняння з "зараз" і фільтр 7-денного вікна - це
+# порівняння цілих чисел, без strptime і KYIV_TZ.localize на кожен рядок.
+
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import pytz
+
+KYIV_TZ = pytz.timezone('Europe/Kiev')  # той самий об'єкт, що й google_sheets.KYIV_TZ
+
+
+def parse_minute(value) -> Optional[int]:
+    """'9', '09:00', ' 9:05 ' -> хвилина доби (540, 540, 545). None, якщо це не час."""
+    time_str = str(value).strip()
+    if not time_str:
+        return None
+    if ':' not in time_str:
+        if time_str.isdigit() and 0 <= int(time_str) <= 23:
+            return int(time_str) * 60
+        return None
+    parts = time_str.split(':')
+    if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
+        hour, minute = int(parts[0]), int(parts[1])
+        if 0 <= hour <= 23 and 0 <= minute <= 59:
+            return hour * 60 + minute
+    return None
+
+
+_MINUTE_LABELS = tuple(f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(24 * 60))
+
+
+def format_minute(minute: int) -> str:
+    """540 -> '09:00' (готові рядки, без форматування на кожен виклик)."""
+    return _MINUTE_LABELS[minute]
+
+
+def normalize_time_str(value):
+    """Приводить час з таблиці ('9', '09:00', ' 9:05 ') до формату 'HH:MM'. Повертає None, якщо це не час."""
+    minute = parse_minute(value)
+    return format_minute(minute) if minute is not None else None
+
+
+@lru_cache(maxsize=4096)
+def parse_day(date_str: str) -> Optional[int]:
+    """'DD.MM.YYYY' (як DATE_FORMAT_IN_SHEET, день і місяць можуть бути однозначними) -> date.toordinal(). None, якщо не дата."""
+    parts = date_str.strip().split('.')
+    if len(parts) != 3 or not all(part.isdigit() for part in parts) or len(parts[2]) != 4 or len(parts[0]) > 2 or len(parts[1]) > 2:
+        return None
+    try:
+        return date(int(parts[2]), int(parts[1]), int(parts[0])).toordinal()
+    except ValueError:
+        return None
+
+
+def now_position(now_kyiv: datetime) -> Tuple[int, int]:
+    """Момент за Києвом як (день, хвилина): слот ще не почався, якщо його (day, minute) більше."""
+    return now_kyiv.toordinal(), now_kyiv.hour * 60 + now_kyiv.minute
+
+
+class Slot:
+    """Слот 'Графіка' або бронювання: вихідний рядок дати, 'HH:MM' і розібрані день/хвилина."""
+    __slots__ = ("date", "time", "day", "minute")
+
+    def __init__(self, date_str: str, day: int, minute: int):
+        self.date = date_str
+        self.time = format_minute(minute)
+        self.day = day
+        self.minute = minute
+
+    @property
+    def key(self) -> Tuple[int, int]:
+        """Ключ хронологічного сортування і порівняння з now_position()."""
+        return self.day, self.minute
+
+    def day_iso(self) -> str:
+        return date.fromordinal(self.day).isoformat()
+
+    def starts_at(self) -> datetime:
+        """Початок слота за Києвом (для рідких місць, де потрібен справжній datetime)."""
+        naive = datetime.fromordinal(self.day).replace(hour=self.minute // 60, minute=self.minute % 60)
+        return KYIV_TZ.localize(naive)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Slot) and self.date == other.date and self.minute == other.minute
+
+    def __hash__(self) -> int:
+        return hash((self.date, self.minute))
+
+    def __repr__(self) -> str:
+        return f"Slot({self.date} {self.time})"
+
+
+def parse_slot(date_value, time_value) -> Optional[Slot]:
+    """Один прохід розбору пари з таблиці. None, якщо дата або час не розпізнані."""
+    date_str = str(date_value).strip()
+    minute = parse_minute(time_value)
+    if not date_str or minute is None:
+        return None
+    day = parse_day(date_str)
+    if day is None:
+        return None
+    return Slot(date_str, day, minute)
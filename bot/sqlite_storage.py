@@ -0,0 +1,468 @@
+# /root/telegram-schedule-bot/bot/sqlite_storage.py
+# Локальна SQLite як основне сховище бота (STORAGE_BACKEND=sqlite).
+# Читання і бронювання виконуються локально (частки мілісекунди, атомарно в одній транзакції),
+# а кожна зміна в тій самій транзакції записується в outbox. SheetsReplicator переносить outbox
+# у Google Sheets і підтягує назад правки, які адвокат робить у таблиці.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from .google_sheets import (
+    BOOKING_HORIZON_DAYS,
+    KYIV_TZ,
+    REQUEST_DATE_COLUMN,
+    REQUEST_QUESTION_COLUMN,
+    REQUEST_STATUS_COLUMN,
+    REQUEST_TIME_COLUMN,
+    REQUEST_USER_ID_COLUMN,
+    STATUS_FREE,
+    normalize_time_str,
+)
+from .schedule_snapshot import ScheduleSnapshot
+from .slots import now_position, parse_day, parse_slot
+from .sheets_gateway import shutdown_gateway
+from .sheets_replicator import (
+    OUTBOX_CLIENT_UPSERT,
+    OUTBOX_REQUEST_APPEND,
+    OUTBOX_REQUEST_CANCEL,
+    OUTBOX_SLOT_STATUS,
+    SheetsReplicator,
+)
+from .storage import Storage
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SQLITE_STORAGE_PATH = os.getenv("SQLITE_STORAGE_PATH", os.path.join(_PROJECT_ROOT, "bot_storage.sqlite3"))
+SCHEDULE_SNAPSHOT_TTL_SECONDS = 60  # знімок перебудовується хоча б так часто, щоб минулі слоти зникали
+
+# Порядок колонок рядка заявки, який формують хендлери (див. handlers.py)
+REQUEST_ROW_FIELDS = (
+    "Ім’я", "Контакт", REQUEST_QUESTION_COLUMN, REQUEST_USER_ID_COLUMN, REQUEST_DATE_COLUMN,
+    REQUEST_TIME_COLUMN, "Час запису", "Телефон", "Месенджер", REQUEST_STATUS_COLUMN,
+)
+REQUEST_CANCELLED_STATUS = "Скасовано клієнтом"
+_CANCELLED_REQUEST_STATUSES = ("скасовано клієнтом", "cancelled by user")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    day TEXT,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (date, time)
+);
+CREATE TABLE IF NOT EXISTS requests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    date TEXT,
+    time TEXT,
+    starts_at REAL,
+    status TEXT NOT NULL DEFAULT '',
+    question TEXT NOT NULL DEFAULT '',
+    data_json TEXT NOT NULL,
+    sheet_row INTEGER UNIQUE,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS requests_by_user ON requests (user_id, starts_at);
+CREATE TABLE IF NOT EXISTS clients (
+    user_id TEXT PRIMARY KEY,
+    username TEXT NOT NULL DEFAULT '',
+    name TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_by_entity ON outbox (entity);
+"""
+
+
+def _slot_entity(date_str: str, time_key: str) -> str:
+    return f"slot:{date_str}|{time_key}"
+
+
+def _request_entity(request_id: int) -> str:
+    return f"request:{request_id}"
+
+
+def _client_entity(user_id_str: str) -> str:
+    return f"client:{user_id_str}"
+
+
+def _day_iso(date_str: str) -> Optional[str]:
+    day = parse_day(date_str)
+    return date.fromordinal(day).isoformat() if day is not None else None
+
+
+def _starts_at(date_str: str, time_key: Optional[str]) -> Optional[float]:
+    if not date_str or not time_key:
+        return None
+    slot = parse_slot(date_str, time_key)
+    return slot.starts_at().timestamp() if slot else None
+
+
+class SqliteStore:
+    """
+    Синхронне ядро сховища: таблиці slots/requests/clients та outbox змін для Google Sheets.
+    Потокобезпечне; кожна операція - одна коротка транзакція.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Вбудований lower() SQLite не змінює регістр кирилиці ('Вільно')
+        self._conn.create_function("casefold", 1, lambda value: value.casefold() if isinstance(value, str) else value,
+                                   deterministic=True)
+        self._conn.executescript(_SCHEMA)
+        self._snapshot = None
+        self._snapshot_built_at = 0.0
+        self._schedule_version = 0
+        self.on_outbox_write = None  # callable без аргументів - будить реплікатор
+
+    # --- службові ---
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _enqueue(self, conn, kind: str, entity: str, payload: dict) -> None:
+        conn.execute(
+            "INSERT INTO outbox (kind, entity, payload, created_at) VALUES (?, ?, ?, ?)",
+            (kind, entity, json.dumps(payload, ensure_ascii=False), time.time())
+        )
+
+    def _outbox_written(self) -> None:
+        if self.on_outbox_write is not None:
+            self.on_outbox_write()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # --- графік ---
+
+    def invalidate_schedule(self) -> None:
+        with self._lock:
+            self._snapshot_built_at = 0.0
+
+    def available_dates(self) -> ScheduleSnapshot:
+        """Вільні майбутні слоти на 7 днів - ті самі правила, що й у google_sheets.get_available_dates."""
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._snapshot_built_at < SCHEDULE_SNAPSHOT_TTL_SECONDS:
+                return self._snapshot
+            now_kyiv = datetime.now(KYIV_TZ)
+            today = now_kyiv.date()
+            rows = self._conn.execute(
+                "SELECT date, time FROM slots WHERE casefold(status) = ? AND day >= ? AND day < ? ORDER BY day, time",
+                (STATUS_FREE, today.isoformat(), (today + timedelta(days=BOOKING_HORIZON_DAYS)).isoformat())
+            ).fetchall()
+            now_pos = now_position(now_kyiv)
+            available = {}
+            for date_str, time_key in rows:
+                slot = parse_slot(date_str, time_key)
+                if slot is not None and slot.key > now_pos:
+                    available.setdefault(date_str, []).append(time_key)
+            if self._snapshot is None or self._snapshot.to_dict() != available:
+                self._schedule_version += 1
+                self._snapshot = ScheduleSnapshot(available, self._schedule_version)
+            self._snapshot_built_at = time.monotonic()
+            return self._snapshot
+
+    def update_status(self, date_str: str, time_str: str, new_status: str, expected_current_status: str) -> bool:
+        return self.update_statuses([(date_str, time_str, new_status, expected_current_status)])[0]
+
+    def update_statuses(self, changes: list) -> List[bool]:
+        """Умовні зміни статусів [(дата, час, новий, очікуваний), ...] однією транзакцією."""
+        results = []
+        with self._transaction() as conn:
+            for date_str, time_str, new_status, expected_current_status in changes:
+                time_key = normalize_time_str(time_str) or str(time_str).strip()
+                changed = conn.execute(
+                    "UPDATE slots SET status = ?, updated_at = ? WHERE date = ? AND time = ? AND casefold(status) = casefold(?)",
+                    (new_status, time.time(), date_str, time_key, expected_current_status)
+                ).rowcount
+                if changed:
+                    self._enqueue(conn, OUTBOX_SLOT_STATUS, _slot_entity(date_str, time_key), {
+                        "date": date_str, "time": time_key, "status": new_status, "expected": expected_current_status,
+                    })
+                results.append(bool(changed))
+        if any(results):
+            self.invalidate_schedule()
+            self._outbox_written()
+        return results
+
+    def slots_with_status(self, status: str) -> List[Tuple[str, str]]:
+        with self._lock:
+            return self._conn.execute("SELECT date, time FROM slots WHERE casefold(status) = casefold(?)", (status,)).fetchall()
+
+    # --- заявки ---
+
+    def append_request(self, row_values: list) -> int:
+        values = ["" if v is None else str(v) for v in row_values]
+        data = dict(zip(REQUEST_ROW_FIELDS, values))
+        date_str = data.get(REQUEST_DATE_COLUMN, "").strip()
+        time_key = normalize_time_str(data.get(REQUEST_TIME_COLUMN, ""))
+        with self._transaction() as conn:
+            request_id = conn.execute(
+                "INSERT INTO requests (user_id, date, time, starts_at, status, question, data_json, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (data.get(REQUEST_USER_ID_COLUMN, "").strip(), date_str, time_key, _starts_at(date_str, time_key),
+                 data.get(REQUEST_STATUS_COLUMN, ""), data.get(REQUEST_QUESTION_COLUMN, ""),
+                 json.dumps(data, ensure_ascii=False), time.time())
+            ).lastrowid
+            self._enqueue(conn, OUTBOX_REQUEST_APPEND, _request_entity(request_id), {"request_id": request_id, "row": values})
+        self._outbox_written()
+        return request_id
+
+    def user_bookings(self, user_id: int) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, date, time, status, question, data_json FROM requests"
+                " WHERE user_id = ? AND starts_at > ? ORDER BY starts_at",
+                (str(user_id), time.time())
+            ).fetchall()
+        return [
+            {"row_index": request_id, "date": date_str, "time": time_key, "question": question, "data": json.loads(data_json)}
+            for request_id, date_str, time_key, status, question, data_json in rows
+            if status.strip().lower() not in _CANCELLED_REQUEST_STATUSES
+        ]
+
+    def cancel_request(self, request_id: int, user_name: str, user_id: int) -> bool:
+        with self._transaction() as conn:
+            changed = conn.execute(
+                "UPDATE requests SET status = ? WHERE id = ? AND user_id = ?",
+                (REQUEST_CANCELLED_STATUS, request_id, str(user_id))
+            ).rowcount
+            if changed:
+                self._enqueue(conn, OUTBOX_REQUEST_CANCEL, _request_entity(request_id), {
+                    "request_id": request_id, "user_name": user_name, "user_id": user_id,
+                })
+        if changed:
+            self._outbox_written()
+        return bool(changed)
+
+    def request_sheet_ref(self, request_id: int) -> Optional[tuple]:
+        """(номер рядка в 'Заявках', дата, час) заявки або None, якщо рядок ще невідомий."""
+        with self._lock:
+            row = self._conn.execute("SELECT sheet_row, date, time FROM requests WHERE id = ?", (request_id,)).fetchone()
+        return tuple(row) if row and row[0] is not None else None
+
+    def set_request_sheet_rows(self, sheet_rows: Dict[int, int]) -> None:
+        with self._transaction() as conn:
+            conn.executemany("UPDATE requests SET sheet_row = ? WHERE id = ?", [(row, rid) for rid, row in sheet_rows.items()])
+
+    # --- клієнти ---
+
+    def client_name(self, user_id: int) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT name FROM clients WHERE user_id = ?", (str(user_id),)).fetchone()
+        return row[0] if row and row[0] else None
+
+    def save_client(self, user_id: int, telegram_username: str, provided_name: str) -> None:
+        user_id_str = str(user_id)
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO clients (user_id, username, name, updated_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (user_id) DO UPDATE SET username = excluded.username, name = excluded.name,"
+                " updated_at = excluded.updated_at",
+                (user_id_str, telegram_username or "", provided_name, time.time())
+            )
+            self._enqueue(conn, OUTBOX_CLIENT_UPSERT, _client_entity(user_id_str), {
+                "user_id": user_id, "username": telegram_username or "", "name": provided_name,
+            })
+        self._outbox_written()
+
+    # --- outbox (для реплікатора) ---
+
+    def outbox_batch(self, limit: int) -> List[Tuple[int, str, dict]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id, kind, payload FROM outbox ORDER BY id LIMIT ?", (limit,)).fetchall()
+        return [(entry_id, kind, json.loads(payload)) for entry_id, kind, payload in rows]
+
+    def ack(self, entry_ids: List[int]) -> None:
+        with self._transaction() as conn:
+            conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in entry_ids])
+
+    def outbox_depth(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def _pending_entities(self, conn) -> set:
+        return {entity for (entity,) in conn.execute("SELECT DISTINCT entity FROM outbox")}
+
+    # --- злиття даних з Google Sheets (правки адвоката) ---
+    # Сутності з недоставленими змінами бота не чіпаємо: їхній стан у таблиці ще застарілий.
+
+    def merge_slots(self, statuses: Dict[Tuple[str, str], str]) -> int:
+        """Приводить slots до стану 'Графіка'. Повертає кількість змінених слотів."""
+        now = time.time()
+        with self._transaction() as conn:
+            pending = self._pending_entities(conn)
+            local = {(d, t): s for d, t, s in conn.execute("SELECT date, time, status FROM slots")}
+            upserts = [
+                (date_str, time_key, _day_iso(date_str), status, now)
+                for (date_str, time_key), status in statuses.items()
+                if local.get((date_str, time_key)) != status and _slot_entity(date_str, time_key) not in pending
+            ]
+            removed = [
+                slot_key for slot_key in local
+                if slot_key not in statuses and _slot_entity(*slot_key) not in pending
+            ]
+            conn.executemany(
+                "INSERT INTO slots (date, time, day, status, updated_at) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (date, time) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+                upserts
+            )
+            conn.executemany("DELETE FROM slots WHERE date = ? AND time = ?", removed)
+        if upserts or removed:
+            self.invalidate_schedule()
+        return len(upserts) + len(removed)
+
+    def merge_clients(self, directory: Mapping) -> int:
+        """directory: { 'user_id': ClientRecord } з аркуша 'Клиенты'."""
+        now = time.time()
+        with self._transaction() as conn:
+            pending = self._pending_entities(conn)
+            local = {u: (n, un) for u, n, un in conn.execute("SELECT user_id, name, username FROM clients")}
+            upserts = [
+                (user_id_str, record.username, record.name, now)
+                for user_id_str, record in directory.items()
+                if local.get(user_id_str) != (record.name, record.username) and _client_entity(user_id_str) not in pending
+            ]
+            conn.executemany(
+                "INSERT INTO clients (user_id, username, name, updated_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (user_id) DO UPDATE SET username = excluded.username, name = excluded.name,"
+                " updated_at = excluded.updated_at",
+                upserts
+            )
+        return len(upserts)
+
+    def merge_requests(self, bookings_by_user: Mapping) -> int:
+        """
+        bookings_by_user: { 'Telegram ID': [BookingRecord, ...] } з аркуша 'Заявки'.
+        Нові для бази бронювання імпортуються, у відомих оновлюється статус.
+        Заявка відповідає рядку, лише якщо збігаються Telegram ID, дата і час: якщо за відомим номером
+        рядка тепер інше бронювання або рядка немає (персонал видалив чи вставив рядки вище), номер
+        знімається з заявки і вона знаходить свій рядок за (Telegram ID, дата, час).
+        """
+        now = time.time()
+        changed = 0
+        records = [(user_id_str, record) for user_id_str, user_records in bookings_by_user.items() for record in user_records]
+        with self._transaction() as conn:
+            pending = self._pending_entities(conn)
+            by_sheet_row = {
+                sheet_row: (request_id, user_id, date_str, time_str, status)
+                for request_id, sheet_row, user_id, date_str, time_str, status in conn.execute(
+                    "SELECT id, sheet_row, user_id, date, time, status FROM requests WHERE sheet_row IS NOT NULL")
+            }
+            matched, unmatched = [], []
+            for user_id_str, record in records:
+                known = by_sheet_row.get(record.row_index)
+                if known and known[1:4] == (user_id_str, record.date, record.time):
+                    matched.append((known[0], known[4], record))
+                else:
+                    unmatched.append((user_id_str, record))
+            # Номери рядків, під якими тепер інше бронювання або нічого, звільняємо до перепризначення (sheet_row UNIQUE)
+            displaced = {known[0] for known in by_sheet_row.values()} - {request_id for request_id, _, _ in matched}
+            if displaced:
+                conn.executemany("UPDATE requests SET sheet_row = NULL WHERE id = ?", [(rid,) for rid in displaced])
+            for user_id_str, record in unmatched:
+                # Заявка без рядка (дописана ботом без відомого номера або щойно звільнена) - прив'язуємо замість дублювання;
+                # заявку з недоставленим дописуванням не чіпаємо - її рядка в таблиці ще немає
+                candidates = conn.execute(
+                    "SELECT id, status FROM requests WHERE sheet_row IS NULL AND user_id = ? AND date = ? AND time = ? ORDER BY id",
+                    (user_id_str, record.date, record.time)
+                ).fetchall()
+                candidate = next(((rid, status) for rid, status in candidates
+                                  if rid in displaced or _request_entity(rid) not in pending), None)
+                if candidate:
+                    conn.execute("UPDATE requests SET sheet_row = ? WHERE id = ?", (record.row_index, candidate[0]))
+                    if candidate[0] in displaced:
+                        matched.append((candidate[0], candidate[1], record))
+                    continue
+                conn.execute(
+                    "INSERT INTO requests (user_id, date, time, starts_at, status, question, data_json, sheet_row, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (user_id_str, record.date, record.time, record.slot.starts_at().timestamp(), record.status,
+                     record.question, json.dumps(record.data, ensure_ascii=False), record.row_index, now)
+                )
+                changed += 1
+            for request_id, status, record in matched:
+                if status != record.status and _request_entity(request_id) not in pending:
+                    conn.execute("UPDATE requests SET status = ? WHERE id = ?", (record.status, request_id))
+                    changed += 1
+        return changed
+
+
+class SqliteStorage(Storage):
+    """Storage поверх SqliteStore; Google Sheets - дзеркало, яке підтримує SheetsReplicator."""
+
+    def __init__(self, path: str = SQLITE_STORAGE_PATH):
+        self.store = SqliteStore(path)
+        self.replicator = None
+
+    async def start(self) -> None:
+        self.replicator = SheetsReplicator(self.store)
+        await self.replicator.start()
+
+    async def close(self) -> None:
+        if self.replicator is not None:
+            await self.replicator.stop()
+            self.replicator = None
+        shutdown_gateway()
+        self.store.close()
+
+    def backlog_depth(self) -> int:
+        return self.store.outbox_depth()
+
+    # Операції з локальною базою короткі (частки мілісекунди), тож виконуються прямо в event loop
+
+    async def get_available_dates(self) -> Mapping:
+        return self.store.available_dates()
+
+    async def update_status(self, date_str: str, time_str: str, new_status: str,
+                            expected_current_status: str = STATUS_FREE) -> bool:
+        return self.store.update_status(date_str, time_str, new_status, expected_current_status)
+
+    async def update_statuses(self, changes: list) -> List[bool]:
+        return self.store.update_statuses(changes)
+
+    async def slots_with_status(self, status: str) -> List[tuple]:
+        return [tuple(slot) for slot in self.store.slots_with_status(status)]
+
+    async def get_user_bookings(self, user_id: int) -> List[dict]:
+        return self.store.user_bookings(user_id)
+
+    async def mark_booking_as_cancelled(self, row_index: int, user_name: str, user_id: int) -> bool:
+        return self.store.cancel_request(row_index, user_name, user_id)
+
+    async def get_client_provided_name(self, user_id: int) -> Optional[str]:
+        return self.store.client_name(user_id)
+
+    async def save_or_update_client_name(self, user_id: int, telegram_username: str, provided_name: str) -> bool:
+        self.store.save_client(user_id, telegram_username, provided_name)
+        return True
+
+    async def append_request_row(self, row_values: list) -> None:
+        self.store.append_request(row_values)
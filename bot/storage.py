@@ -0,0 +1,187 @@
+# /root/telegram-schedule-bot/bot/storage.py
+# Сховище даних бота. Хендлери працюють лише з інтерфейсом Storage, а реалізація
+# обирається змінною оточення STORAGE_BACKEND:
+#   sheets (за замовчуванням) - Google Sheets через асинхронний шлюз, як і раніше;
+#   sqlite - локальна SQLite як основне сховище, а таблиця, з якою працює адвокат,
+#            синхронізується з нею у фоні (див. sqlite_storage.py та sheets_replicator.py);
+#   ipc    - лише для процесів-воркерів: виклики йдуть до сховища процесу-власника (ipc_storage.py).
+
+import asyncio
+import math
+import os
+import sys
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from contextlib import AsyncExitStack
+from typing import List, Optional
+
+from . import sheets_gateway
+from .google_sheets import STATUS_FREE, cached_slot_status
+from .requests_journal import start_journal_flusher, stop_journal_flusher, enqueue_request_row, backlog_depth
+from .schedule_refresher import start_schedule_refresher, stop_schedule_refresher
+from .slot_locks import get_slot_locks
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sheets").strip().lower()
+
+
+class Storage(ABC):
+    """Операції, потрібні хендлерам. Усі методи асинхронні та не блокують event loop."""
+
+    async def start(self) -> None:
+        """Запускає фонові задачі сховища (викликається з lifespan FastAPI)."""
+
+    async def close(self) -> None:
+        """Зупиняє фонові задачі та звільняє ресурси."""
+
+    def backlog_depth(self) -> int:
+        """Кількість змін, які ще не доставлені в Google Sheets."""
+        return 0
+
+    @abstractmethod
+    async def get_available_dates(self) -> Mapping:
+        """Знімок вільних слотів { 'дата': ('HH:MM', ...) } з полем version."""
+
+    @abstractmethod
+    async def update_status(self, date_str: str, time_str: str, new_status: str,
+                            expected_current_status: str = STATUS_FREE) -> bool:
+        """Атомарно змінює статус слота, якщо поточний дорівнює expected_current_status."""
+
+    async def update_statuses(self, changes: list) -> List[bool]:
+        """Пакетна умовна зміна статусів [(дата, час, новий, очікуваний), ...] (знімає утримання слотів)."""
+        return [await self.update_status(date_str, time_str, new_status, expected_current_status=expected)
+                for date_str, time_str, new_status, expected in changes]
+
+    @abstractmethod
+    async def slots_with_status(self, status: str) -> List[tuple]:
+        """Слоти [('дата', 'HH:MM'), ...] з заданим статусом (утримання, знайдені при старті)."""
+
+    @abstractmethod
+    async def get_user_bookings(self, user_id: int) -> List[dict]:
+        """Активні майбутні бронювання: [{row_index, date, time, question, data}, ...]."""
+
+    @abstractmethod
+    async def mark_booking_as_cancelled(self, row_index: int, user_name: str, user_id: int) -> bool:
+        """Позначає заявку (row_index з get_user_bookings) як скасовану клієнтом."""
+
+    @abstractmethod
+    async def get_client_provided_name(self, user_id: int) -> Optional[str]:
+        """Збережене ім'я клієнта або None."""
+
+    @abstractmethod
+    async def save_or_update_client_name(self, user_id: int, telegram_username: str, provided_name: str) -> bool:
+        """Зберігає ім'я клієнта."""
+
+    @abstractmethod
+    async def append_request_row(self, row_values: list) -> None:
+        """Додає заявку (рядок у порядку колонок аркуша 'Заявки')."""
+
+
+class SheetsStorage(Storage):
+    """Google Sheets як основне сховище (шлюз з пулом потоків, кеш графіка, журнал заявок)."""
+
+    def __init__(self):
+        self.slot_locks = get_slot_locks()
+        self._slot_writes = set()  # записи слотів, яких викликачі не дочекалися (див. _locked_write)
+
+    async def start(self) -> None:
+        # Прогріваємо кеш розкладу і тримаємо його актуальним у фоні,
+        # щоб хендлери ніколи не чекали читання "Графіка"
+        await start_schedule_refresher()
+        # Заявки з локального журналу (зокрема не доставлені до перезапуску) переносяться в "Заявки" у фоні
+        await start_journal_flusher()
+
+    async def close(self) -> None:
+        await stop_schedule_refresher()
+        await stop_journal_flusher()
+        sheets_gateway.shutdown_gateway()
+
+    def backlog_depth(self) -> int:
+        return backlog_depth()
+
+    async def get_available_dates(self) -> Mapping:
+        return await sheets_gateway.get_available_dates()
+
+    async def _locked_write(self, write, func_name: str):
+        """
+        Виконує запис слотів (корутину, що тримає їхні замки) окремою задачею. Викликач чекає не довше
+        SHEETS_CALL_TIMEOUT, а задача - до кінця виклику в потоці Sheets (з усіма повторами планувальника):
+        інакше замок звільнився б, поки попередній запис ще йде, і два бронювання знову йшли б паралельно.
+        """
+        task = asyncio.create_task(write)
+        self._slot_writes.add(task)
+        task.add_done_callback(self._slot_writes.discard)  # виняток після таймауту позначає отриманим asyncio.shield
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=sheets_gateway.SHEETS_CALL_TIMEOUT)
+        except asyncio.TimeoutError as e:
+            print(f"ПОМИЛКА [storage.py]: {func_name} не завершився за {sheets_gateway.SHEETS_CALL_TIMEOUT} с; "
+                  f"замки слотів тримаються до завершення запису.", file=sys.stderr)
+            raise sheets_gateway.SheetsTimeoutError(f"{func_name} timed out after {sheets_gateway.SHEETS_CALL_TIMEOUT}s") from e
+
+    async def update_status(self, date_str: str, time_str: str, new_status: str,
+                            expected_current_status: str = STATUS_FREE) -> bool:
+        return await self._locked_write(self._update_status_locked(date_str, time_str, new_status, expected_current_status),
+                                        "update_status")
+
+    async def _update_status_locked(self, date_str: str, time_str: str, new_status: str, expected_current_status: str) -> bool:
+        # Бронювання і скасування одного слота - по черзі, інакше обидва учасники можуть прочитати "вільно"
+        async with self.slot_locks.hold(date_str, time_str) as slot:
+            if self.slot_locks.settled(slot, expected_current_status):
+                return False  # попередній власник замка вже зайняв/змінив слот
+            updated = await sheets_gateway.update_status(date_str, time_str, new_status,
+                                                         expected_current_status=expected_current_status, timeout=math.inf)
+            slot.status = new_status if updated else cached_slot_status(date_str, time_str)
+            return updated
+
+    async def update_statuses(self, changes: list) -> List[bool]:
+        return await self._locked_write(self._update_statuses_locked(changes), "update_statuses")
+
+    async def _update_statuses_locked(self, changes: list) -> List[bool]:
+        async with AsyncExitStack() as stack:
+            # Замки беремо в одному порядку, щоб дві пачки не чекали одна на одну
+            slots = {}
+            for date_str, time_str in sorted({(d, t) for d, t, _, _ in changes}):
+                slots[(date_str, time_str)] = await stack.enter_async_context(self.slot_locks.hold(date_str, time_str))
+            results = await sheets_gateway.update_statuses(changes, timeout=math.inf)
+            for (date_str, time_str, new_status, _), updated in zip(changes, results):
+                slots[(date_str, time_str)].status = new_status if updated else cached_slot_status(date_str, time_str)
+            return results
+
+    async def slots_with_status(self, status: str) -> List[tuple]:
+        return await sheets_gateway.slots_with_status(status)
+
+    async def get_user_bookings(self, user_id: int) -> List[dict]:
+        return await sheets_gateway.get_user_bookings(user_id)
+
+    async def mark_booking_as_cancelled(self, row_index: int, user_name: str, user_id: int) -> bool:
+        return await sheets_gateway.mark_booking_as_cancelled(row_index, user_name, user_id)
+
+    async def get_client_provided_name(self, user_id: int) -> Optional[str]:
+        return await sheets_gateway.get_client_provided_name(user_id)
+
+    async def save_or_update_client_name(self, user_id: int, telegram_username: str, provided_name: str) -> bool:
+        return await sheets_gateway.save_or_update_client_name(user_id, telegram_username, provided_name)
+
+    async def append_request_row(self, row_values: list) -> None:
+        # Заявка спершу пишеться в локальний журнал, у "Заявки" її переносить фоновий flusher
+        enqueue_request_row(row_values)
+
+
+_STORAGE = None
+
+
+def get_storage() -> Storage:
+    """Сховище, обране STORAGE_BACKEND (один екземпляр на процес)."""
+    global _STORAGE
+    if _STORAGE is None:
+        if STORAGE_BACKEND == "sqlite":
+            from .sqlite_storage import SqliteStorage
+            _STORAGE = SqliteStorage()
+        elif STORAGE_BACKEND == "ipc":  # процес-воркер: сховище процесу-власника (див. workers.py)
+            from .ipc_storage import IpcStorage
+            _STORAGE = IpcStorage()
+        else:
+            if STORAGE_BACKEND != "sheets":
+                print(f"ПОПЕРЕДЖЕННЯ [storage.py]: Невідомий STORAGE_BACKEND='{STORAGE_BACKEND}', використовую 'sheets'.", file=sys.stderr)
+            _STORAGE = SheetsStorage()
+        print(f"INFO [storage.py]: Сховище: {type(_STORAGE).__name__}.", file=sys.stderr)
+    return _STORAGE
@@ -0,0 +1,197 @@
+# /root/telegram-schedule-bot/bot/update_executor.py
+# Виконання вхідних оновлень (і з polling, і з webhook): різні чати обробляються паралельно,
+# але не більше UPDATE_CONCURRENCY хендлерів одночасно, а оновлення одного чату - строго по черзі.
+# Для кожного чату з непорожньою чергою живе одна задача-виконавець, яка забирає його оновлення
+# в порядку надходження; глобальний семафор обмежує кількість одночасних хендлерів. Тож повільний
+# крок одного користувача (запис у Sheets) не затримує інших, а швидкі натискання одного
+# користувача не переставляються і не ламають його сценарій FSM.
+# Очікування в черзі рахується від надходження оновлення до початку його обробки.
+
+import asyncio
+import os
+import sys
+import time
+from collections import Counter, deque
+from typing import Callable, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "32"))  # хендлерів одночасно на процес
+UPDATE_QUEUE_SIZE = int(os.getenv("UPDATE_QUEUE_SIZE", "1000"))  # оновлень, що чекають на обробку
+UPDATE_DRAIN_TIMEOUT = 10.0  # секунд на обробку вже прийнятих оновлень при зупинці
+POLLING_TIMEOUT = 10  # секунд long polling getUpdates (як у aiogram за замовчуванням)
+POLLING_MAX_BACKOFF = 30.0  # секунд, верхня межа паузи після помилок getUpdates
+_WAIT_SAMPLES = 1000  # скільки останніх очікувань зберігати для перцентилів
+
+
+def chat_key(update: Update):
+    """Ключ послідовної обробки: чат події, інакше користувач, інакше саме оновлення (без обмежень)."""
+    try:
+        event = update.event
+    except LookupError:
+        return "update", update.update_id
+    chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None)
+    if user is not None:
+        return user.id
+    return "update", update.update_id
+
+
+class UpdateExecutor:
+    """Черги оновлень за чатами з глобальним обмеженням паралельності. Використовується лише з event loop."""
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, concurrency: int = UPDATE_CONCURRENCY,
+                 max_pending: int = UPDATE_QUEUE_SIZE, on_done: Optional[Callable[[bool], None]] = None):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.on_done = on_done  # викликається після кожного оновлення (True - оброблено без помилки)
+        self._chats = {}  # ключ чату -> deque[(час надходження, Update)]
+        self._runners = set()
+        self._pending = 0
+        self._running = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._idle: Optional[asyncio.Event] = None  # встановлено, коли нічого не чекає і не виконується
+        self._capacity: Optional[asyncio.Event] = None  # встановлено, коли є місце в черзі
+        self._closed = False
+        self._waits = deque(maxlen=_WAIT_SAMPLES)
+        self._max_chat_depth = 0
+        self.stats = Counter()  # 'accepted', 'rejected', 'processed', 'failed'
+
+    def _ensure_loop_objects(self) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._idle = asyncio.Event()
+            self._idle.set()
+            self._capacity = asyncio.Event()
+            self._capacity.set()
+
+    def submit(self, update: Update) -> bool:
+        """Не чекає: False, якщо черга повна або виконавець зупиняється (webhook відповідає 503)."""
+        self._ensure_loop_objects()
+        if self._closed or self._pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            self._capacity.clear()
+            return False
+        key = chat_key(update)
+        queue = self._chats.get(key)
+        if queue is None:
+            queue = self._chats[key] = deque()
+            runner = asyncio.create_task(self._run_chat(key, queue), name=f"updates-{key}")
+            self._runners.add(runner)
+            runner.add_done_callback(self._runners.discard)
+        queue.append((time.monotonic(), update))
+        self._max_chat_depth = max(self._max_chat_depth, len(queue))
+        self._pending += 1
+        self._idle.clear()
+        self.stats["accepted"] += 1
+        return True
+
+    async def put(self, update: Update) -> None:
+        """Як submit, але чекає на місце в черзі (polling: не забирати нові оновлення, поки черга повна)."""
+        while not self.submit(update):
+            if self._closed:
+                raise RuntimeError("UpdateExecutor зупинено")
+            await self._capacity.wait()
+
+    async def _run_chat(self, key, queue: deque) -> None:
+        while queue:
+            enqueued_at, update = queue[0]
+            ok = False
+            async with self._semaphore:
+                self._waits.append(time.monotonic() - enqueued_at)
+                self._running += 1
+                try:
+                    await self.dispatcher.feed_update(self.bot, update)
+                    self.stats["processed"] += 1
+                    ok = True
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    print(f"ПОМИЛКА [update_executor.py]: Оновлення {update.update_id} (чат {key}): {type(e).__name__} - {e}",
+                          file=sys.stderr)
+                finally:
+                    self._running -= 1
+            queue.popleft()  # лише після обробки: нове оновлення чату стане в цю ж чергу, а не запустить другий виконавець
+            self._pending -= 1
+            self._capacity.set()
+            if self.on_done is not None:
+                self.on_done(ok)
+        del self._chats[key]
+        if not self._pending:
+            self._idle.set()
+
+    async def join(self) -> None:
+        """Чекає, поки всі прийняті оновлення буде оброблено."""
+        self._ensure_loop_objects()
+        await self._idle.wait()
+
+    async def stop(self, drain_timeout: float = UPDATE_DRAIN_TIMEOUT) -> None:
+        """Перестає приймати оновлення і обробляє вже прийняті (не довше drain_timeout)."""
+        self._closed = True
+        if self._capacity is not None:
+            self._capacity.set()  # розбудити put(), щоб він побачив зупинку
+        try:
+            await asyncio.wait_for(self.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"ПОПЕРЕДЖЕННЯ [update_executor.py]: Не оброблено {self._pending} оновлень при зупинці.", file=sys.stderr)
+            for runner in list(self._runners):
+                runner.cancel()
+            await asyncio.gather(*self._runners, return_exceptions=True)
+
+    def executor_stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def pick(q: float):
+            return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 1) if waits else None
+
+        return {
+            "depth": self._pending,
+            "active_chats": len(self._chats),
+            "running": self._running,
+            "max_chat_depth": self._max_chat_depth,
+            "chat_wait_p50_ms": pick(0.50),
+            "chat_wait_p95_ms": pick(0.95),
+            **self.stats,
+        }
+
+
+async def poll_updates(dispatcher: Dispatcher, bot: Bot, executor: UpdateExecutor) -> None:
+    """
+    Long polling замість dp.start_polling: оновлення передаються у виконавця, а не запускаються
+    задачею кожне. Поки черга виконавця повна, нові оновлення не забираються. Зупинка - cancel().
+    """
+    await bot.delete_webhook()  # getUpdates не працює, поки зареєстровано webhook
+    allowed_updates = dispatcher.resolve_used_update_types()
+    offset = None
+    backoff = 1.0
+    print(f"INFO [update_executor.py]: Polling: до {executor.concurrency} хендлерів одночасно.", file=sys.stderr)
+    while True:
+        try:
+            updates = await bot.get_updates(offset=offset, timeout=POLLING_TIMEOUT, allowed_updates=allowed_updates)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"ПОМИЛКА [update_executor.py]: getUpdates: {type(e).__name__} - {e}. Повтор через {backoff:.0f} с.",
+                  file=sys.stderr)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, POLLING_MAX_BACKOFF)
+            continue
+        backoff = 1.0
+        for update in updates:
+            await executor.put(update)
+            offset = update.update_id + 1
+
+
+_UPDATE_EXECUTOR = None
+
+
+def get_update_executor(dispatcher: Dispatcher, bot: Bot) -> UpdateExecutor:
+    """Виконавець оновлень процесу (один на воркер uvicorn)."""
+    global _UPDATE_EXECUTOR
+    if _UPDATE_EXECUTOR is None:
+        _UPDATE_EXECUTOR = UpdateExecutor(dispatcher, bot)
+    return _UPDATE_EXECUTOR
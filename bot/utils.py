@@ -3,7 +3,10 @@
 # Логика Google Sheets остается в google_sheets.py
 
 import sys
+from collections import Counter
 from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
 
 # ADMIN_CHAT_ID будет импортирован из bot.bot в тех модулях, где он нужен (например, handlers.py)
 # bot_instance также будет передаваться в функции оттуда.
@@ -28,6 +31,33 @@ async def send_admin_notification(bot_instance: 'Bot', admin_chat_id: Optional[i
         )
 
 
+_EDIT_STATS = Counter()  # edited / skipped (текст і розмітка вже такі) / not_modified (відповідь Telegram)
+
+
+async def edit_text_if_changed(message: Message, text: str, reply_markup=None, **kwargs):
+    """
+    message.edit_text, але без запиту до Telegram, якщо повідомлення вже має цей текст і цю розмітку
+    (повторне натискання тієї самої кнопки, та сама клавіатура з кешу). Відповідь Telegram
+    "message is not modified" (повідомлення могли змінити без нашого відома) теж не є помилкою.
+    """
+    if message.text == text and message.reply_markup == reply_markup:
+        _EDIT_STATS["skipped"] += 1
+        return message
+    try:
+        result = await message.edit_text(text, reply_markup=reply_markup, **kwargs)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+        _EDIT_STATS["not_modified"] += 1
+        return message
+    _EDIT_STATS["edited"] += 1
+    return result
+
+
+def edit_stats() -> dict:
+    return dict(_EDIT_STATS)
+
+
 def _escape_html(text: Optional[str]) -> str:
     """Простое экранирование HTML для безопасной вставки в сообщения."""
     if text is None:
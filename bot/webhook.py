@@ -0,0 +1,47 @@
+# /root/telegram-schedule-bot/bot/webhook.py
+# Режим webhook для FastAPI-застосунку (BOT_MODE=webhook; за замовчуванням - polling, як раніше).
+# Telegram надсилає оновлення POST-запитом на WEBHOOK_PATH із заголовком X-Telegram-Bot-Api-Secret-Token.
+# Ендпоінт лише перевіряє секрет, передає оновлення в обмежену чергу update_executor.UpdateExecutor
+# (паралельно за чатами, послідовно в межах чату) і одразу відповідає 200. Якщо черга повна,
+# ендпоінт відповідає 503 - Telegram повторить доставку пізніше, а пам'ять процесу не росте.
+# Webhook обслуговує один процес uvicorn (--workers 1): стани FSM, утримання слотів і порядок оновлень
+# чату живуть у ньому, а файл станів FSM займається ексклюзивно (fsm_storage.py). Щоб обробка йшла на
+# кількох ядрах, задайте BOT_WORKERS (workers.py) - це єдиний підтримуваний спосіб запустити кілька процесів.
+
+import hmac
+import os
+import sys
+from typing import Optional
+
+from aiogram import Bot, Dispatcher
+
+BOT_MODE = os.getenv("BOT_MODE", "polling").strip().lower()  # polling | webhook
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")  # публічна адреса сервісу; порожня - setWebhook не викликається
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")  # 1-256 символів A-Z, a-z, 0-9, _ і -
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def is_webhook_mode() -> bool:
+    if BOT_MODE not in ("polling", "webhook"):
+        print(f"ПОПЕРЕДЖЕННЯ [webhook.py]: Невідомий BOT_MODE='{BOT_MODE}', використовую 'polling'.", file=sys.stderr)
+    return BOT_MODE == "webhook"
+
+
+def secret_matches(header_value: Optional[str]) -> bool:
+    """Порівняння секрету за сталий час; без налаштованого WEBHOOK_SECRET webhook не приймає нічого."""
+    return bool(WEBHOOK_SECRET) and header_value is not None and hmac.compare_digest(header_value, WEBHOOK_SECRET)
+
+
+async def set_webhook(dispatcher: Dispatcher, bot: Bot) -> None:
+    """Реєструє WEBHOOK_URL + WEBHOOK_PATH у Telegram (якщо WEBHOOK_URL задано)."""
+    if not WEBHOOK_URL:
+        print("INFO [webhook.py]: WEBHOOK_URL не задано - setWebhook пропущено (webhook зареєстровано окремо).", file=sys.stderr)
+        return
+    await bot.set_webhook(
+        f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+        secret_token=WEBHOOK_SECRET,
+        allowed_updates=dispatcher.resolve_used_update_types(),
+        max_connections=100,
+    )
+    print(f"INFO [webhook.py]: Webhook зареєстровано: {WEBHOOK_URL}{WEBHOOK_PATH}", file=sys.stderr)
@@ -0,0 +1,77 @@
+# /root/telegram-schedule-bot/bot/worker_process.py
+# Процес-воркер пулу з workers.py. Модуль навмисно не імпортує модулі бота на верхньому рівні:
+# процес запускається через spawn, і сховище (STORAGE_BACKEND=ipc) та файл станів FSM мають бути
+# задані в оточенні до імпорту bot.bot і handlers.
+
+import asyncio
+import os
+import signal
+import sys
+from collections import Counter
+
+
+def run_worker(index: int, storage_address: str, updates_address: str, fsm_path: str,
+               initializer=None, initargs: tuple = ()) -> None:
+    """Точка входу процесу-воркера. Модулі бота імпортуються лише після налаштування оточення."""
+    os.environ["STORAGE_BACKEND"] = "ipc"
+    os.environ["STORAGE_IPC_ADDRESS"] = storage_address
+    os.environ["FSM_STORAGE_PATH"] = fsm_path
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C отримує вся група процесів; зупинку веде процес FastAPI
+    if initializer is not None:
+        initializer(*initargs)
+    asyncio.run(_serve_updates(index, updates_address))
+
+
+async def _serve_updates(index: int, updates_address: str) -> None:
+    from aiogram.types import Update
+
+    from .bot import bot, dp
+    from .handlers import main_router
+    from .ipc_storage import read_frame, write_frame
+    from .session_reaper import get_session_reaper
+    from .slot_holds import get_slot_holds
+    from .storage import get_storage
+    from .update_executor import UpdateExecutor
+
+    dp.include_router(main_router)
+    await get_storage().start()
+    await get_slot_holds().start()
+    get_session_reaper(dp.storage).install(dp)
+    await get_session_reaper(dp.storage).start()
+    await dp.emit_startup(bot=bot)
+
+    reader, writer = await asyncio.open_unix_connection(updates_address)
+    done = Counter()
+    loop = asyncio.get_running_loop()
+
+    def report() -> None:
+        # Звіти про оброблені оновлення одного проходу event loop йдуть одним кадром
+        if not writer.is_closing():
+            write_frame(writer, (done[True], done[False]))
+        done.clear()
+
+    def on_done(ok: bool) -> None:
+        if not done:
+            loop.call_soon(report)
+        done[ok] += 1
+
+    executor = UpdateExecutor(dp, bot, on_done=on_done)
+    write_frame(writer, index)
+    print(f"INFO [worker_process.py]: Воркер {index} (pid {os.getpid()}) готовий.", file=sys.stderr)
+    try:
+        while True:
+            data = await read_frame(reader)
+            if data is None:
+                break
+            await executor.put(Update.model_validate_json(data, context={"bot": bot}))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        print(f"ПОПЕРЕДЖЕННЯ [worker_process.py]: Воркер {index}: вхід оновлень закрився.", file=sys.stderr)
+    finally:
+        await executor.stop()
+        await asyncio.sleep(0)  # останній звіт (report) до закриття з'єднання
+        writer.close()
+        await get_session_reaper(dp.storage).stop()
+        await dp.emit_shutdown(bot=bot)
+        await bot.session.close()
+        await get_slot_holds().stop()
+        await get_storage().close()
@@ -0,0 +1,267 @@
+# /root/telegram-schedule-bot/bot/workers.py
+# Кілька процесів-воркерів на один бот (BOT_WORKERS > 0; 0 - усе в одному процесі, як раніше).
+# Процес FastAPI лишається єдиним входом оновлень (webhook або polling) і власником сховища:
+# Sheets/SQLite, кеш графіка, журнал заявок, замки й утримання слотів живуть лише в ньому й доступні
+# воркерам через ipc_storage.py. Кожне оновлення йде воркеру з номером user_id % BOT_WORKERS (у приватному
+# чаті id чату дорівнює id користувача), тож стан FSM, утримання слота і порядок оновлень одного
+# користувача завжди в одному процесі, а побудова клавіатур, розбір і шаблони хендлерів
+# розходяться по ядрах. У кожного воркера свій Bot, UpdateExecutor, файл станів FSM
+# (FSM_STORAGE_PATH.workerN - зміна BOT_WORKERS губить незавершені сценарії) і SessionReaper.
+# Вхід тримає не більше UPDATE_QUEUE_SIZE необроблених оновлень на воркер: далі webhook відповідає
+# 503, а polling чекає. Воркер, що впав, запускається знову; його необроблені оновлення губляться,
+# а утримані ним слоти звільняє зняття утримань власника. Якщо воркер падає раніше, ніж пропрацював
+# WORKER_HEALTHY_SECONDS, перезапуск відкладається (1, 2, 4 ... WORKER_RESTART_DELAY_MAX с), а після
+# WORKER_CRASH_LOOP_LIMIT таких падінь поспіль пул зупиняється з поясненням у журналі.
+
+import asyncio
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Optional
+
+from aiogram.types import Update
+
+from .fsm_storage import FSM_STORAGE_PATH
+from .ipc_storage import StorageServer, read_frame, write_frame
+from .update_executor import UPDATE_CONCURRENCY, UPDATE_DRAIN_TIMEOUT, UPDATE_QUEUE_SIZE, chat_key
+from .worker_process import run_worker
+
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "0"))  # процесів-воркерів; 0 - обробка в процесі FastAPI
+WORKER_START_TIMEOUT = 60.0  # секунд на запуск і підключення всіх воркерів
+WORKER_STOP_TIMEOUT = UPDATE_DRAIN_TIMEOUT + 10.0  # секунд на доопрацювання прийнятих оновлень при зупинці
+WORKER_HEALTHY_SECONDS = 60.0  # воркер, що пропрацював менше, вважається таким, що впав при запуску
+WORKER_RESTART_DELAY = 1.0  # секунд до перезапуску після першого такого падіння, далі - удвічі більше
+WORKER_RESTART_DELAY_MAX = 60.0
+WORKER_CRASH_LOOP_LIMIT = 5  # падінь при запуску поспіль, після яких пул зупиняється
+
+
+def shard_of(update: Update, workers: int) -> int:
+    """Номер воркера для оновлення: за чатом (користувачем), інакше за update_id."""
+    key = chat_key(update)
+    return (key if isinstance(key, int) else key[1]) % workers
+
+
+class WorkerPool:
+    """
+    Процеси-воркери з боку входу оновлень. Має той самий інтерфейс, що й UpdateExecutor
+    (submit, put, join, stop, executor_stats), тож main.py і poll_updates працюють з обома.
+    """
+
+    def __init__(self, workers: int = BOT_WORKERS, max_pending: int = UPDATE_QUEUE_SIZE,
+                 initializer=None, initargs: tuple = ()):
+        self.workers = workers
+        self.max_pending = max_pending  # на один воркер
+        self.concurrency = workers * UPDATE_CONCURRENCY
+        self.initializer = initializer  # викликається у воркері до старту (бенчмарки підміняють тут Telegram)
+        self.initargs = initargs
+        self._context = multiprocessing.get_context("spawn")  # fork успадкував би event loop і потоки шлюзу
+        self._processes = [None] * workers
+        self._writers = [None] * workers
+        self._in_flight = [0] * workers
+        self._spawned_at = [0.0] * workers
+        self._crashes = [0] * workers  # падінь при запуску поспіль
+        self._restarts = {}  # номер воркера -> TimerHandle відкладеного перезапуску
+        self._failure: Optional[str] = None  # чому пул зупинився сам (цикл падінь)
+        self._stop_task = None
+        self._dir = None
+        self._server = None
+        self._storage_server = None
+        self._connected: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._capacity: Optional[asyncio.Event] = None
+        self._closed = False
+        self.stats = Counter()  # 'accepted', 'rejected', 'processed', 'failed', 'lost', 'restarts'
+
+    async def start(self, storage, slot_holds) -> None:
+        """
+        Запускає сервер сховища і воркерів; повертається, коли всі воркери підключилися.
+        slot_holds - запущений SlotHolds цього процесу, через який утримують слоти всі воркери.
+        """
+        self._dir = tempfile.mkdtemp(prefix="bot_workers_")  # 0700: сокети доступні лише користувачу бота
+        self._storage_server = StorageServer(storage, os.path.join(self._dir, "storage.sock"), slot_holds)
+        await self._storage_server.start()
+        self._server = await asyncio.start_unix_server(self._serve_worker, path=os.path.join(self._dir, "updates.sock"))
+        self._connected = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._capacity = asyncio.Event()
+        self._capacity.set()
+        for index in range(self.workers):
+            self._spawn(index)
+        await asyncio.wait_for(self._connected.wait(), timeout=WORKER_START_TIMEOUT)
+        if self._failure:
+            await self.stop()
+            raise RuntimeError(self._failure)
+        print(f"INFO [workers.py]: Запущено воркерів: {self.workers} "
+              f"(pid {', '.join(str(process.pid) for process in self._processes)}).", file=sys.stderr)
+
+    def _spawn(self, index: int) -> None:
+        process = self._context.Process(
+            target=run_worker,
+            args=(index, os.path.join(self._dir, "storage.sock"), os.path.join(self._dir, "updates.sock"),
+                  f"{FSM_STORAGE_PATH}.worker{index}", self.initializer, self.initargs),
+            name=f"bot-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[index] = process
+        self._spawned_at[index] = time.monotonic()
+        # Завершення процесу видно за його sentinel - і тоді, коли воркер упав ще до підключення
+        asyncio.get_running_loop().add_reader(process.sentinel, self._process_exited, index, process)
+
+    async def _serve_worker(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        index = None
+        try:
+            index = await read_frame(reader)
+            if self._closed:
+                return  # воркер, перезапущений перед самою зупинкою пулу
+            self._writers[index] = writer
+            self._capacity.set()  # put() міг чекати на перезапущений воркер
+            if all(w is not None for w in self._writers):
+                self._connected.set()
+            while True:
+                processed, failed = await read_frame(reader)
+                self._finished(index, processed, failed)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            if index is not None and self._writers[index] is writer:
+                self._worker_gone(index)
+
+    def _finished(self, index: int, processed: int, failed: int) -> None:
+        self._in_flight[index] -= processed + failed
+        self.stats["processed"] += processed
+        self.stats["failed"] += failed
+        self._capacity.set()
+        if not any(self._in_flight):
+            self._idle.set()
+
+    def _worker_gone(self, index: int) -> None:
+        """З'єднання з воркером закрилося: його необроблені оновлення втрачено."""
+        self._writers[index] = None
+        if self._in_flight[index]:
+            self.stats["lost"] += self._in_flight[index]
+            self._in_flight[index] = 0
+            self._capacity.set()
+            if not any(self._in_flight):
+                self._idle.set()
+
+    def _process_exited(self, index: int, process) -> None:
+        """Процес воркера завершився: перезапуск (з паузою, якщо він падає при запуску) або зупинка пулу."""
+        asyncio.get_running_loop().remove_reader(process.sentinel)
+        process.join(1)  # sentinel закривається з виходом процесу - лишається лише забрати exitcode
+        if self._closed or self._failure or self._processes[index] is not process:
+            return
+        if time.monotonic() - self._spawned_at[index] >= WORKER_HEALTHY_SECONDS:
+            self._crashes[index] = 0
+            delay = 0.0
+        else:
+            self._crashes[index] += 1
+            if self._crashes[index] >= WORKER_CRASH_LOOP_LIMIT:
+                self._fail(f"Воркер {index} падає при запуску: {self._crashes[index]} разів поспіль "
+                           f"(останній код {process.exitcode}). Пул воркерів зупинено.")
+                return
+            delay = min(WORKER_RESTART_DELAY * 2 ** (self._crashes[index] - 1), WORKER_RESTART_DELAY_MAX)
+        print(f"ПОМИЛКА [workers.py]: Воркер {index} (pid {process.pid}) завершився, код {process.exitcode}. "
+              f"Перезапуск{f' через {delay:g} с' if delay else ''}.", file=sys.stderr)
+        self.stats["restarts"] += 1
+        self._restarts[index] = asyncio.get_running_loop().call_later(delay, self._restart, index)
+
+    def _restart(self, index: int) -> None:
+        self._restarts.pop(index, None)
+        if not self._closed:
+            self._spawn(index)
+
+    def _fail(self, reason: str) -> None:
+        self._failure = reason
+        print(f"КРИТИЧНА ПОМИЛКА [workers.py]: {reason}", file=sys.stderr)
+        if not self._connected.is_set():
+            self._connected.set()  # start() зупинить пул і підніме помилку сам
+        else:
+            asyncio.create_task(self.stop())
+
+    def submit(self, update: Update) -> bool:
+        """Не чекає: False, якщо черга воркера повна, воркер недоступний або пул зупиняється."""
+        index = shard_of(update, self.workers)
+        writer = self._writers[index]
+        if self._closed or writer is None or self._in_flight[index] >= self.max_pending:
+            self.stats["rejected"] += 1
+            self._capacity.clear()
+            return False
+        write_frame(writer, update.model_dump_json(exclude_none=True, by_alias=True).encode())
+        self._in_flight[index] += 1
+        self._idle.clear()
+        self.stats["accepted"] += 1
+        return True
+
+    async def put(self, update: Update) -> None:
+        """Як submit, але чекає на місце в черзі воркера."""
+        while not self.submit(update):
+            if self._closed:
+                raise RuntimeError("WorkerPool зупинено")
+            await self._capacity.wait()
+
+    async def join(self) -> None:
+        """Чекає, поки воркери оброблять усі передані їм оновлення."""
+        await self._idle.wait()
+
+    async def stop(self, timeout: float = WORKER_STOP_TIMEOUT) -> None:
+        """Зупиняє воркерів (кожен доопрацьовує прийняті оновлення), потім сервер сховища."""
+        if self._dir is None:
+            return
+        if self._stop_task is None:  # повторний виклик (пул зупиняється сам після циклу падінь) чекає на перший
+            self._stop_task = asyncio.ensure_future(self._stop(timeout))
+        await asyncio.shield(self._stop_task)
+
+    async def _stop(self, timeout: float) -> None:
+        self._closed = True
+        for handle in self._restarts.values():
+            handle.cancel()
+        self._restarts.clear()
+        if self._capacity is not None:
+            self._capacity.set()  # розбудити put(), щоб він побачив зупинку
+        for writer in self._writers:
+            if writer is not None and not writer.is_closing():
+                write_frame(writer, None)  # None - сигнал зупинки
+        loop = asyncio.get_running_loop()
+        for process in self._processes:
+            if process is None:
+                continue
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                print(f"ПОПЕРЕДЖЕННЯ [workers.py]: Воркер pid {process.pid} не зупинився за {timeout:g} с.", file=sys.stderr)
+                process.terminate()
+            loop.remove_reader(process.sentinel)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self._storage_server.close()
+        shutil.rmtree(self._dir, ignore_errors=True)
+        self._dir = None
+
+    def executor_stats(self) -> dict:
+        return {
+            "workers": [{"pid": process.pid if process else None, "alive": bool(process and process.is_alive()),
+                         "in_flight": in_flight}
+                        for process, in_flight in zip(self._processes, self._in_flight)],
+            "depth": sum(self._in_flight),
+            "failure": self._failure,
+            "storage_calls": self._storage_server.server_stats() if self._storage_server else {},
+            **self.stats,
+        }
+
+
+_WORKER_POOL = None
+
+
+def get_worker_pool() -> WorkerPool:
+    """Пул воркерів процесу FastAPI (BOT_WORKERS процесів)."""
+    global _WORKER_POOL
+    if _WORKER_POOL is None:
+        _WORKER_POOL = WorkerPool()
+    return _WORKER_POOL